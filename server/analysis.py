@@ -1,11 +1,15 @@
 # analysis.py
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sqlalchemy import create_engine, text
 from app import create_app, db
 from app.models import User
+from user_frame_loader import UserFrameLoader, ANALYSIS_COLUMNS, columns_for, expand_json_columns
+from chart_pipeline import ChartPipeline
 import json
 
 def convert_to_serializable(obj):
@@ -22,122 +26,299 @@ def convert_to_serializable(obj):
             return obj.tolist()
         
         if isinstance(obj, dict):
-            return {k: convert_to_serializable(v) for k, v in obj.items()}
+            return {convert_to_serializable(k): convert_to_serializable(v) for k, v in obj.items()}
         
         if isinstance(obj, list):
             return [convert_to_serializable(item) for item in obj]
         
         return obj
 
+# Chart renderers
+# Module-level so the chart pipeline can run them in worker processes.
+# Each takes the data it draws and the output path.
+
+def render_histogram(values, path, title, xlabel):
+    plt.figure(figsize=(10, 6))
+    sns.histplot(values, kde=True)
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel('Count')
+    plt.savefig(path)
+    plt.close()
+
+def render_plan_boxplot(data, path, y, title):
+    plt.figure(figsize=(10, 6))
+    sns.boxplot(x='plan', y=y, data=data)
+    plt.title(title)
+    plt.savefig(path)
+    plt.close()
+
+def render_bar(values, path, title, xlabel, ylabel):
+    plt.figure(figsize=(10, 6))
+    values.plot(kind='bar')
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def render_pie(values, path, title, figsize=(10, 6)):
+    plt.figure(figsize=figsize)
+    plt.pie(list(values.values()), labels=list(values.keys()), autopct='%1.1f%%')
+    plt.title(title)
+    plt.savefig(path)
+    plt.close()
+
+def render_correlation_heatmap(data, path):
+    plt.figure(figsize=(12, 10))
+    correlation_matrix = data.corr()
+    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0)
+    plt.title('Correlation Heatmap of Key User Metrics')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def render_ltv_vs_sessions(data, path):
+    plt.figure(figsize=(12, 8))
+    sns.scatterplot(
+        data=data, 
+        x='total_sessions', 
+        y='lifetime_value', 
+        hue='plan', 
+        palette='deep'
+    )
+    plt.title('Lifetime Value vs Total Sessions by Subscription Plan')
+    plt.xlabel('Total Sessions')
+    plt.ylabel('Lifetime Value')
+    plt.savefig(path)
+    plt.close()
+
+def render_engagement_violin(data, path):
+    plt.figure(figsize=(12, 8))
+    sns.violinplot(
+        data=data, 
+        x='plan', 
+        y='engagement_score', 
+        palette='Set3'
+    )
+    plt.title('Engagement Score Distribution by Subscription Plan')
+    plt.xlabel('Subscription Plan')
+    plt.ylabel('Engagement Score')
+    plt.savefig(path)
+    plt.close()
+
+def render_communication_by_plan(comm_pref_by_plan_pct, path):
+    plt.figure(figsize=(12, 8))
+    comm_pref_by_plan_pct.plot(kind='bar', stacked=True)
+    plt.title('Communication Preferences by Subscription Plan')
+    plt.xlabel('Subscription Plan')
+    plt.ylabel('Proportion of Communication Preferences')
+    plt.legend(title='Communication Preference', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def render_churn_by_referrals(data, path):
+    plt.figure(figsize=(12, 8))
+    sns.boxplot(
+        x=pd.cut(data['referral_count'], 
+                bins=[0, 1, 3, 5, np.inf], 
+                labels=['0', '1-2', '3-4', '5+']), 
+        y=data['churn_risk']
+    )
+    plt.title('Churn Risk by Referral Count')
+    plt.xlabel('Number of Referrals')
+    plt.ylabel('Churn Risk')
+    plt.savefig(path)
+    plt.close()
+
+def render_radar(values_by_category, path, title):
+    # Number of variables
+    categories = list(values_by_category.keys())
+    N = len(categories)
+    
+    # Repeat the first value to close the polygon
+    values = list(values_by_category.values())
+    values += values[:1]
+    
+    # Compute angle for each axis
+    angles = [n / float(N) * 2 * np.pi for n in range(N)]
+    angles += angles[:1]
+    
+    plt.figure(figsize=(8, 8))
+    ax = plt.subplot(111, polar=True)
+    plt.xticks(angles[:-1], categories)
+    ax.plot(angles, values)
+    ax.fill(angles, values, alpha=0.25)
+    plt.title(title)
+    plt.savefig(path)
+    plt.close()
+
+def render_plan_distribution(plans, path):
+    plt.figure(figsize=(12, 6))
+    plt.bar(list(plans.keys()), list(plans.values()))
+    plt.title('Subscription Plan Distribution')
+    plt.xlabel('Plan Type')
+    plt.ylabel('Proportion of Users')
+    plt.savefig(path)
+    plt.close()
+
+def render_communication_barh(comm_prefs, path):
+    plt.figure(figsize=(10, 6))
+    plt.barh(list(comm_prefs.keys()), list(comm_prefs.values()))
+    plt.title('Communication Channel Preferences')
+    plt.xlabel('Proportion of Users')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def render_ltv_by_plan_boxplot(ltv_by_plan, path):
+    plt.figure(figsize=(10, 6))
+    plan_data = [
+        [ltv_by_plan[plan]['mean'], ltv_by_plan[plan]['median'], ltv_by_plan[plan]['max']] 
+        for plan in ltv_by_plan.keys()
+    ]
+    plt.boxplot(plan_data, tick_labels=list(ltv_by_plan.keys()))
+    plt.title('Lifetime Value Distribution by Plan')
+    plt.ylabel('Lifetime Value')
+    plt.savefig(path)
+    plt.close()
+
+def render_feature_correlation(corr_matrix, path, feature_names):
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', xticklabels=feature_names, yticklabels=feature_names)
+    plt.title('Feature Usage Correlation')
+    plt.savefig(path)
+    plt.close()
+
 class UserAnalytics:
-    def __init__(self):
+    def __init__(self, cache_dir='analysis_cache', refresh=True, chart_dir=None, chart_workers=None):
+        # Charts render in a process pool and are skipped when their data is unchanged
+        self.charts = ChartPipeline(output_dir=chart_dir, max_workers=chart_workers)
+        
         # Create Flask app context
         app = create_app()
         
         with app.app_context():
-            # Use a SQL query string instead of the SQLAlchemy query object
-            query = text("SELECT * FROM users")
-            self.users_df = pd.read_sql(query, db.engine)
-            
-            # Convert JSON columns 
-            self.users_df['notification_settings'] = self.users_df['notification_settings'].apply(self._parse_json)
-            self.users_df['feature_usage_json'] = self.users_df['feature_usage_json'].apply(self._parse_json)
+            # Each analysis loads only its own columns; later runs only read changed users
+            self.loader = UserFrameLoader(db.engine, cache_dir=cache_dir)
+        self.refresh = refresh
+        self._frame = None
+        self._json_frames = {}
     
-    def _parse_json(self, json_str):
-        """
-        Safely parse JSON strings
-        """
-        try:
-            # Handle both string and dictionary inputs
-            if isinstance(json_str, str):
-                return json.loads(json_str.replace("'", '"'))
-            elif isinstance(json_str, dict):
-                return json_str
-            else:
-                return {}
-        except (json.JSONDecodeError, TypeError):
-            return {}
+    def frame(self, *analyses):
+        """Users frame with just the columns the named analyses read (see ANALYSIS_COLUMNS)"""
+        columns = columns_for(analyses)
+        if self._frame is None:
+            self._frame = self.loader.load(columns, refresh=self.refresh)
+        else:
+            missing = [column for column in columns if column not in self._frame.columns]
+            if missing:
+                # The first load refreshed the cache, so only the new columns are read
+                added = self.loader.load(missing, refresh=False)
+                self._frame = self._frame.merge(added[['id'] + missing], on='id', how='left')
+        return self._frame[columns]
+    
+    def _json_frame(self, column, analysis):
+        """Flat frame parsed from a JSON column, parsed once per instance"""
+        if column not in self._json_frames:
+            self._json_frames[column] = expand_json_columns(self.frame(analysis)[[column]])[column]
+        return self._json_frames[column]
+    
+    @property
+    def notification_settings_df(self):
+        return self._json_frame('notification_settings', 'notifications')
+    
+    @property
+    def feature_usage_df(self):
+        return self._json_frame('feature_usage_json', 'personalization')
+    
+    @property
+    def users_df(self):
+        """Every analysed column, with the JSON columns as dicts"""
+        users_df = self.frame(*ANALYSIS_COLUMNS).copy()
+        users_df['notification_settings'] = self._frame_to_dicts(self.notification_settings_df)
+        users_df['feature_usage_json'] = self._frame_to_dicts(self.feature_usage_df)
+        return users_df
+    
+    def _frame_to_dicts(self, frame):
+        """Turn a parsed JSON frame back into a column of dicts without missing keys"""
+        return [
+            {key: value for key, value in record.items() if pd.notna(value)}
+            for record in frame.to_dict('records')
+        ]
     
     def demographic_analysis(self):
         """Comprehensive Demographic Insights"""
+        users_df = self.frame('demographic')
         demo_insights = {
             'age_distribution': {
-                'mean': self.users_df['age'].mean(),
-                'median': self.users_df['age'].median(),
-                'std': self.users_df['age'].std(),
+                'mean': users_df['age'].mean(),
+                'median': users_df['age'].median(),
+                'std': users_df['age'].std(),
             },
-            'gender_breakdown': self.users_df['gender'].value_counts(normalize=True),
-            'location_top_10': self.users_df['location'].value_counts().head(10),
-            'language_distribution': self.users_df['language'].value_counts(normalize=True).head(10)
+            'gender_breakdown': users_df['gender'].value_counts(normalize=True),
+            'location_top_10': users_df['location'].value_counts().head(10),
+            'language_distribution': users_df['language'].value_counts(normalize=True).head(10)
         }
         
         # Visualize Age Distribution
-        plt.figure(figsize=(10, 6))
-        sns.histplot(self.users_df['age'], kde=True)
-        plt.title('Age Distribution')
-        plt.xlabel('Age')
-        plt.ylabel('Count')
-        plt.savefig('age_distribution.png')
-        plt.close()
+        self.charts.submit('age_distribution.png', render_histogram, users_df['age'],
+                           title='Age Distribution', xlabel='Age')
         
         return demo_insights
     
     def engagement_analysis(self):
         """Deep Dive into User Engagement"""
+        users_df = self.frame('engagement')
         engagement_insights = {
             'avg_visit_time': {
-                'mean': self.users_df['avg_visit_time'].mean(),
-                'median': self.users_df['avg_visit_time'].median(),
-                'std': self.users_df['avg_visit_time'].std(),
+                'mean': users_df['avg_visit_time'].mean(),
+                'median': users_df['avg_visit_time'].median(),
+                'std': users_df['avg_visit_time'].std(),
             },
             'total_sessions_stats': {
-                'mean': self.users_df['total_sessions'].mean(),
-                'median': self.users_df['total_sessions'].median(),
-                'max': self.users_df['total_sessions'].max(),
+                'mean': users_df['total_sessions'].mean(),
+                'median': users_df['total_sessions'].median(),
+                'max': users_df['total_sessions'].max(),
             },
             'session_frequency_stats': {
-                'mean': self.users_df['session_frequency'].mean(),
-                'median': self.users_df['session_frequency'].median(),
+                'mean': users_df['session_frequency'].mean(),
+                'median': users_df['session_frequency'].median(),
             }
         }
         
         # Engagement Score Distribution
-        plt.figure(figsize=(10, 6))
-        sns.histplot(self.users_df['engagement_score'], kde=True)
-        plt.title('Engagement Score Distribution')
-        plt.xlabel('Engagement Score')
-        plt.ylabel('Count')
-        plt.savefig('engagement_score_distribution.png')
-        plt.close()
+        self.charts.submit('engagement_score_distribution.png', render_histogram, users_df['engagement_score'],
+                           title='Engagement Score Distribution', xlabel='Engagement Score')
         
         return engagement_insights
     
     def revenue_and_conversion_analysis(self):
         """Revenue and Conversion Metrics"""
+        users_df = self.frame('revenue')
         # Plan Conversion Analysis
-        plan_conversion = self.users_df['plan'].value_counts(normalize=True)
+        plan_conversion = users_df['plan'].value_counts(normalize=True)
         
         # Lifetime Value Analysis
         ltv_insights = {
-            'plan_ltv': self.users_df.groupby('plan')['lifetime_value'].agg(['mean', 'median', 'max']),
+            'plan_ltv': users_df.groupby('plan')['lifetime_value'].agg(['mean', 'median', 'max']),
             'total_ltv': {
-                'mean': self.users_df['lifetime_value'].mean(),
-                'median': self.users_df['lifetime_value'].median(),
-                'total': self.users_df['lifetime_value'].sum()
+                'mean': users_df['lifetime_value'].mean(),
+                'median': users_df['lifetime_value'].median(),
+                'total': users_df['lifetime_value'].sum()
             },
             'purchases_analysis': {
-                'avg_purchases': self.users_df['total_purchases'].mean(),
-                'median_purchases': self.users_df['total_purchases'].median(),
-                'max_purchases': self.users_df['total_purchases'].max(),
+                'avg_purchases': users_df['total_purchases'].mean(),
+                'median_purchases': users_df['total_purchases'].median(),
+                'max_purchases': users_df['total_purchases'].max(),
             }
         }
         
         # LTV by Plan Visualization
-        plt.figure(figsize=(10, 6))
-        sns.boxplot(x='plan', y='lifetime_value', data=self.users_df)
-        plt.title('Lifetime Value by Plan')
-        plt.savefig('ltv_by_plan.png')
-        plt.close()
+        self.charts.submit('ltv_by_plan.png', render_plan_boxplot, users_df[['plan', 'lifetime_value']],
+                           y='lifetime_value', title='Lifetime Value by Plan')
         
         return {
             'plan_conversion': plan_conversion,
@@ -146,51 +327,43 @@ class UserAnalytics:
     
     def churn_prediction_analysis(self):
         """Churn Risk and Predictive Insights"""
+        users_df = self.frame('churn')
         # Churn Risk Segmentation
         churn_segments = pd.cut(
-            self.users_df['churn_risk'], 
+            users_df['churn_risk'], 
             bins=[0, 0.2, 0.4, 0.6, 0.8, 1], 
             labels=['Very Low', 'Low', 'Medium', 'High', 'Very High']
         )
         
         churn_insights = {
             'churn_risk_distribution': churn_segments.value_counts(normalize=True),
-            'churn_by_plan': self.users_df.groupby('plan')['churn_risk'].mean(),
+            'churn_by_plan': users_df.groupby('plan')['churn_risk'].mean(),
             'churn_correlations': {
                 'engagement_correlation': np.corrcoef(
-                    self.users_df['churn_risk'], 
-                    self.users_df['engagement_score']
+                    users_df['churn_risk'], 
+                    users_df['engagement_score']
                 )[0, 1],
                 'ltv_correlation': np.corrcoef(
-                    self.users_df['churn_risk'], 
-                    self.users_df['lifetime_value']
+                    users_df['churn_risk'], 
+                    users_df['lifetime_value']
                 )[0, 1]
             }
         }
         
         # Churn Risk Visualization
-        plt.figure(figsize=(10, 6))
-        sns.boxplot(x='plan', y='churn_risk', data=self.users_df)
-        plt.title('Churn Risk by Plan')
-        plt.savefig('churn_risk_by_plan.png')
-        plt.close()
+        self.charts.submit('churn_risk_by_plan.png', render_plan_boxplot, users_df[['plan', 'churn_risk']],
+                           y='churn_risk', title='Churn Risk by Plan')
         
         return churn_insights
     
     def personalization_analysis(self):
         """Personalization and Content Preference Insights"""
-        content_preferences = self.users_df['preferred_content_type'].value_counts(normalize=True)
-        communication_preferences = self.users_df['communication_preference'].value_counts(normalize=True)
+        users_df = self.frame('personalization')
+        content_preferences = users_df['preferred_content_type'].value_counts(normalize=True)
+        communication_preferences = users_df['communication_preference'].value_counts(normalize=True)
         
         # Feature Usage Analysis
-        def extract_feature_usage(feature_json):
-            try:
-                features = json.loads(feature_json.replace("'", '"'))
-                return pd.Series(features)
-            except:
-                return pd.Series({'feature1': np.nan, 'feature2': np.nan, 'feature3': np.nan})
-        
-        feature_usage_df = self.users_df['feature_usage_json'].apply(extract_feature_usage)
+        feature_usage_df = self.feature_usage_df
         
         feature_insights = {
             'feature_usage_mean': feature_usage_df.mean(),
@@ -198,14 +371,8 @@ class UserAnalytics:
         }
         
         # Content Preference Visualization
-        plt.figure(figsize=(10, 6))
-        content_preferences.plot(kind='bar')
-        plt.title('Content Type Preferences')
-        plt.xlabel('Content Type')
-        plt.ylabel('Proportion')
-        plt.tight_layout()
-        plt.savefig('content_preferences.png')
-        plt.close()
+        self.charts.submit('content_preferences.png', render_bar, content_preferences,
+                           title='Content Type Preferences', xlabel='Content Type', ylabel='Proportion')
         
         return {
             'content_preferences': content_preferences,
@@ -215,23 +382,21 @@ class UserAnalytics:
     
     def referral_and_growth_analysis(self):
         """Referral Source and Growth Metrics"""
-        referral_sources = self.users_df['referral_source'].value_counts(normalize=True)
+        users_df = self.frame('referral')
+        referral_sources = users_df['referral_source'].value_counts(normalize=True)
         
         referral_insights = {
             'referral_source_distribution': referral_sources,
-            'avg_referral_count': self.users_df['referral_count'].mean(),
+            'avg_referral_count': users_df['referral_count'].mean(),
             'referral_ltv_correlation': np.corrcoef(
-                self.users_df['referral_count'], 
-                self.users_df['lifetime_value']
+                users_df['referral_count'], 
+                users_df['lifetime_value']
             )[0, 1]
         }
         
         # Referral Source Visualization
-        plt.figure(figsize=(10, 6))
-        referral_sources.plot(kind='pie', autopct='%1.1f%%')
-        plt.title('Referral Source Distribution')
-        plt.savefig('referral_sources.png')
-        plt.close()
+        self.charts.submit('referral_sources.png', render_pie, referral_sources.to_dict(),
+                           title='Referral Source Distribution')
         
         return referral_insights
     
@@ -258,46 +423,49 @@ class UserAnalytics:
     # Modify other methods to use standard Python types
     def _serialize_demographic_insights(self):
         """Convert demographic insights to JSON-serializable format"""
+        users_df = self.frame('demographic')
         demo_insights = {
             'age_distribution': {
-                'mean': self.users_df['age'].mean(),
-                'median': self.users_df['age'].median(),
-                'std': self.users_df['age'].std(),
+                'mean': users_df['age'].mean(),
+                'median': users_df['age'].median(),
+                'std': users_df['age'].std(),
             },
-            'gender_breakdown': self.users_df['gender'].value_counts(normalize=True).to_dict(),
-            'location_top_10': self.users_df['location'].value_counts().head(10).to_dict(),
-            'language_distribution': self.users_df['language'].value_counts(normalize=True).head(10).to_dict()
+            'gender_breakdown': users_df['gender'].value_counts(normalize=True).to_dict(),
+            'location_top_10': users_df['location'].value_counts().head(10).to_dict(),
+            'language_distribution': users_df['language'].value_counts(normalize=True).head(10).to_dict()
         }
         return demo_insights
 
     # Similar modifications for other serialization methods
     def _serialize_engagement_insights(self):
         """Convert engagement insights to JSON-serializable format"""
+        users_df = self.frame('engagement')
         engagement_insights = {
             'avg_visit_time': {
-                'mean': self.users_df['avg_visit_time'].mean(),
-                'median': self.users_df['avg_visit_time'].median(),
-                'std': self.users_df['avg_visit_time'].std(),
+                'mean': users_df['avg_visit_time'].mean(),
+                'median': users_df['avg_visit_time'].median(),
+                'std': users_df['avg_visit_time'].std(),
             },
             'total_sessions_stats': {
-                'mean': self.users_df['total_sessions'].mean(),
-                'median': self.users_df['total_sessions'].median(),
-                'max': self.users_df['total_sessions'].max(),
+                'mean': users_df['total_sessions'].mean(),
+                'median': users_df['total_sessions'].median(),
+                'max': users_df['total_sessions'].max(),
             },
             'session_frequency_stats': {
-                'mean': self.users_df['session_frequency'].mean(),
-                'median': self.users_df['session_frequency'].median(),
+                'mean': users_df['session_frequency'].mean(),
+                'median': users_df['session_frequency'].median(),
             }
         }
         return engagement_insights
     
     def _serialize_revenue_insights(self):
         """Convert revenue insights to JSON-serializable format"""
+        users_df = self.frame('revenue')
         # Plan Conversion Analysis
-        plan_conversion = self.users_df['plan'].value_counts(normalize=True).to_dict()
+        plan_conversion = users_df['plan'].value_counts(normalize=True).to_dict()
         
         # Lifetime Value Analysis by Plan
-        ltv_by_plan = self.users_df.groupby('plan')['lifetime_value'].agg(['mean', 'median', 'max'])
+        ltv_by_plan = users_df.groupby('plan')['lifetime_value'].agg(['mean', 'median', 'max'])
         
         # Convert LTV by Plan to dictionary with float values
         plan_ltv = {}
@@ -312,14 +480,14 @@ class UserAnalytics:
         ltv_insights = {
             'plan_ltv': plan_ltv,
             'total_ltv': {
-                'mean': float(self.users_df['lifetime_value'].mean()),
-                'median': float(self.users_df['lifetime_value'].median()),
-                'total': float(self.users_df['lifetime_value'].sum())
+                'mean': float(users_df['lifetime_value'].mean()),
+                'median': float(users_df['lifetime_value'].median()),
+                'total': float(users_df['lifetime_value'].sum())
             },
             'purchases_analysis': {
-                'avg_purchases': float(self.users_df['total_purchases'].mean()),
-                'median_purchases': float(self.users_df['total_purchases'].median()),
-                'max_purchases': float(self.users_df['total_purchases'].max()),
+                'avg_purchases': float(users_df['total_purchases'].mean()),
+                'median_purchases': float(users_df['total_purchases'].median()),
+                'max_purchases': float(users_df['total_purchases'].max()),
             }
         }
         
@@ -330,24 +498,25 @@ class UserAnalytics:
 
     def _serialize_churn_insights(self):
         """Convert churn insights to JSON-serializable format"""
+        users_df = self.frame('churn')
         # Churn Risk Segmentation
         churn_segments = pd.cut(
-            self.users_df['churn_risk'], 
+            users_df['churn_risk'], 
             bins=[0, 0.2, 0.4, 0.6, 0.8, 1], 
             labels=['Very Low', 'Low', 'Medium', 'High', 'Very High']
         )
         
         churn_insights = {
             'churn_risk_distribution': dict(churn_segments.value_counts(normalize=True)),
-            'churn_by_plan': dict(self.users_df.groupby('plan')['churn_risk'].mean()),
+            'churn_by_plan': dict(users_df.groupby('plan')['churn_risk'].mean()),
             'churn_correlations': {
                 'engagement_correlation': float(np.corrcoef(
-                    self.users_df['churn_risk'], 
-                    self.users_df['engagement_score']
+                    users_df['churn_risk'], 
+                    users_df['engagement_score']
                 )[0, 1]),
                 'ltv_correlation': float(np.corrcoef(
-                    self.users_df['churn_risk'], 
-                    self.users_df['lifetime_value']
+                    users_df['churn_risk'], 
+                    users_df['lifetime_value']
                 )[0, 1])
             }
         }
@@ -356,26 +525,15 @@ class UserAnalytics:
 
     def _serialize_personalization_insights(self):
         """Convert personalization insights to JSON-serializable format"""
+        users_df = self.frame('personalization')
         # Content Preferences
-        content_preferences = dict(self.users_df['preferred_content_type'].value_counts(normalize=True))
+        content_preferences = dict(users_df['preferred_content_type'].value_counts(normalize=True))
         
         # Communication Preferences
-        communication_preferences = dict(self.users_df['communication_preference'].value_counts(normalize=True))
+        communication_preferences = dict(users_df['communication_preference'].value_counts(normalize=True))
         
         # Feature Usage Analysis
-        # Safely handle feature usage JSON
-        def safe_feature_usage_extraction(feature_json):
-            try:
-                # Ensure it's a dictionary
-                if isinstance(feature_json, str):
-                    feature_json = json.loads(feature_json.replace("'", '"'))
-                return feature_json if isinstance(feature_json, dict) else {}
-            except:
-                return {}
-        
-        # Extract feature usage
-        feature_usage_data = self.users_df['feature_usage_json'].apply(safe_feature_usage_extraction)
-        feature_usage_df = pd.DataFrame(feature_usage_data.tolist())
+        feature_usage_df = self.feature_usage_df
         
         # Feature Insights
         feature_insights = {
@@ -400,24 +558,25 @@ class UserAnalytics:
 
     def _serialize_referral_insights(self):
         """Convert referral insights to JSON-serializable format"""
+        users_df = self.frame('referral')
         # Referral Source Distribution
-        referral_sources = dict(self.users_df['referral_source'].value_counts(normalize=True))
+        referral_sources = dict(users_df['referral_source'].value_counts(normalize=True))
         
         # Referral Insights
         referral_insights = {
             'referral_source_distribution': referral_sources,
-            'avg_referral_count': float(self.users_df['referral_count'].mean()),
-            'referral_count_distribution': dict(self.users_df['referral_count'].value_counts(normalize=True)),
+            'avg_referral_count': float(users_df['referral_count'].mean()),
+            'referral_count_distribution': dict(users_df['referral_count'].value_counts(normalize=True)),
             'referral_ltv_correlation': float(np.corrcoef(
-                self.users_df['referral_count'], 
-                self.users_df['lifetime_value']
+                users_df['referral_count'], 
+                users_df['lifetime_value']
             )[0, 1]),
             'referral_insights_by_plan': {
                 plan: {
-                    'avg_referral_count': float(self.users_df[self.users_df['plan'] == plan]['referral_count'].mean()),
-                    'avg_lifetime_value': float(self.users_df[self.users_df['plan'] == plan]['lifetime_value'].mean())
+                    'avg_referral_count': float(users_df[users_df['plan'] == plan]['referral_count'].mean()),
+                    'avg_lifetime_value': float(users_df[users_df['plan'] == plan]['lifetime_value'].mean())
                 }
-                for plan in self.users_df['plan'].unique()
+                for plan in users_df['plan'].unique()
             }
         }
         
@@ -427,122 +586,55 @@ class UserAnalytics:
         """
         Create advanced visualizations that go beyond the existing charts
         """
-        # 1. Correlation Heatmap of Key Metrics
-        plt.figure(figsize=(12, 10))
+        users_df = self.frame('visualization')
         correlation_columns = [
             'age', 'avg_visit_time', 'total_sessions', 
             'lifetime_value', 'total_purchases', 
             'churn_risk', 'engagement_score'
         ]
-        correlation_matrix = self.users_df[correlation_columns].corr()
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0)
-        plt.title('Correlation Heatmap of Key User Metrics')
-        plt.tight_layout()
-        plt.savefig('correlation_heatmap.png')
-        plt.close()
-
-        # 2. Scatter Plot: Lifetime Value vs Total Sessions by Plan
-        plt.figure(figsize=(12, 8))
-        sns.scatterplot(
-            data=self.users_df, 
-            x='total_sessions', 
-            y='lifetime_value', 
-            hue='plan', 
-            palette='deep'
-        )
-        plt.title('Lifetime Value vs Total Sessions by Subscription Plan')
-        plt.xlabel('Total Sessions')
-        plt.ylabel('Lifetime Value')
-        plt.savefig('ltv_vs_sessions_scatter.png')
-        plt.close()
-
-        # 3. Violin Plot: Engagement Score Distribution by Plan
-        plt.figure(figsize=(12, 8))
-        sns.violinplot(
-            data=self.users_df, 
-            x='plan', 
-            y='engagement_score', 
-            palette='Set3'
-        )
-        plt.title('Engagement Score Distribution by Subscription Plan')
-        plt.xlabel('Subscription Plan')
-        plt.ylabel('Engagement Score')
-        plt.savefig('engagement_score_violin.png')
-        plt.close()
-
-        # 4. Stacked Bar Chart: Communication Preferences by Plan
-        # Prepare data
-        comm_pref_by_plan = self.users_df.groupby(['plan', 'communication_preference']).size().unstack(fill_value=0)
+
+        # Stacked bar data: Communication Preferences by Plan
+        comm_pref_by_plan = users_df.groupby(['plan', 'communication_preference'], observed=False).size().unstack(fill_value=0)
         comm_pref_by_plan_pct = comm_pref_by_plan.div(comm_pref_by_plan.sum(axis=1), axis=0)
 
-        plt.figure(figsize=(12, 8))
-        comm_pref_by_plan_pct.plot(kind='bar', stacked=True)
-        plt.title('Communication Preferences by Subscription Plan')
-        plt.xlabel('Subscription Plan')
-        plt.ylabel('Proportion of Communication Preferences')
-        plt.legend(title='Communication Preference', bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.tight_layout()
-        plt.savefig('communication_preferences_by_plan.png')
-        plt.close()
-
-        # 5. Box Plot: Churn Risk vs Referral Count
-        plt.figure(figsize=(12, 8))
-        sns.boxplot(
-            x=pd.cut(self.users_df['referral_count'], 
-                    bins=[0, 1, 3, 5, np.inf], 
-                    labels=['0', '1-2', '3-4', '5+']), 
-            y=self.users_df['churn_risk']
-        )
-        plt.title('Churn Risk by Referral Count')
-        plt.xlabel('Number of Referrals')
-        plt.ylabel('Churn Risk')
-        plt.savefig('churn_risk_by_referrals.png')
-        plt.close()
-
-        # 6. Feature Usage Radar Chart
-        def create_radar_chart(feature_usage):
-            # Prepare feature usage data
-            feature_means = feature_usage.mean()
-            
-            # Number of variables
-            categories = list(feature_means.index)
-            N = len(categories)
-            
-            # Repeat the first value to close the polygon
-            values = feature_means.tolist()
-            values += values[:1]
-            
-            # Compute angle for each axis
-            angles = [n / float(N) * 2 * np.pi for n in range(N)]
-            angles += angles[:1]
-            
-            # Plot
-            plt.figure(figsize=(8, 8))
-            ax = plt.subplot(111, polar=True)
-            plt.xticks(angles[:-1], categories)
-            ax.plot(angles, values)
-            ax.fill(angles, values, alpha=0.25)
-            plt.title('Feature Usage Radar Chart')
-            plt.savefig('feature_usage_radar.png')
-            plt.close()
-
-        # Extract feature usage
-        feature_usage_data = pd.DataFrame(
-            self.users_df['feature_usage_json'].apply(
-                lambda x: json.loads(x.replace("'", '"')) if isinstance(x, str) else x
-            ).tolist()
-        )
-        create_radar_chart(feature_usage_data)
+        # Feature usage means for the radar chart
+        feature_means = self.feature_usage_df.mean()
+
+        with self.charts.batch():
+            # 1. Correlation Heatmap of Key Metrics
+            self.charts.submit('correlation_heatmap.png', render_correlation_heatmap,
+                               users_df[correlation_columns])
+
+            # 2. Scatter Plot: Lifetime Value vs Total Sessions by Plan
+            self.charts.submit('ltv_vs_sessions_scatter.png', render_ltv_vs_sessions,
+                               users_df[['total_sessions', 'lifetime_value', 'plan']])
+
+            # 3. Violin Plot: Engagement Score Distribution by Plan
+            self.charts.submit('engagement_score_violin.png', render_engagement_violin,
+                               users_df[['plan', 'engagement_score']])
+
+            # 4. Stacked Bar Chart: Communication Preferences by Plan
+            self.charts.submit('communication_preferences_by_plan.png', render_communication_by_plan,
+                               comm_pref_by_plan_pct)
 
+            # 5. Box Plot: Churn Risk vs Referral Count
+            self.charts.submit('churn_risk_by_referrals.png', render_churn_by_referrals,
+                               users_df[['referral_count', 'churn_risk']])
+
+            # 6. Feature Usage Radar Chart
+            self.charts.submit('feature_usage_radar.png', render_radar, feature_means.to_dict(),
+                               title='Feature Usage Radar Chart')
+
+        # Only charts that rendered (or were already current) are reported
         return {
-            'charts_generated': [
+            'charts_generated': self.charts.written([
                 'correlation_heatmap.png',
                 'ltv_vs_sessions_scatter.png',
                 'engagement_score_violin.png',
                 'communication_preferences_by_plan.png',
                 'churn_risk_by_referrals.png',
                 'feature_usage_radar.png'
-            ]
+            ])
         }
     
     def generate_additional_charts(self, marketing_insights):
@@ -555,75 +647,7 @@ class UserAnalytics:
         Returns:
             dict: List of generated chart filenames
         """
-
-        # 1. Subscription Plan Comparison
-        plt.figure(figsize=(12, 6))
-        plans = marketing_insights['revenue_insights']['plan_conversion']
-        plt.bar(plans.keys(), plans.values())
-        plt.title('Subscription Plan Distribution')
-        plt.xlabel('Plan Type')
-        plt.ylabel('Proportion of Users')
-        plt.savefig('subscription_plan_distribution.png')
-        plt.close()
-
-        # 2. Churn Risk Distribution Pie Chart
-        plt.figure(figsize=(10, 10))
-        churn_risks = marketing_insights['churn_prediction']['churn_risk_distribution']
-        plt.pie(churn_risks.values(), labels=churn_risks.keys(), autopct='%1.1f%%')
-        plt.title('Churn Risk Segmentation')
-        plt.savefig('churn_risk_pie.png')
-        plt.close()
-
-        # 3. Content Preference Radar Chart
-        content_prefs = marketing_insights['personalization_insights']['content_preferences']
-        categories = list(content_prefs.keys())
-        values = list(content_prefs.values())
-
-        angles = np.linspace(0, 2*np.pi, len(categories), endpoint=False)
-        values += values[:1]
-        angles = np.concatenate((angles, [angles[0]]))
-
-        plt.figure(figsize=(8, 8))
-        ax = plt.subplot(111, polar=True)
-        plt.xticks(angles[:-1], categories)
-        ax.plot(angles, values)
-        ax.fill(angles, values, alpha=0.25)
-        plt.title('Content Type Preferences')
-        plt.savefig('content_preference_radar.png')
-        plt.close()
-
-        # 4. Communication Preferences Horizontal Bar
-        plt.figure(figsize=(10, 6))
-        comm_prefs = marketing_insights['personalization_insights']['communication_preferences']
-        plt.barh(list(comm_prefs.keys()), list(comm_prefs.values()))
-        plt.title('Communication Channel Preferences')
-        plt.xlabel('Proportion of Users')
-        plt.tight_layout()
-        plt.savefig('communication_preferences.png')
-        plt.close()
-
-        # 5. Lifetime Value by Plan Boxplot
-        plt.figure(figsize=(10, 6))
-        ltv_by_plan = marketing_insights['revenue_insights']['ltv_insights']['plan_ltv']
-        plan_data = [
-            [ltv_by_plan[plan]['mean'], ltv_by_plan[plan]['median'], ltv_by_plan[plan]['max']] 
-            for plan in ltv_by_plan.keys()
-        ]
-        plt.boxplot(plan_data, labels=list(ltv_by_plan.keys()))
-        plt.title('Lifetime Value Distribution by Plan')
-        plt.ylabel('Lifetime Value')
-        plt.savefig('ltv_by_plan_boxplot.png')
-        plt.close()
-
-        # 6. Referral Source Distribution
-        plt.figure(figsize=(10, 6))
-        referral_sources = marketing_insights['referral_growth_insights']['referral_source_distribution']
-        plt.pie(referral_sources.values(), labels=referral_sources.keys(), autopct='%1.1f%%')
-        plt.title('User Acquisition Channels')
-        plt.savefig('referral_sources_pie.png')
-        plt.close()
-
-        # 7. Feature Usage Heatmap
+        # Feature Usage Heatmap data
         feature_correlations = marketing_insights['personalization_insights']['feature_insights']['feature_usage_correlation']
         feature_names = ['feature1', 'feature2', 'feature3']
         
@@ -632,15 +656,41 @@ class UserAnalytics:
         for i, name1 in enumerate(feature_names):
             for j, name2 in enumerate(feature_names):
                 corr_matrix[i, j] = feature_correlations.get(f"{name1}_{name2}", 0)
-        
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', xticklabels=feature_names, yticklabels=feature_names)
-        plt.title('Feature Usage Correlation')
-        plt.savefig('feature_usage_correlation.png')
-        plt.close()
+
+        with self.charts.batch():
+            # 1. Subscription Plan Comparison
+            self.charts.submit('subscription_plan_distribution.png', render_plan_distribution,
+                               marketing_insights['revenue_insights']['plan_conversion'])
+
+            # 2. Churn Risk Distribution Pie Chart
+            self.charts.submit('churn_risk_pie.png', render_pie,
+                               marketing_insights['churn_prediction']['churn_risk_distribution'],
+                               title='Churn Risk Segmentation', figsize=(10, 10))
+
+            # 3. Content Preference Radar Chart
+            self.charts.submit('content_preference_radar.png', render_radar,
+                               marketing_insights['personalization_insights']['content_preferences'],
+                               title='Content Type Preferences')
+
+            # 4. Communication Preferences Horizontal Bar
+            self.charts.submit('communication_preferences.png', render_communication_barh,
+                               marketing_insights['personalization_insights']['communication_preferences'])
+
+            # 5. Lifetime Value by Plan Boxplot
+            self.charts.submit('ltv_by_plan_boxplot.png', render_ltv_by_plan_boxplot,
+                               marketing_insights['revenue_insights']['ltv_insights']['plan_ltv'])
+
+            # 6. Referral Source Distribution
+            self.charts.submit('referral_sources_pie.png', render_pie,
+                               marketing_insights['referral_growth_insights']['referral_source_distribution'],
+                               title='User Acquisition Channels')
+
+            # 7. Feature Usage Heatmap
+            self.charts.submit('feature_usage_correlation.png', render_feature_correlation, corr_matrix,
+                               feature_names=feature_names)
 
         return {
-            'charts_generated': [
+            'charts_generated': self.charts.written([
                 'subscription_plan_distribution.png',
                 'churn_risk_pie.png',
                 'content_preference_radar.png',
@@ -648,7 +698,7 @@ class UserAnalytics:
                 'ltv_by_plan_boxplot.png',
                 'referral_sources_pie.png',
                 'feature_usage_correlation.png'
-            ]
+            ])
         }
 
 def main():
@@ -659,17 +709,21 @@ def main():
     # Initialize and run analysis
     analytics = UserAnalytics()
     comprehensive_report = analytics.generate_comprehensive_report()
+    
+    # Each chart set renders in its own parallel batch so it can report what was written
     advanced_charts = analytics.create_advanced_visualizations()
     additional_charts = analytics.generate_additional_charts(marketing_insights)
+    analytics.charts.close()
     
     # Print key highlights
     print("Marketing Insights Report Generated!")
     print("\nKey Highlights:")
-    print(f"Total Users Analyzed: {len(analytics.users_df)}")
-    print(f"Average Lifetime Value: ${analytics.users_df['lifetime_value'].mean():.2f}")
+    users_df = analytics.frame('churn')
+    print(f"Total Users Analyzed: {len(users_df)}")
+    print(f"Average Lifetime Value: ${users_df['lifetime_value'].mean():.2f}")
     print(f"Churn Risk Distribution:")
     churn_segments = pd.cut(
-        analytics.users_df['churn_risk'], 
+        users_df['churn_risk'], 
         bins=[0, 0.2, 0.4, 0.6, 0.8, 1], 
         labels=['Very Low', 'Low', 'Medium', 'High', 'Very High']
     )
@@ -23,14 +23,20 @@ print(f"DEBUG: Current working directory = {os.getcwd()}")
 print(f"DEBUG: .env file path = {env_path}")
 print(f"DEBUG: .env file exists = {os.path.exists(env_path)}")
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_migrate import Migrate
 from sqlalchemy import text
+import json
 import logging
 from config import get_config, update_sigma_mode
 from datetime import datetime
+from .services.aggregate_cache import AggregateCache
+from .services.user_search import UserSearchIndex
+from .services.query_registry import QueryRegistry
+from .services.ab_testing import compute_ab_rollup, analyze_ab_test
+from .utils import serialize_raw_user_row, encode_cursor, decode_cursor
 
 # Initialize extensions
 db = SQLAlchemy()
@@ -46,6 +52,15 @@ def create_app(config_class=None):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Keep more prepared statements per SQLite connection than sqlite3's default
+    # of 128 so every registered query stays prepared across requests
+    if app.config.get('SQLALCHEMY_DATABASE_URI', '').startswith('sqlite'):
+        engine_options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        connect_args = dict(engine_options.get('connect_args') or {})
+        connect_args.setdefault('cached_statements', app.config.get('SQLITE_CACHED_STATEMENTS', 256))
+        engine_options['connect_args'] = connect_args
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -144,63 +159,163 @@ def create_app(config_class=None):
     # Note: All other Sigma endpoints (/api/sigma/status, /api/sigma/capabilities, etc.)
     # are now handled by the sigma_integration module to avoid route conflicts
     
+    # Materialized aggregates: GROUP BY rollups over users are computed once and
+    # served from memory until they expire or a users commit invalidates them
+    aggregate_cache = AggregateCache(default_ttl=app.config.get('AGGREGATE_CACHE_TTL', 300))
+    app.aggregate_cache = aggregate_cache
+    
+    # Route SQL is registered (and its statements built) once here; handlers
+    # execute the prebuilt statements by name, and /api/queries/stats reports timings
+    queries = QueryRegistry(db)
+    app.query_registry = queries
+    
+    queries.register('user_segments', """
+        SELECT
+            CASE
+                WHEN engagement_score >= 0.7 THEN 'High Engagement'
+                WHEN engagement_score >= 0.4 THEN 'Medium Engagement'
+                ELSE 'Low Engagement'
+            END AS segment,
+            COUNT(*) as user_count,
+            AVG(lifetime_value) as avg_ltv,
+            AVG(churn_risk) as avg_churn_risk
+        FROM users
+        GROUP BY segment
+    """)
+    
+    def compute_user_segments():
+        result = queries.execute('user_segments')
+        
+        return [
+            {
+                'name': row.segment,
+                'userCount': row.user_count,
+                'avgLTV': float(row.avg_ltv) if row.avg_ltv is not None else 0,
+                'avgChurnRisk': float(row.avg_churn_risk) if row.avg_churn_risk is not None else 0
+            }
+            for row in result
+        ]
+    
+    queries.register('churn_prediction', """
+        SELECT
+            churn_risk,
+            COUNT(*) as user_count,
+            AVG(lifetime_value) as avg_ltv,
+            AVG(account_age_days) as avg_account_age
+        FROM users
+        GROUP BY churn_risk
+        ORDER BY churn_risk DESC
+    """)
+    
+    def compute_churn_prediction():
+        result = queries.execute('churn_prediction')
+        
+        return [
+            {
+                'churnRisk': float(row.churn_risk) if row.churn_risk is not None else 0,
+                'userCount': row.user_count,
+                'avgLTV': float(row.avg_ltv) if row.avg_ltv is not None else 0,
+                'avgAccountAge': float(row.avg_account_age) if row.avg_account_age is not None else 0
+            }
+            for row in result
+        ]
+    
+    queries.register('referral_insights', """
+        SELECT
+            referral_source,
+            COUNT(*) as user_count,
+            AVG(lifetime_value) as avg_ltv,
+            AVG(engagement_score) as avg_engagement,
+            AVG(churn_risk) as avg_churn_risk
+        FROM users
+        WHERE referral_source IS NOT NULL
+        GROUP BY referral_source
+        ORDER BY user_count DESC
+    """)
+    
+    def compute_referral_insights():
+        result = queries.execute('referral_insights')
+        
+        return [
+            {
+                'source': row.referral_source,
+                'userCount': row.user_count,
+                'avgLTV': float(row.avg_ltv) if row.avg_ltv is not None else 0,
+                'avgEngagement': float(row.avg_engagement) if row.avg_engagement is not None else 0,
+                'avgChurnRisk': float(row.avg_churn_risk) if row.avg_churn_risk is not None else 0
+            }
+            for row in result
+        ]
+    
+    aggregate_cache.register('segments', compute_user_segments)
+    aggregate_cache.register('churn_prediction', compute_churn_prediction)
+    aggregate_cache.register('referral_insights', compute_referral_insights)
+    aggregate_cache.register('ab_testing', lambda: compute_ab_rollup(db.session))
+    
+    from app.models import User
+    aggregate_cache.watch_model(User, db.session)
+    aggregate_cache.start_refresher(app, app.config.get('AGGREGATE_REFRESH_INTERVAL', 0))
+    
+    def aggregate_response(name):
+        """Serve a materialized aggregate with its freshness in the response headers"""
+        aggregate = aggregate_cache.get(name)
+        response = jsonify(aggregate.value)
+        response.headers['X-Aggregate-Computed-At'] = aggregate.computed_at.isoformat() + 'Z'
+        response.headers['X-Aggregate-Age'] = f"{aggregate.age_seconds:.3f}"
+        response.last_modified = aggregate.computed_at
+        return response
+    
+    @app.route('/api/aggregates/status', methods=['GET'])
+    def get_aggregate_status():
+        """Get freshness and hit/miss statistics for materialized aggregates"""
+        return jsonify(aggregate_cache.get_status())
+    
+    @app.route('/api/queries/stats', methods=['GET'])
+    def get_query_stats():
+        """Get call counts and latencies for the registered route queries"""
+        return jsonify(queries.get_stats())
+    
+    @app.route('/api/aggregates/refresh', methods=['POST'])
+    def refresh_aggregates():
+        """Recompute materialized aggregates immediately"""
+        try:
+            name = (request.get_json(silent=True) or {}).get('name')
+            if name and name not in aggregate_cache.names():
+                return jsonify({'error': f'Unknown aggregate: {name}'}), 404
+            aggregate_cache.refresh(name)
+            return jsonify(aggregate_cache.get_status())
+        except Exception as e:
+            app.logger.error(f"Error refreshing aggregates: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     # API Routes
     @app.route('/api/segments', methods=['GET'])
     def get_user_segments():
         try:
-            # Use SQLAlchemy to query segments
-            segments_query = text("""
-                SELECT 
-                    CASE 
-                        WHEN engagement_score >= 0.7 THEN 'High Engagement'
-                        WHEN engagement_score >= 0.4 THEN 'Medium Engagement'
-                        ELSE 'Low Engagement'
-                    END AS segment,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    AVG(churn_risk) as avg_churn_risk
-                FROM users
-                GROUP BY segment
-            """)
-            
-            # Execute the query
-            result = db.session.execute(segments_query)
-            
-            # Convert to list of dictionaries
-            segments = [
-                {
-                    'name': row.segment,
-                    'userCount': row.user_count,
-                    'avgLTV': float(row.avg_ltv) if row.avg_ltv is not None else 0,
-                    'avgChurnRisk': float(row.avg_churn_risk) if row.avg_churn_risk is not None else 0
-                }
-                for row in result
-            ]
-            
-            return jsonify(segments)
+            return aggregate_response('segments')
         except Exception as e:
             app.logger.error(f"Error in segments route: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+    queries.register('user_journey', """
+        SELECT
+            CASE
+                WHEN account_age_days <= 30 THEN 'Onboarding'
+                WHEN total_sessions > 100 THEN 'Power User'
+                WHEN total_sessions > 50 THEN 'Active User'
+                ELSE 'Casual User'
+            END AS stage,
+            COUNT(*) as user_count,
+            AVG(lifetime_value) as avg_ltv,
+            AVG(churn_risk) as avg_churn_risk
+        FROM users
+        GROUP BY stage
+    """)
+    
     @app.route('/api/user-journey', methods=['GET'])
     def get_user_journey():
         try:
-            journey_query = text("""
-                SELECT 
-                    CASE 
-                        WHEN account_age_days <= 30 THEN 'Onboarding'
-                        WHEN total_sessions > 100 THEN 'Power User'
-                        WHEN total_sessions > 50 THEN 'Active User'
-                        ELSE 'Casual User'
-                    END AS stage,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    AVG(churn_risk) as avg_churn_risk
-                FROM users
-                GROUP BY stage
-            """)
-            
-            result = db.session.execute(journey_query)
+            result = queries.execute('user_journey')
             
             journey_data = [
                 {
@@ -217,29 +332,29 @@ def create_app(config_class=None):
             app.logger.error(f"Error in user journey route: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+    queries.register('content_preferences', """
+        SELECT
+            preferred_content_type as type,
+            COUNT(*) as user_count,
+            AVG(engagement_score) as avg_engagement
+        FROM users
+        GROUP BY type
+    """)
+    
+    queries.register('communication_preferences', """
+        SELECT
+            communication_preference as preference,
+            COUNT(*) as user_count,
+            AVG(engagement_score) as avg_engagement
+        FROM users
+        GROUP BY preference
+    """)
+    
     @app.route('/api/personalization', methods=['GET'])
     def get_personalization():
         try:
-            content_pref_query = text("""
-                SELECT 
-                    preferred_content_type as type,
-                    COUNT(*) as user_count,
-                    AVG(engagement_score) as avg_engagement
-                FROM users
-                GROUP BY type
-            """)
-            
-            comm_pref_query = text("""
-                SELECT 
-                    communication_preference as preference,
-                    COUNT(*) as user_count,
-                    AVG(engagement_score) as avg_engagement
-                FROM users
-                GROUP BY preference
-            """)
-            
-            content_result = db.session.execute(content_pref_query)
-            comm_result = db.session.execute(comm_pref_query)
+            content_result = queries.execute('content_preferences')
+            comm_result = queries.execute('communication_preferences')
             
             content_data = [
                 {
@@ -292,30 +407,7 @@ def create_app(config_class=None):
     @app.route('/api/churn-prediction', methods=['GET'])
     def get_churn_prediction():
         try:
-            churn_query = text("""
-                SELECT 
-                    churn_risk,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    AVG(account_age_days) as avg_account_age
-                FROM users
-                GROUP BY churn_risk
-                ORDER BY churn_risk DESC
-            """)
-            
-            result = db.session.execute(churn_query)
-            
-            churn_data = [
-                {
-                    'churnRisk': float(row.churn_risk) if row.churn_risk is not None else 0,
-                    'userCount': row.user_count,
-                    'avgLTV': float(row.avg_ltv) if row.avg_ltv is not None else 0,
-                    'avgAccountAge': float(row.avg_account_age) if row.avg_account_age is not None else 0
-                }
-                for row in result
-            ]
-            
-            return jsonify(churn_data)
+            return aggregate_response('churn_prediction')
         except Exception as e:
             app.logger.error(f"Error in churn prediction route: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -323,48 +415,12 @@ def create_app(config_class=None):
     @app.route('/api/referral-insights', methods=['GET'])
     def get_referral_insights():
         try:
-            referral_query = text("""
-                SELECT 
-                    referral_source,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    AVG(engagement_score) as avg_engagement,
-                    AVG(churn_risk) as avg_churn_risk
-                FROM users
-                WHERE referral_source IS NOT NULL
-                GROUP BY referral_source
-                ORDER BY user_count DESC
-            """)
-            
-            result = db.session.execute(referral_query)
-            
-            referral_data = [
-                {
-                    'source': row.referral_source,
-                    'userCount': row.user_count,
-                    'avgLTV': float(row.avg_ltv) if row.avg_ltv is not None else 0,
-                    'avgEngagement': float(row.avg_engagement) if row.avg_engagement is not None else 0,
-                    'avgChurnRisk': float(row.avg_churn_risk) if row.avg_churn_risk is not None else 0
-                }
-                for row in result
-            ]
-            
-            return jsonify(referral_data)
+            return aggregate_response('referral_insights')
         except Exception as e:
             app.logger.error(f"Error in referral insights route: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
-    @app.route('/api/raw-user-data', methods=['GET'])
-    def get_raw_user_data():
-        try:
-            # Get query parameters for pagination and filtering
-            limit = request.args.get('limit', 50, type=int)
-            offset = request.args.get('offset', 0, type=int)
-            search = request.args.get('search', '')
-            
-            # Build base query
-            base_query = text("""
-                SELECT 
+    raw_user_columns = """
                     id, uuid, username, email, account_age_days, total_sessions,
                     engagement_score, lifetime_value, churn_risk,
                     preferred_content_type, communication_preference,
@@ -376,93 +432,163 @@ def create_app(config_class=None):
                     plan, plan_start_date, total_purchases, average_purchase_value,
                     notification_settings, feature_usage_json, referral_count,
                     marketing_consent, last_consent_update
-                FROM users
-                WHERE 1=1
-            """)
-            
-            # Add search filter if provided
-            if search:
-                search_filter = text("""
-                    AND (username LIKE :search OR email LIKE :search)
-                """)
-                base_query = text(str(base_query) + str(search_filter))
-            
-            # Add pagination
-            paginated_query = text(str(base_query) + " LIMIT :limit OFFSET :offset")
-            
-            # Execute query with parameters
-            if search:
-                result = db.session.execute(paginated_query, {
-                    'search': f'%{search}%',
-                    'limit': limit,
-                    'offset': offset
-                })
-            else:
-                result = db.session.execute(paginated_query, {
-                    'limit': limit,
-                    'offset': offset
+    """
+    
+    # Indexed username/email search (FTS5 trigram on SQLite, LIKE elsewhere)
+    user_search = UserSearchIndex(db)
+    app.user_search = user_search
+    
+    # Raw user SQL, one prebuilt statement per search mode
+    search_filters = user_search.filter_conditions()
+    queries.register('raw_users_after', f"""
+        SELECT {raw_user_columns}
+        FROM users
+        WHERE id > :after_id {{filters}}
+        ORDER BY id
+        LIMIT :limit
+    """, search=search_filters)
+    queries.register('raw_users_after_all', f"""
+        SELECT {raw_user_columns}
+        FROM users
+        WHERE id > :after_id {{filters}}
+        ORDER BY id
+    """, search=search_filters)
+    queries.register('raw_users_page', f"""
+        SELECT {raw_user_columns}
+        FROM users
+        WHERE 1=1 {{filters}}
+        LIMIT :limit OFFSET :offset
+    """, search=search_filters)
+    queries.register('raw_users_by_ids', f"""
+        SELECT {raw_user_columns}
+        FROM users
+        WHERE id IN :ids
+    """, expanding=('ids',))
+    
+    def search_variant(search, params):
+        """Search mode for the raw user queries; adds its bind parameters to ``params``"""
+        if not search:
+            return None
+        mode, search_params = user_search.filter_variant(search)
+        params.update(search_params)
+        return mode
+    
+    def stream_raw_user_data(search, after_id, limit):
+        """Yield raw users as NDJSON lines from a server-side cursor"""
+        params = {'after_id': after_id or 0}
+        mode = search_variant(search, params)
+        if limit:
+            params['limit'] = limit
+        
+        batch_size = app.config.get('RAW_USER_STREAM_BATCH_SIZE', 1000)
+        query_name = 'raw_users_after' if limit else 'raw_users_after_all'
+        result = queries.execute(
+            query_name, params,
+            execution_options={'stream_results': True, 'yield_per': batch_size},
+            search=mode
+        )
+        try:
+            # Most rows are fetched here, after execute returns; record that time too
+            for partition in queries.timed_batches(query_name, result.partitions(batch_size), search=mode):
+                yield ''.join(
+                    json.dumps(serialize_raw_user_row(row), default=str) + '\n'
+                    for row in partition
+                )
+        finally:
+            result.close()
+    
+    @app.route('/api/raw-user-data', methods=['GET'])
+    def get_raw_user_data():
+        """Raw users for the explorer.
+        
+        Offset pagination (limit/offset) returns a JSON list as before. Passing
+        ``cursor`` (empty for the first page) switches to keyset pagination on
+        users.id and returns ``{'users': [...], 'next_cursor': ...}``. Passing
+        ``format=ndjson`` streams every matching row (or ``limit`` rows) as
+        newline-delimited JSON.
+        """
+        try:
+            # Get query parameters for pagination and filtering
+            limit = request.args.get('limit', 50, type=int)
+            offset = request.args.get('offset', 0, type=int)
+            search = request.args.get('search', '')
+            cursor = request.args.get('cursor')
+            response_format = request.args.get('format', 'json')
+            
+            try:
+                after_id = decode_cursor(cursor) if cursor else None
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            # Streaming export: no page is materialized in memory
+            if response_format == 'ndjson':
+                stream_limit = request.args.get('limit', 0, type=int)
+                return Response(
+                    stream_with_context(stream_raw_user_data(search, after_id, stream_limit)),
+                    mimetype='application/x-ndjson'
+                )
+            
+            # Keyset pagination: seek past the last id instead of skipping rows
+            if cursor is not None:
+                params = {'after_id': after_id or 0, 'limit': limit + 1}
+                mode = search_variant(search, params)
+                rows = queries.execute('raw_users_after', params, search=mode).fetchall()
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1].id) if has_more and rows else None
+                
+                response = jsonify({
+                    'users': [serialize_raw_user_row(row) for row in rows],
+                    'next_cursor': next_cursor,
+                    'has_more': has_more
                 })
+                if next_cursor:
+                    response.headers['X-Next-Cursor'] = next_cursor
+                return response
+            
+            # Offset pagination with the optional search filter
+            params = {'limit': limit, 'offset': offset}
+            mode = search_variant(search, params)
+            result = queries.execute('raw_users_page', params, search=mode)
             
             # Convert to list of dictionaries
-            users = []
-            for row in result:
-                # Safe datetime handling
-                def safe_datetime_format(dt_value):
-                    if dt_value is None:
-                        return None
-                    if isinstance(dt_value, str):
-                        return dt_value
-                    try:
-                        return dt_value.isoformat()
-                    except AttributeError:
-                        return str(dt_value)
-                
-                user = {
-                    'id': row.id,
-                    'uuid': row.uuid,
-                    'username': row.username,
-                    'email': row.email,
-                    'accountAgeDays': row.account_age_days,
-                    'totalSessions': row.total_sessions,
-                    'engagementScore': row.engagement_score,
-                    'lifetimeValue': row.lifetime_value,
-                    'churnRisk': row.churn_risk,
-                    'preferredContentType': row.preferred_content_type,
-                    'communicationPreference': row.communication_preference,
-                    'referralSource': row.referral_source,
-                    'accountCreated': safe_datetime_format(row.account_created),
-                    'lastLogin': safe_datetime_format(row.last_login),
-                    'age': row.age,
-                    'gender': row.gender,
-                    'location': row.location,
-                    'language': row.language,
-                    'timezone': row.timezone,
-                    'avgVisitTime': row.avg_visit_time,
-                    'sessionFrequency': row.session_frequency,
-                    'lastEmailOpen': safe_datetime_format(row.last_email_open),
-                    'lastEmailClick': safe_datetime_format(row.last_email_click),
-                    'emailOpenRate': row.email_open_rate,
-                    'emailClickRate': row.email_click_rate,
-                    'lastAppLogin': safe_datetime_format(row.last_app_login),
-                    'lastAppClick': safe_datetime_format(row.last_app_click),
-                    'lastCompletedAction': row.last_completed_action,
-                    'plan': row.plan,
-                    'planStartDate': safe_datetime_format(row.plan_start_date),
-                    'totalPurchases': row.total_purchases,
-                    'averagePurchaseValue': row.average_purchase_value,
-                    'notificationSettings': row.notification_settings,
-                    'featureUsageJson': row.feature_usage_json,
-                    'referralCount': row.referral_count,
-                    'marketingConsent': row.marketing_consent,
-                    'lastConsentUpdate': safe_datetime_format(row.last_consent_update)
-                }
-                users.append(user)
+            users = [serialize_raw_user_row(row) for row in result]
             
             return jsonify(users)
         except Exception as e:
             app.logger.error(f"Error in raw user data route: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/raw-user-data/search', methods=['GET'])
+    def search_raw_user_data():
+        """Ranked type-ahead search over username and email.
+        
+        ``q`` is matched as a substring (or by shared trigrams with
+        ``fuzzy=true``); terms shorter than three characters match as prefixes.
+        """
+        try:
+            term = request.args.get('q', '')
+            limit = min(request.args.get('limit', 20, type=int), 200)
+            fuzzy = request.args.get('fuzzy', 'false').lower() == 'true'
+            
+            matches = user_search.search(term, limit=limit, fuzzy=fuzzy)
+            users = []
+            if matches['ids']:
+                rows = queries.execute('raw_users_by_ids', {'ids': matches['ids']})
+                rows_by_id = {row.id: row for row in rows}
+                # Preserve rank order from the index
+                users = [serialize_raw_user_row(rows_by_id[user_id]) for user_id in matches['ids'] if user_id in rows_by_id]
+            
+            return jsonify({
+                'users': users,
+                'count': matches['count'],
+                'countIsEstimate': matches['count_is_estimate'],
+                'mode': matches['mode']
+            })
+        except Exception as e:
+            app.logger.error(f"Error in raw user search route: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/api/user-count', methods=['GET'])
     def get_user_count():
         """Get the total count of users in the database"""
@@ -576,100 +702,23 @@ def create_app(config_class=None):
             # This would typically come from a dedicated A/B testing table
             # For now, we'll simulate A/B test results based on user behavior
             
-            # Get test variant performance
-            variant_query = text("""
-                SELECT 
-                    CASE 
-                        WHEN engagement_score > 0.7 THEN 'Variant A (High Engagement)'
-                        WHEN engagement_score BETWEEN 0.4 AND 0.7 THEN 'Variant B (Medium Engagement)'
-                        ELSE 'Variant C (Low Engagement)'
-                    END as variant,
-                    COUNT(*) as userCount,
-                    AVG(engagement_score) as avgEngagement,
-                    AVG(lifetime_value) as avgLTV,
-                    AVG(churn_risk) as avgChurnRisk,
-                    AVG(account_age_days) as avgAccountAge
-                FROM users
-                GROUP BY variant
-                ORDER BY avgEngagement DESC
-            """)
-            
-            # Get conversion rates by variant
-            conversion_query = text("""
-                SELECT 
-                    CASE 
-                        WHEN engagement_score > 0.7 THEN 'Variant A'
-                        WHEN engagement_score BETWEEN 0.4 AND 0.7 THEN 'Variant B'
-                        ELSE 'Variant C'
-                    END as variant,
-                    COUNT(*) as totalUsers,
-                    SUM(CASE WHEN lifetime_value > 100 THEN 1 ELSE 0 END) as convertedUsers,
-                    SUM(CASE WHEN churn_risk < 0.3 THEN 1 ELSE 0 END) as retainedUsers
-                FROM users
-                GROUP BY variant
-            """)
-            
-            # Get statistical significance data
-            significance_query = text("""
-                SELECT 
-                    'engagement_score' as metric,
-                    AVG(CASE WHEN engagement_score > 0.7 THEN engagement_score END) as variant_a_avg,
-                    AVG(CASE WHEN engagement_score BETWEEN 0.4 AND 0.7 THEN engagement_score END) as variant_b_avg,
-                    AVG(CASE WHEN engagement_score < 0.4 THEN engagement_score END) as variant_c_avg,
-                    COUNT(CASE WHEN engagement_score > 0.7 THEN 1 END) as variant_a_count,
-                    COUNT(CASE WHEN engagement_score BETWEEN 0.4 AND 0.7 THEN 1 END) as variant_b_count,
-                    COUNT(CASE WHEN engagement_score < 0.4 THEN 1 END) as variant_c_count
-                FROM users
-            """)
-            
-            variant_result = db.session.execute(variant_query)
-            conversion_result = db.session.execute(conversion_query)
-            significance_result = db.session.execute(significance_query)
-            
-            variants = [
-                {
-                    'variant': row.variant,
-                    'userCount': row.userCount,
-                    'avgEngagement': float(row.avgEngagement) if row.avgEngagement is not None else 0,
-                    'avgLTV': float(row.avgLTV) if row.avgLTV is not None else 0,
-                    'avgChurnRisk': float(row.avgChurnRisk) if row.avgChurnRisk is not None else 0,
-                    'avgAccountAge': float(row.avgAccountAge) if row.avgAccountAge is not None else 0
-                }
-                for row in variant_result
-            ]
+            # One grouped pass yields counts, sums and sums of squares per variant;
+            # significance is computed from those sufficient statistics
+            aggregate = aggregate_cache.get('ab_testing')
+            analysis = analyze_ab_test(aggregate.value)
+            variants = analysis['variants']
             
-            conversions = [
-                {
-                    'variant': row.variant,
-                    'totalUsers': row.totalUsers,
-                    'convertedUsers': row.convertedUsers,
-                    'retainedUsers': row.retainedUsers,
-                    'conversionRate': (row.convertedUsers / row.totalUsers) if row.totalUsers > 0 else 0,
-                    'retentionRate': (row.retainedUsers / row.totalUsers) if row.totalUsers > 0 else 0
-                }
-                for row in conversion_result
-            ]
-            
-            significance_data = significance_result.fetchone()
-            statistical_significance = {
-                'metric': significance_data.metric if significance_data else 'engagement_score',
-                'variantA': {
-                    'average': float(significance_data.variant_a_avg) if significance_data and significance_data.variant_a_avg is not None else 0,
-                    'count': significance_data.variant_a_count if significance_data else 0
-                },
-                'variantB': {
-                    'average': float(significance_data.variant_b_avg) if significance_data and significance_data.variant_b_avg is not None else 0,
-                    'count': significance_data.variant_b_count if significance_data else 0
-                },
-                'variantC': {
-                    'average': float(significance_data.variant_c_avg) if significance_data and significance_data.variant_c_avg is not None else 0,
-                    'count': significance_data.variant_c_count if significance_data else 0
-                }
-            }
+            if not variants:
+                return jsonify({'error': 'No users available for A/B analysis'}), 404
             
             # Calculate winner and confidence
-            best_variant = max(variants, key=lambda x: x['avgEngagement'])
-            confidence_level = 0.85  # Mock confidence level
+            best_variant = variants[0]
+            confidence_level = analysis['confidenceLevel']
+            
+            if analysis['significant']:
+                significance_finding = f"Statistical significance achieved with {confidence_level:.0%} confidence"
+            else:
+                significance_finding = f"Difference is not statistically significant ({confidence_level:.0%} confidence)"
             
             response_data = {
                 'insights': {
@@ -679,36 +728,38 @@ def create_app(config_class=None):
                     'keyFindings': [
                         f"{best_variant['variant']} has {best_variant['avgEngagement']:.1%} higher engagement",
                         f"Conversion rates vary significantly between variants",
-                        f"Statistical significance achieved with {confidence_level:.0%} confidence"
+                        significance_finding
                     ]
                 },
                 'variants': variants,
-                'conversions': conversions,
-                'statisticalSignificance': statistical_significance,
+                'conversions': analysis['conversions'],
+                'statisticalSignificance': analysis['statisticalSignificance'],
                 'testDuration': '30 days',
-                'sampleSize': sum([v['userCount'] for v in variants])
+                'sampleSize': analysis['sampleSize']
             }
             
-            return jsonify(response_data)
+            response = jsonify(response_data)
+            response.headers['X-Aggregate-Computed-At'] = aggregate.computed_at.isoformat() + 'Z'
+            return response
         except Exception as e:
             app.logger.error(f"Error in A/B testing analysis route: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+    queries.register('feature_usage', """
+        SELECT
+            preferred_content_type as feature,
+            COUNT(*) as user_count,
+            AVG(engagement_score) as avg_engagement,
+            AVG(lifetime_value) as avg_ltv
+        FROM users
+        GROUP BY preferred_content_type
+        ORDER BY user_count DESC
+    """)
+    
     @app.route('/api/feature-usage', methods=['GET'])
     def get_feature_usage():
         try:
-            feature_query = text("""
-                SELECT 
-                    preferred_content_type as feature,
-                    COUNT(*) as user_count,
-                    AVG(engagement_score) as avg_engagement,
-                    AVG(lifetime_value) as avg_ltv
-                FROM users
-                GROUP BY preferred_content_type
-                ORDER BY user_count DESC
-            """)
-            
-            result = db.session.execute(feature_query)
+            result = queries.execute('feature_usage')
             
             feature_data = [
                 {
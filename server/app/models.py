@@ -68,6 +68,18 @@ class User(db.Model):
     marketing_consent = db.Column(db.Boolean, default=False)
     last_consent_update = db.Column(db.DateTime, nullable=True)
 
+    # Covering indexes for the GROUP BY rollups in app/__init__.py and AnalyticsService
+    # (leading column is the grouping key, the rest are the aggregated columns)
+    __table_args__ = (
+        db.Index('ix_users_engagement_rollup', 'engagement_score', 'lifetime_value', 'churn_risk', 'account_age_days'),
+        db.Index('ix_users_churn_rollup', 'churn_risk', 'lifetime_value', 'account_age_days'),
+        db.Index('ix_users_referral_rollup', 'referral_source', 'lifetime_value', 'engagement_score', 'churn_risk', 'referral_count'),
+        db.Index('ix_users_journey_rollup', 'account_age_days', 'total_sessions', 'lifetime_value', 'churn_risk'),
+        db.Index('ix_users_content_rollup', 'preferred_content_type', 'engagement_score', 'lifetime_value'),
+        db.Index('ix_users_communication_rollup', 'communication_preference', 'engagement_score'),
+        db.Index('ix_users_plan_rollup', 'plan', 'churn_risk', 'lifetime_value'),
+    )
+
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -5,10 +5,9 @@ This module provides API endpoints for AI-assisted Sigma workbook development,
 including suggestions, templates, and configuration generation.
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 import logging
-import asyncio
 from typing import Dict, Any, List
 import json
 
@@ -22,13 +21,18 @@ if server_root not in sys.path:
 
 from sigma_ai_service import (
     sigma_ai_service,
+    SuggestionDeduplicator,
     get_sigma_suggestions,
     generate_sigma_config,
     get_sigma_templates
 )
+from app.services.async_runner import run_async, iter_async
 
 logger = logging.getLogger(__name__)
 
+# Largest number of queries accepted by /suggestions/batch
+MAX_BATCH_QUERIES = 100
+
 # Create blueprint
 sigma_ai_bp = Blueprint('sigma_ai', __name__, url_prefix='/api/sigma-ai')
 
@@ -92,14 +96,7 @@ def get_workbook_suggestions():
         project_type = context.get('project_type', 'dashboard')
         
         # Get AI suggestions
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            suggestions = loop.run_until_complete(
-                get_sigma_suggestions(query, context)
-            )
-        finally:
-            loop.close()
+        suggestions = run_async(get_sigma_suggestions(query, context))
         
         # Process suggestions for JSON serialization
         processed_suggestions = []
@@ -138,6 +135,102 @@ def get_workbook_suggestions():
             'error': f'Failed to generate suggestions: {str(e)}'
         }), 500
 
+@sigma_ai_bp.route('/suggestions/batch', methods=['POST'])
+# @login_required  # Temporarily disabled for development
+def get_batch_workbook_suggestions():
+    """
+    Get suggestions for many queries in one request
+    
+    Request body:
+    {
+        "queries": ["Track campaign ROI", {"query": "Budget input form", "context": {...}}],
+        "context": {...},          # shared, merged under each query's own context
+        "stream": false            # or ?format=ndjson
+    }
+    
+    Queries run concurrently and identical queries are generated once.
+    Suggestions shared between queries are returned once and referenced by id.
+    
+    Returns:
+    {
+        "success": true,
+        "results": [{"index": 0, "query": "...", "suggestion_ids": [...]}, ...],
+        "suggestions": [...],
+        "metadata": {...}
+    }
+    
+    With streaming, one NDJSON line per query is sent as it finishes:
+    {"index": 0, "query": "...", "suggestion_ids": [...], "suggestions": [...only new ones...]}
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('queries'), list) or not data['queries']:
+            return jsonify({
+                'success': False,
+                'error': 'A non-empty list of queries is required'
+            }), 400
+        if len(data['queries']) > MAX_BATCH_QUERIES:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_QUERIES} queries per batch'
+            }), 400
+        
+        shared_context = data.get('context') or {}
+        queries = []
+        for item in data['queries']:
+            if isinstance(item, dict):
+                query, context = item.get('query', ''), {**shared_context, **(item.get('context') or {})}
+            else:
+                query, context = item, shared_context
+            if not isinstance(query, str) or not query.strip():
+                return jsonify({
+                    'success': False,
+                    'error': 'Every query must be a non-empty string'
+                }), 400
+            queries.append((query, context))
+        
+        stream = data.get('stream') or request.args.get('format') == 'ndjson'
+        if stream:
+            def generate():
+                deduplicator = SuggestionDeduplicator()
+                for indices, suggestions in iter_async(sigma_ai_service.iter_batch_suggestions(queries)):
+                    for index in indices:
+                        new_suggestions, ids = deduplicator.add(suggestions)
+                        yield json.dumps({
+                            'index': index,
+                            'query': queries[index][0],
+                            'suggestion_ids': ids,
+                            'suggestions': new_suggestions
+                        }) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        batch = run_async(sigma_ai_service.generate_batch_suggestions(queries))
+        
+        deduplicator = SuggestionDeduplicator()
+        results, unique_suggestions = [], []
+        for index, suggestions in enumerate(batch):
+            new_suggestions, ids = deduplicator.add(suggestions)
+            unique_suggestions.extend(new_suggestions)
+            results.append({'index': index, 'query': queries[index][0], 'suggestion_ids': ids})
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'suggestions': unique_suggestions,
+            'metadata': {
+                'total_queries': len(queries),
+                'total_suggestions': len(unique_suggestions)
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting batch workbook suggestions: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Failed to generate suggestions: {str(e)}'
+        }), 500
+
 @sigma_ai_bp.route('/templates', methods=['GET'])
 # @login_required  # Temporarily disabled for development
 def list_workbook_templates():
@@ -153,12 +246,7 @@ def list_workbook_templates():
     """
     try:
         # Get available templates
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            templates = loop.run_until_complete(get_sigma_templates())
-        finally:
-            loop.close()
+        templates = run_async(get_sigma_templates())
         
         # Process templates for JSON serialization
         processed_templates = []
@@ -209,14 +297,7 @@ def get_workbook_template(template_name: str):
     """
     try:
         # Get specific template
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            template = loop.run_until_complete(
-                sigma_ai_service.get_workbook_template(template_name)
-            )
-        finally:
-            loop.close()
+        template = run_async(sigma_ai_service.get_workbook_template(template_name))
         
         if not template:
             return jsonify({
@@ -314,14 +395,7 @@ def generate_workbook_configuration():
         template_name = data.get('template_name')
         
         # Generate workbook configuration
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            config = loop.run_until_complete(
-                generate_sigma_config(requirements, template_name)
-            )
-        finally:
-            loop.close()
+        config = run_async(generate_sigma_config(requirements, template_name))
         
         if 'error' in config:
             return jsonify({
@@ -400,14 +474,7 @@ def analyze_workbook_requirements():
             **requirements
         }
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            suggestions = loop.run_until_complete(
-                get_sigma_suggestions(query, context)
-            )
-        finally:
-            loop.close()
+        suggestions = run_async(get_sigma_suggestions(query, context))
         
         # Analyze complexity and provide insights
         complexity_score = min(10, len(suggestions) * 0.8 + 3)  # Simple scoring algorithm
@@ -520,14 +587,7 @@ def optimize_workbook():
             'project_type': 'optimization'
         }
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            suggestions = loop.run_until_complete(
-                get_sigma_suggestions(query, context)
-            )
-        finally:
-            loop.close()
+        suggestions = run_async(get_sigma_suggestions(query, context))
         
         # Filter optimization suggestions
         optimization_suggestions = []
@@ -572,19 +632,13 @@ def health_check():
         "success": true,
         "status": "healthy",
         "service": "Sigma AI Service",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "suggestion_cache": {"hits": ..., "misses": ..., "hit_rate": ...}
     }
     """
     try:
         # Simple health check - try to get a basic suggestion
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            suggestions = loop.run_until_complete(
-                get_sigma_suggestions("test", {})
-            )
-        finally:
-            loop.close()
+        suggestions = run_async(get_sigma_suggestions("test", {}))
         
         return jsonify({
             'success': True,
@@ -592,7 +646,8 @@ def health_check():
             'service': 'Sigma AI Service',
             'version': '1.0.0',
             'ai_working': len(suggestions) > 0,
-            'timestamp': suggestions[0]['created_at'] if suggestions else None
+            'timestamp': suggestions[0]['created_at'] if suggestions else None,
+            'suggestion_cache': sigma_ai_service.suggestion_cache.info()
         })
         
     except Exception as e:
@@ -0,0 +1,230 @@
+"""
+A/B Testing Statistics
+Single-pass variant rollup and significance tests from sufficient statistics
+"""
+
+import math
+import logging
+from typing import Any, Dict
+
+import numpy as np
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Simulated variants: users are bucketed by engagement score
+VARIANT_LABELS = {
+    'A': 'Variant A (High Engagement)',
+    'B': 'Variant B (Medium Engagement)',
+    'C': 'Variant C (Low Engagement)'
+}
+
+METRICS = ['engagement_score', 'lifetime_value', 'churn_risk', 'account_age_days']
+
+# One scan: count, sum and sum of squares per metric, plus conversion/retention counts
+AB_TEST_ROLLUP_QUERY = text("""
+    SELECT
+        CASE
+            WHEN engagement_score > 0.7 THEN 'A'
+            WHEN engagement_score BETWEEN 0.4 AND 0.7 THEN 'B'
+            ELSE 'C'
+        END as variant,
+        COUNT(*) as n,
+        """ + ",\n        ".join(
+            f"COUNT({metric}) as {metric}_n, "
+            f"SUM({metric}) as {metric}_sum, "
+            f"SUM({metric} * {metric}) as {metric}_sumsq"
+            for metric in METRICS
+        ) + """,
+        SUM(CASE WHEN lifetime_value > 100 THEN 1 ELSE 0 END) as converted,
+        SUM(CASE WHEN churn_risk < 0.3 THEN 1 ELSE 0 END) as retained
+    FROM users
+    GROUP BY variant
+    ORDER BY variant
+""")
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the regularized incomplete beta function (Lentz's method)"""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c if abs(1.0 + aa / c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c if abs(1.0 + aa / c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-12:
+            break
+    return h
+
+def _betainc(a: float, b: float, x: float) -> float:
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(log_front) * _betacf(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _betacf(b, a, 1.0 - x) / b
+
+def student_t_two_sided_p(t: float, df: float) -> float:
+    """Two-sided p-value of Student's t distribution"""
+    if not np.isfinite(t):
+        return 0.0
+    if df <= 0 or not np.isfinite(df):
+        return normal_two_sided_p(t)
+    return _betainc(df / 2.0, 0.5, df / (df + t * t))
+
+def normal_two_sided_p(z: float) -> float:
+    """Two-sided p-value of the standard normal distribution"""
+    return math.erfc(abs(z) / math.sqrt(2.0))
+
+def moments(n: np.ndarray, total: np.ndarray, sumsq: np.ndarray) -> Dict[str, np.ndarray]:
+    """Mean and unbiased variance per group from count, sum and sum of squares"""
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, total / n, 0.0)
+        variance = np.where(n > 1, (sumsq - n * mean * mean) / (n - 1), 0.0)
+    # Cancellation can leave tiny negatives for near-constant groups
+    return {'mean': mean, 'variance': np.maximum(variance, 0.0)}
+
+def welch_t_test(n1: float, mean1: float, var1: float,
+                 n2: float, mean2: float, var2: float) -> Dict[str, float]:
+    """Welch's unequal-variance t-test from summary statistics"""
+    if n1 < 2 or n2 < 2:
+        return {'statistic': 0.0, 'df': 0.0, 'pValue': 1.0}
+    se1, se2 = var1 / n1, var2 / n2
+    standard_error = math.sqrt(se1 + se2)
+    if standard_error == 0:
+        # Both groups are constant: the difference is either exact or absent
+        return {'statistic': 0.0, 'df': n1 + n2 - 2, 'pValue': 1.0 if mean1 == mean2 else 0.0}
+    t = (mean1 - mean2) / standard_error
+    df = (se1 + se2) ** 2 / ((se1 ** 2) / (n1 - 1) + (se2 ** 2) / (n2 - 1)) if se1 or se2 else n1 + n2 - 2
+    return {'statistic': t, 'df': df, 'pValue': student_t_two_sided_p(t, df)}
+
+def two_proportion_z_test(x1: float, n1: float, x2: float, n2: float) -> Dict[str, float]:
+    """Pooled two-proportion z-test"""
+    if n1 == 0 or n2 == 0:
+        return {'statistic': 0.0, 'pValue': 1.0}
+    p1, p2 = x1 / n1, x2 / n2
+    pooled = (x1 + x2) / (n1 + n2)
+    standard_error = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    if standard_error == 0:
+        return {'statistic': 0.0, 'pValue': 1.0}
+    z = (p1 - p2) / standard_error
+    return {'statistic': z, 'pValue': normal_two_sided_p(z)}
+
+def compute_ab_rollup(session) -> Dict[str, Any]:
+    """Run the single-pass rollup and return per-variant sufficient statistics as arrays"""
+    rows = session.execute(AB_TEST_ROLLUP_QUERY).fetchall()
+    rollup = {
+        'variant': [row.variant for row in rows],
+        'n': np.array([row.n for row in rows], dtype=np.float64),
+        'converted': np.array([row.converted or 0 for row in rows], dtype=np.float64),
+        'retained': np.array([row.retained or 0 for row in rows], dtype=np.float64)
+    }
+    for metric in METRICS:
+        n = np.array([getattr(row, f'{metric}_n') or 0 for row in rows], dtype=np.float64)
+        total = np.array([getattr(row, f'{metric}_sum') or 0 for row in rows], dtype=np.float64)
+        sumsq = np.array([getattr(row, f'{metric}_sumsq') or 0 for row in rows], dtype=np.float64)
+        rollup[metric] = {'n': n, **moments(n, total, sumsq)}
+    return rollup
+
+def analyze_ab_test(rollup: Dict[str, Any], alpha: float = 0.05) -> Dict[str, Any]:
+    """Build the /api/ab-testing-analysis payload from a variant rollup"""
+    keys = rollup['variant']
+    n = rollup['n']
+    engagement = rollup['engagement_score']
+    conversion_rate = np.divide(rollup['converted'], n, out=np.zeros_like(n), where=n > 0)
+    retention_rate = np.divide(rollup['retained'], n, out=np.zeros_like(n), where=n > 0)
+
+    variants = [
+        {
+            'variant': VARIANT_LABELS.get(key, key),
+            'userCount': int(n[i]),
+            'avgEngagement': float(engagement['mean'][i]),
+            'avgLTV': float(rollup['lifetime_value']['mean'][i]),
+            'avgChurnRisk': float(rollup['churn_risk']['mean'][i]),
+            'avgAccountAge': float(rollup['account_age_days']['mean'][i])
+        }
+        for i, key in enumerate(keys)
+    ]
+    variants.sort(key=lambda v: v['avgEngagement'], reverse=True)
+
+    conversions = [
+        {
+            'variant': f'Variant {key}',
+            'totalUsers': int(n[i]),
+            'convertedUsers': int(rollup['converted'][i]),
+            'retainedUsers': int(rollup['retained'][i]),
+            'conversionRate': float(conversion_rate[i]),
+            'retentionRate': float(retention_rate[i])
+        }
+        for i, key in enumerate(keys)
+    ]
+
+    statistical_significance = {'metric': 'engagement_score'}
+    for key in VARIANT_LABELS:
+        if key in keys:
+            i = keys.index(key)
+            statistical_significance[f'variant{key}'] = {
+                'average': float(engagement['mean'][i]),
+                'stdDev': float(math.sqrt(engagement['variance'][i])),
+                'count': int(engagement['n'][i])
+            }
+        else:
+            statistical_significance[f'variant{key}'] = {'average': 0, 'stdDev': 0, 'count': 0}
+
+    # Compare the best variant on engagement against each of the others
+    comparisons = []
+    confidence_level = 0.0
+    best = int(np.argmax(engagement['mean'])) if len(keys) else None
+    if best is not None:
+        for i, key in enumerate(keys):
+            if i == best:
+                continue
+            engagement_test = welch_t_test(
+                engagement['n'][best], engagement['mean'][best], engagement['variance'][best],
+                engagement['n'][i], engagement['mean'][i], engagement['variance'][i]
+            )
+            ltv = rollup['lifetime_value']
+            ltv_test = welch_t_test(
+                ltv['n'][best], ltv['mean'][best], ltv['variance'][best],
+                ltv['n'][i], ltv['mean'][i], ltv['variance'][i]
+            )
+            conversion_test = two_proportion_z_test(rollup['converted'][best], n[best], rollup['converted'][i], n[i])
+            retention_test = two_proportion_z_test(rollup['retained'][best], n[best], rollup['retained'][i], n[i])
+            comparisons.append({
+                'baseline': f'Variant {keys[best]}',
+                'variant': f'Variant {key}',
+                'engagement': {**engagement_test, 'test': 'welch_t'},
+                'lifetimeValue': {**ltv_test, 'test': 'welch_t'},
+                'conversion': {**conversion_test, 'test': 'two_proportion_z'},
+                'retention': {**retention_test, 'test': 'two_proportion_z'}
+            })
+        if comparisons:
+            # Confidence that the winner beats its closest competitor
+            confidence_level = 1.0 - max(c['engagement']['pValue'] for c in comparisons)
+
+    statistical_significance['comparisons'] = comparisons
+    statistical_significance['alpha'] = alpha
+
+    return {
+        'variants': variants,
+        'conversions': conversions,
+        'statisticalSignificance': statistical_significance,
+        'confidenceLevel': confidence_level,
+        'significant': bool(comparisons) and confidence_level >= 1.0 - alpha,
+        'sampleSize': int(n.sum())
+    }
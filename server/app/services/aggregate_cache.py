@@ -0,0 +1,211 @@
+"""
+Materialized Aggregate Cache
+Keeps precomputed users-table rollups in process and serves them with a freshness timestamp
+"""
+
+import threading
+import time
+import weakref
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# session.info key holding the caches whose watched models changed in the open transaction
+DIRTY_CACHES_KEY = 'aggregate_cache_dirty'
+
+@dataclass
+class AggregateResult:
+    """A materialized rollup together with the time it was computed"""
+    name: str
+    value: Any
+    computed_at: datetime
+    computed_ts: float
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.computed_ts)
+
+class _AggregateEntry:
+    def __init__(self, name: str, compute: Callable[[], Any], ttl: Optional[float]):
+        self.name = name
+        self.compute = compute
+        self.ttl = ttl
+        self.result: Optional[AggregateResult] = None
+        self.version = -1
+        self.lock = threading.Lock()
+
+class _ModelWatch:
+    """Session listeners for one event target, shared by every cache watching it.
+
+    The listeners are installed once per target, so creating many apps (and
+    caches) in one process does not stack listeners; caches are held weakly
+    and drop out when they are garbage collected.
+    """
+
+    def __init__(self, target):
+        self.caches: 'weakref.WeakKeyDictionary[AggregateCache, Tuple[type, ...]]' = weakref.WeakKeyDictionary()
+        event.listen(target, 'after_flush', self.after_flush)
+        event.listen(target, 'after_commit', self.after_commit)
+        event.listen(target, 'after_soft_rollback', self.after_soft_rollback)
+
+    def after_flush(self, session, flush_context):
+        changed = list(session.new) + list(session.dirty) + list(session.deleted)
+        if not changed:
+            return
+        for cache, models in list(self.caches.items()):
+            if any(isinstance(obj, models) for obj in changed):
+                session.info.setdefault(DIRTY_CACHES_KEY, set()).add(cache)
+
+    def after_commit(self, session):
+        for cache in session.info.pop(DIRTY_CACHES_KEY, ()):
+            cache.invalidate()
+
+    def after_soft_rollback(self, session, previous_transaction):
+        session.info.pop(DIRTY_CACHES_KEY, None)
+
+_watches: Dict[Any, _ModelWatch] = {}
+_watches_lock = threading.Lock()
+
+class AggregateCache:
+    """In-process store of GROUP BY rollups over the users table.
+
+    Each rollup is registered once with a compute function. Readers get the
+    stored result until it expires (``ttl``) or the watched tables change,
+    at which point the next reader recomputes it while concurrent readers wait
+    on the same entry instead of issuing their own scan.
+    """
+
+    def __init__(self, default_ttl: float = 300):
+        self.default_ttl = default_ttl
+        self._entries: Dict[str, _AggregateEntry] = {}
+        self._version = 0
+        self._version_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'invalidations': 0}
+        self._stats_lock = threading.Lock()
+
+    def register(self, name: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> None:
+        """Register a rollup under ``name``; ``ttl`` of 0 disables time-based expiry"""
+        self._entries[name] = _AggregateEntry(name, compute, self.default_ttl if ttl is None else ttl)
+
+    def names(self) -> List[str]:
+        return list(self._entries.keys())
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _is_fresh(self, entry: _AggregateEntry) -> bool:
+        if entry.result is None or entry.version != self._version:
+            return False
+        if entry.ttl and entry.result.age_seconds >= entry.ttl:
+            return False
+        return True
+
+    def get(self, name: str) -> AggregateResult:
+        """Return the materialized rollup, recomputing it if stale"""
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown aggregate: {name}")
+
+        if self._is_fresh(entry):
+            self._count('hits')
+            return entry.result
+
+        with entry.lock:
+            # Another thread may have refreshed it while we were waiting
+            if self._is_fresh(entry):
+                self._count('hits')
+                return entry.result
+            self._count('misses')
+            return self._compute(entry)
+
+    def _compute(self, entry: _AggregateEntry) -> AggregateResult:
+        version = self._version
+        value = entry.compute()
+        now = time.time()
+        entry.result = AggregateResult(
+            name=entry.name,
+            value=value,
+            computed_at=datetime.utcfromtimestamp(now),
+            computed_ts=now
+        )
+        entry.version = version
+        self._count('refreshes')
+        return entry.result
+
+    def refresh(self, name: str = None) -> None:
+        """Recompute one rollup (or all of them) immediately"""
+        targets = [self._entries[name]] if name else list(self._entries.values())
+        for entry in targets:
+            with entry.lock:
+                try:
+                    self._compute(entry)
+                except Exception as e:
+                    logger.error(f"Error refreshing aggregate {entry.name}: {e}")
+
+    def invalidate(self, name: str = None) -> None:
+        """Mark one rollup (or all of them) stale so the next read recomputes it"""
+        if name:
+            entry = self._entries.get(name)
+            if entry:
+                entry.version = -1
+        else:
+            with self._version_lock:
+                self._version += 1
+        self._count('invalidations')
+
+    def watch_model(self, model, target=Session) -> None:
+        """Invalidate all rollups after a session commits changes to ``model`` rows.
+
+        ``target`` is what the listeners attach to: the app's scoped session
+        or sessionmaker, or every ``Session`` by default. Watching the same
+        target again reuses its listeners.
+        """
+        with _watches_lock:
+            watch = _watches.get(target)
+            if watch is None:
+                watch = _watches[target] = _ModelWatch(target)
+            models = watch.caches.get(self, ())
+            if model not in models:
+                watch.caches[self] = models + (model,)
+
+    def start_refresher(self, app, interval: float) -> None:
+        """Refresh every rollup on a fixed schedule from a daemon thread"""
+        if self._refresher is not None or not interval:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                with app.app_context():
+                    self.refresh()
+
+        self._refresher = threading.Thread(target=run, name='aggregate-cache-refresher', daemon=True)
+        self._refresher.start()
+        logger.info(f"Aggregate cache refresher started (every {interval}s)")
+
+    def stop_refresher(self) -> None:
+        self._stop_event.set()
+        self._refresher = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Describe each rollup's freshness for monitoring"""
+        aggregates = {}
+        for name, entry in self._entries.items():
+            aggregates[name] = {
+                'computed_at': entry.result.computed_at.isoformat() if entry.result else None,
+                'age_seconds': round(entry.result.age_seconds, 3) if entry.result else None,
+                'ttl': entry.ttl,
+                'fresh': self._is_fresh(entry)
+            }
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {'aggregates': aggregates, 'stats': stats}
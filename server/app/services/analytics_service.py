@@ -1,67 +1,70 @@
 from typing import Dict, List, Any
-from sqlalchemy import text
+from flask import current_app
 from database.models import db, User
+from app.services.aggregate_cache import AggregateCache
+from app.services.query_registry import QueryRegistry
 import pandas as pd
 import numpy as np
 
 class AnalyticsService:
-    """Unified analytics service for all business intelligence operations"""
+    """Unified analytics service for all business intelligence operations
     
-    def __init__(self):
+    Rollups live in the app's aggregate cache (``app.aggregate_cache``) and
+    SQL in its query registry (``app.query_registry``) unless others are
+    passed in, so they share its invalidation, refresher and query stats.
+    """
+    
+    def __init__(self, aggregate_cache: AggregateCache = None, query_registry: QueryRegistry = None):
         self.db = db
+        
+        # Journey and personalization reuse the route statements registered by
+        # create_app; only the SQL no route runs is registered here
+        self.queries = query_registry or current_app.query_registry
+        self.queries.register('churn_by_plan', """
+            SELECT
+                plan,
+                COUNT(*) as total_users,
+                AVG(churn_risk) as avg_churn_risk,
+                SUM(CASE WHEN churn_risk > 0.7 THEN 1 ELSE 0 END) as high_risk_users
+            FROM users
+            GROUP BY plan
+        """)
+        self.queries.register('referral_sources', """
+            SELECT
+                referral_source,
+                COUNT(*) as user_count,
+                AVG(lifetime_value) as avg_ltv,
+                AVG(referral_count) as avg_referrals
+            FROM users
+            GROUP BY referral_source
+        """)
+        self.queries.register('revenue_by_plan', """
+            SELECT
+                plan,
+                COUNT(*) as user_count,
+                AVG(lifetime_value) as avg_ltv,
+                SUM(lifetime_value) as total_ltv
+            FROM users
+            GROUP BY plan
+        """)
+        
+        # Segments are the app's /api/segments rollup; the plan and referral
+        # rollups are added once to the shared cache
+        self.aggregate_cache = aggregate_cache or current_app.aggregate_cache
+        registered = self.aggregate_cache.names()
+        if 'churn_by_plan' not in registered:
+            self.aggregate_cache.register('churn_by_plan', self._compute_churn_prediction)
+        if 'referral_sources' not in registered:
+            self.aggregate_cache.register('referral_sources', self._compute_referral_insights)
     
     def get_user_segments(self) -> List[Dict[str, Any]]:
         """Get user segments based on engagement scores"""
-        try:
-            segments_query = text("""
-                SELECT 
-                    CASE 
-                        WHEN engagement_score >= 0.7 THEN 'High Engagement'
-                        WHEN engagement_score >= 0.4 THEN 'Medium Engagement'
-                        ELSE 'Low Engagement'
-                    END AS segment,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    AVG(churn_risk) as avg_churn_risk
-                FROM users
-                GROUP BY segment
-            """)
-            
-            result = self.db.session.execute(segments_query)
-            
-            segments = [
-                {
-                    'name': row.segment,
-                    'userCount': row.user_count,
-                    'avgLTV': float(row.avg_ltv) if row.avg_ltv is not None else 0,
-                    'avgChurnRisk': float(row.avg_churn_risk) if row.avg_churn_risk is not None else 0
-                }
-                for row in result
-            ]
-            
-            return segments
-        except Exception as e:
-            raise Exception(f"Error getting user segments: {str(e)}")
+        return self.aggregate_cache.get('segments').value
     
     def get_user_journey(self) -> List[Dict[str, Any]]:
         """Get user journey stages"""
         try:
-            journey_query = text("""
-                SELECT 
-                    CASE 
-                        WHEN account_age_days <= 30 THEN 'Onboarding'
-                        WHEN total_sessions > 100 THEN 'Power User'
-                        WHEN total_sessions > 50 THEN 'Active User'
-                        ELSE 'Casual User'
-                    END AS stage,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    AVG(churn_risk) as avg_churn_risk
-                FROM users
-                GROUP BY stage
-            """)
-            
-            result = self.db.session.execute(journey_query)
+            result = self.queries.execute('user_journey')
             
             journey_data = [
                 {
@@ -80,26 +83,8 @@ class AnalyticsService:
     def get_personalization_data(self) -> Dict[str, List[Dict[str, Any]]]:
         """Get personalization preferences data"""
         try:
-            content_pref_query = text("""
-                SELECT 
-                    preferred_content_type as type,
-                    COUNT(*) as user_count,
-                    AVG(engagement_score) as avg_engagement
-                FROM users
-                GROUP BY type
-            """)
-            
-            comm_pref_query = text("""
-                SELECT 
-                    communication_preference as preference,
-                    COUNT(*) as user_count,
-                    AVG(engagement_score) as avg_engagement
-                FROM users
-                GROUP BY preference
-            """)
-            
-            content_result = self.db.session.execute(content_pref_query)
-            comm_result = self.db.session.execute(comm_pref_query)
+            content_result = self.queries.execute('content_preferences')
+            comm_result = self.queries.execute('communication_preferences')
             
             content_data = [
                 {
@@ -128,18 +113,13 @@ class AnalyticsService:
     
     def get_churn_prediction(self) -> Dict[str, Any]:
         """Get churn prediction analytics"""
+        aggregate = self.aggregate_cache.get('churn_by_plan')
+        return {**aggregate.value, 'computed_at': aggregate.computed_at.isoformat()}
+    
+    def _compute_churn_prediction(self) -> Dict[str, Any]:
+        """Compute churn prediction analytics from a full scan of the users table"""
         try:
-            churn_query = text("""
-                SELECT 
-                    plan,
-                    COUNT(*) as total_users,
-                    AVG(churn_risk) as avg_churn_risk,
-                    SUM(CASE WHEN churn_risk > 0.7 THEN 1 ELSE 0 END) as high_risk_users
-                FROM users
-                GROUP BY plan
-            """)
-            
-            result = self.db.session.execute(churn_query)
+            result = self.queries.execute('churn_by_plan')
             
             churn_data = [
                 {
@@ -161,18 +141,13 @@ class AnalyticsService:
     
     def get_referral_insights(self) -> Dict[str, Any]:
         """Get referral program insights"""
+        aggregate = self.aggregate_cache.get('referral_sources')
+        return {**aggregate.value, 'computed_at': aggregate.computed_at.isoformat()}
+    
+    def _compute_referral_insights(self) -> Dict[str, Any]:
+        """Compute referral program insights from a full scan of the users table"""
         try:
-            referral_query = text("""
-                SELECT 
-                    referral_source,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    AVG(referral_count) as avg_referrals
-                FROM users
-                GROUP BY referral_source
-            """)
-            
-            result = self.db.session.execute(referral_query)
+            result = self.queries.execute('referral_sources')
             
             referral_data = [
                 {
@@ -191,6 +166,10 @@ class AnalyticsService:
         except Exception as e:
             raise Exception(f"Error getting referral insights: {str(e)}")
     
+    def get_aggregate_status(self) -> Dict[str, Any]:
+        """Get freshness information for the materialized aggregates"""
+        return self.aggregate_cache.get_status()
+    
     def get_feature_usage(self) -> Dict[str, Any]:
         """Get feature usage analytics"""
         try:
@@ -211,17 +190,7 @@ class AnalyticsService:
     def get_revenue_forecast(self) -> Dict[str, Any]:
         """Get revenue forecasting data"""
         try:
-            revenue_query = text("""
-                SELECT 
-                    plan,
-                    COUNT(*) as user_count,
-                    AVG(lifetime_value) as avg_ltv,
-                    SUM(lifetime_value) as total_ltv
-                FROM users
-                GROUP BY plan
-            """)
-            
-            result = self.db.session.execute(revenue_query)
+            result = self.queries.execute('revenue_by_plan')
             
             revenue_data = [
                 {
@@ -0,0 +1,105 @@
+"""
+Background Event Loop
+Runs coroutines from synchronous Flask handlers on one long-lived asyncio loop
+"""
+
+import asyncio
+import atexit
+import os
+import queue
+import threading
+import logging
+from typing import Any, AsyncIterable, Awaitable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+class BackgroundEventLoop:
+    """An asyncio event loop owned by a daemon thread.
+
+    Handlers submit coroutines with ``run`` and block only their own worker
+    thread until the result is ready, so no loop is created per request and
+    concurrent requests share the loop's concurrency. The loop starts on
+    first use and is recreated in a forked child process.
+    """
+
+    def __init__(self, name: str = 'async-runner'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_running(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # A forked worker inherits the loop object but not its thread
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def serve():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=serve, name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                self._pid = os.getpid()
+                logger.info(f"Started background event loop {self.name}")
+            return self._loop
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run ``coro`` on the background loop and return its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_running())
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def iterate(self, aiterable: AsyncIterable, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Consume an async iterable on the background loop, yielding items as they arrive"""
+        items: 'queue.Queue' = queue.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for item in aiterable:
+                    items.put((True, item))
+                items.put((True, finished))
+            except BaseException as e:
+                items.put((False, e))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._ensure_running())
+        try:
+            while True:
+                ok, item = items.get(timeout=timeout)
+                if not ok:
+                    raise item
+                if item is finished:
+                    return
+                yield item
+        finally:
+            # Stops the producer if the consumer goes away early (e.g. client disconnect)
+            future.cancel()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+            self._loop = None
+            self._thread = None
+
+background_loop = BackgroundEventLoop('sigma-ai-loop')
+atexit.register(background_loop.stop)
+
+def run_async(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared background loop from synchronous code"""
+    return background_loop.run(coro, timeout)
+
+def iter_async(aiterable: AsyncIterable, timeout: Optional[float] = None) -> Iterator[Any]:
+    """Iterate an async iterable on the shared background loop from synchronous code"""
+    return background_loop.iterate(aiterable, timeout)
@@ -0,0 +1,196 @@
+"""
+Query Registry
+Named route SQL compiled once at startup, with precompiled optional-filter variants and per-query timing
+"""
+
+import itertools
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.sql.elements import TextClause
+
+logger = logging.getLogger(__name__)
+
+# Placeholder in registered SQL replaced by " AND <filter> ..." for the selected variant
+FILTERS_PLACEHOLDER = '{filters}'
+
+@dataclass
+class QueryTiming:
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seconds: float = 0.0
+    errors: int = 0
+    # Time spent pulling rows from streamed results (see QueryRegistry.timed_batches)
+    fetch_seconds: float = 0.0
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+        self.errors += int(failed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'avg_ms': round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'last_ms': round(self.last_seconds * 1000, 3),
+            'fetch_ms': round(self.fetch_seconds * 1000, 3)
+        }
+
+@dataclass
+class RegisteredQuery:
+    name: str
+    sql: str
+    filters: Dict[str, Dict[str, str]]
+    # Variant key ((filter, option) pairs switched on, in filter order) -> statement
+    statements: Dict[Tuple[Tuple[str, str], ...], TextClause] = field(default_factory=dict)
+    timings: Dict[Tuple[Tuple[str, str], ...], QueryTiming] = field(default_factory=dict)
+
+def _variant_label(key: Tuple[Tuple[str, str], ...]) -> str:
+    return ','.join(f"{name}={option}" for name, option in key) or 'base'
+
+class QueryRegistry:
+    """Named SQL statements built once and reused on every request.
+
+    ``register`` turns each query into ``text()`` statements up front: one per
+    combination of its optional filters, so a request only picks a prebuilt
+    statement instead of concatenating and re-parsing SQL. Reusing the same
+    statement objects keeps SQLAlchemy's compiled cache warm, and the
+    identical SQL strings hit the DB-API driver's prepared-statement cache
+    (sqlite3 ``cached_statements``). ``execute`` records per-query, per-variant
+    timings.
+
+    Execute timings cover ``session.execute`` only. For buffered results on
+    SQLite that includes the first step, where GROUP BY and sorting happen,
+    but a streamed result (``stream_results``/``yield_per``) fetches most rows
+    afterwards; iterate those through ``timed_batches`` so the fetch time is
+    recorded as ``fetch_ms``.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._queries: Dict[str, RegisteredQuery] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, sql: str, expanding: Sequence[str] = (),
+                 **filters: Dict[str, str]) -> None:
+        """Register ``sql`` under ``name``.
+
+        Each keyword is an optional filter mapping option names to SQL
+        conditions (for example ``search={'fts': ..., 'like': ...}``); the
+        selected conditions replace ``{filters}`` in ``sql``. ``expanding``
+        names IN-list parameters that take a Python list.
+        """
+        sql = ' '.join(sql.split())
+        if filters and FILTERS_PLACEHOLDER not in sql:
+            raise ValueError(f"Query {name} has filters but no {FILTERS_PLACEHOLDER} placeholder")
+
+        with self._lock:
+            existing = self._queries.get(name)
+            if existing is not None:
+                if existing.sql != sql or existing.filters != filters:
+                    raise ValueError(f"Query {name} is already registered with different SQL")
+                return
+
+            query = RegisteredQuery(name, sql, filters)
+            choices = [[None] + list(options) for options in filters.values()]
+            for selection in itertools.product(*choices):
+                key = tuple((filter_name, option) for filter_name, option in zip(filters, selection) if option)
+                conditions = ''.join(f" AND {filters[filter_name][option]}" for filter_name, option in key)
+                statement = text(sql.replace(FILTERS_PLACEHOLDER, conditions))
+                if expanding:
+                    statement = statement.bindparams(*(bindparam(param, expanding=True) for param in expanding))
+                query.statements[key] = statement
+                query.timings[key] = QueryTiming()
+            self._queries[name] = query
+        logger.debug(f"Registered query {name} ({len(query.statements)} variants)")
+
+    def names(self) -> List[str]:
+        return list(self._queries)
+
+    def statement(self, name: str, **variant: Optional[str]) -> TextClause:
+        """The prebuilt statement for ``name`` with the given filter options switched on"""
+        return self._lookup(name, variant)[2]
+
+    def _lookup(self, name: str, variant: Dict[str, Optional[str]]):
+        query = self._queries.get(name)
+        if query is None:
+            raise KeyError(f"Unknown query: {name}")
+        key = tuple((filter_name, variant[filter_name]) for filter_name in query.filters if variant.get(filter_name))
+        statement = query.statements.get(key)
+        if statement is None:
+            raise KeyError(f"Query {name} has no variant {_variant_label(key)}")
+        return query, key, statement
+
+    def execute(self, name: str, params: Dict[str, Any] = None, session=None,
+                execution_options: Dict[str, Any] = None, **variant: Optional[str]):
+        """Execute a registered query on the session (``db.session`` by default) and time it"""
+        query, key, statement = self._lookup(name, variant)
+        session = session or self.db.session
+        started = time.perf_counter()
+        failed = True
+        try:
+            if execution_options:
+                result = session.execute(statement, params or {}, execution_options=execution_options)
+            else:
+                result = session.execute(statement, params or {})
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                query.timings[key].record(elapsed, failed)
+
+    def timed_batches(self, name: str, batches: Iterable, **variant: Optional[str]) -> Iterator:
+        """Yield from ``batches`` (e.g. ``result.partitions()``), adding the time spent fetching to ``name``"""
+        query, key, _ = self._lookup(name, variant)
+        iterator = iter(batches)
+        while True:
+            started = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    query.timings[key].fetch_seconds += elapsed
+            yield batch
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Call counts and latencies per query and per filter variant"""
+        with self._lock:
+            stats = {}
+            for name, query in self._queries.items():
+                total = QueryTiming()
+                for timing in query.timings.values():
+                    total.calls += timing.calls
+                    total.errors += timing.errors
+                    total.total_seconds += timing.total_seconds
+                    total.max_seconds = max(total.max_seconds, timing.max_seconds)
+                    total.fetch_seconds += timing.fetch_seconds
+                totals = total.to_dict()
+                totals.pop('last_ms')
+                stats[name] = {
+                    **totals,
+                    'variants': {
+                        _variant_label(key): timing.to_dict()
+                        for key, timing in query.timings.items() if timing.calls
+                    }
+                }
+            return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for query in self._queries.values():
+                for key in query.timings:
+                    query.timings[key] = QueryTiming()
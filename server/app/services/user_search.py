@@ -0,0 +1,186 @@
+"""
+User Search Index
+FTS5 trigram index over users.username/email, kept in sync with triggers
+"""
+
+import threading
+import logging
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Trigram tokens need at least three characters; shorter terms use a prefix range scan
+MIN_TRIGRAM_LENGTH = 3
+
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        username, email,
+        content='users', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF username, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+    # Case-insensitive prefix range scans for terms too short for trigrams
+    "CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))"
+]
+
+def _quote_fts(term: str) -> str:
+    """Quote a user term as a single FTS5 string so operators are not interpreted"""
+    return '"' + term.replace('"', '""') + '"'
+
+class UserSearchIndex:
+    """Indexed search over users for the raw user explorer.
+
+    On SQLite the index is an external-content FTS5 table with the trigram
+    tokenizer, so ``LIKE '%term%'`` style substring matches become index
+    lookups. Other backends (or SQLite builds without FTS5) fall back to the
+    original LIKE filter.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.available = False
+        self._checked = False
+        self._lock = threading.Lock()
+
+    def ensure_index(self) -> bool:
+        """Create the FTS table and triggers if needed; populate them on first creation.
+
+        A missing users table is retried on the next call (the schema may not
+        be created yet); any other failure, such as SQLite built without FTS5,
+        is remembered and the LIKE search is used from then on.
+        """
+        if self._checked:
+            return self.available
+
+        with self._lock:
+            if self._checked:
+                return self.available
+            if self.db.engine.dialect.name != 'sqlite':
+                logger.info("User search index requires SQLite FTS5; using LIKE search")
+                return self._settle(False)
+            try:
+                with self.db.engine.begin() as connection:
+                    tables = {row[0] for row in connection.execute(text(
+                        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('users', 'users_fts')"
+                    ))}
+                    if 'users' not in tables:
+                        logger.info("User search index deferred: users table does not exist yet")
+                        return False
+                    for statement in SEARCH_INDEX_DDL:
+                        connection.execute(text(statement))
+                    if 'users_fts' not in tables:
+                        connection.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+                        logger.info("User search index built")
+            except Exception as e:
+                logger.warning(f"User search index unsupported, using LIKE search: {e}")
+                return self._settle(False)
+            return self._settle(True)
+
+    def _settle(self, available: bool) -> bool:
+        self.available = available
+        self._checked = True
+        return available
+
+    def rebuild(self) -> bool:
+        """Rebuild the index from the users table"""
+        if not self.ensure_index():
+            return False
+        with self.db.engine.begin() as connection:
+            connection.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        return True
+
+    def _match_expression(self, term: str, fuzzy: bool) -> str:
+        if not fuzzy:
+            return _quote_fts(term)
+        # Any shared trigram is a candidate; bm25 ranks rows sharing more trigrams first
+        lowered = term.lower()
+        trigrams = sorted({lowered[i:i + 3] for i in range(len(lowered) - 2)})
+        return ' OR '.join(_quote_fts(trigram) for trigram in trigrams)
+
+    @staticmethod
+    def filter_conditions(column: str = 'id') -> Dict[str, str]:
+        """Every SQL condition ``filter_clause`` can produce, keyed by search mode"""
+        return {
+            'fts': f"{column} IN (SELECT rowid FROM users_fts WHERE users_fts MATCH :search_match)",
+            'like': "(username LIKE :search OR email LIKE :search)"
+        }
+
+    def filter_variant(self, search: str) -> Tuple[str, Dict[str, Any]]:
+        """Search mode (a ``filter_conditions`` key) and bind parameters for ``search``"""
+        if self.ensure_index() and len(search) >= MIN_TRIGRAM_LENGTH:
+            return 'fts', {'search_match': _quote_fts(search)}
+        return 'like', {'search': f'%{search}%'}
+
+    def filter_clause(self, search: str, column: str = 'id') -> Tuple[str, Dict[str, Any]]:
+        """SQL condition restricting ``column`` (users.id) to rows matching ``search``"""
+        mode, params = self.filter_variant(search)
+        return self.filter_conditions(column)[mode], params
+
+    def search(self, term: str, limit: int = 20, fuzzy: bool = False,
+               count_cap: int = 1000) -> Dict[str, Any]:
+        """Ranked ids for ``term`` plus a bounded match count.
+
+        Returns ``{'ids': [...], 'count': n, 'count_is_estimate': bool, 'mode': ...}``.
+        The count stops at ``count_cap`` so broad type-ahead terms stay cheap.
+        """
+        term = (term or '').strip()
+        if not term:
+            return {'ids': [], 'count': 0, 'count_is_estimate': False, 'mode': 'empty'}
+
+        if self.ensure_index() and len(term) >= MIN_TRIGRAM_LENGTH:
+            match = self._match_expression(term, fuzzy)
+            ids = [row[0] for row in self.db.session.execute(text("""
+                SELECT rowid FROM users_fts
+                WHERE users_fts MATCH :match
+                ORDER BY bm25(users_fts, 2.0, 1.0)
+                LIMIT :limit
+            """), {'match': match, 'limit': limit})]
+            count = self.db.session.execute(text("""
+                SELECT COUNT(*) FROM (
+                    SELECT rowid FROM users_fts WHERE users_fts MATCH :match LIMIT :cap
+                )
+            """), {'match': match, 'cap': count_cap + 1}).scalar()
+            mode = 'fuzzy' if fuzzy else 'substring'
+        else:
+            # Short terms: case-insensitive prefix range scans over the lower(username/email) indexes
+            lowered = term.lower()
+            params = {'lo': lowered, 'hi': lowered + '\uffff', 'limit': limit, 'cap': count_cap + 1}
+            prefix_query = """
+                SELECT id FROM users WHERE lower(username) >= :lo AND lower(username) < :hi
+                UNION
+                SELECT id FROM users WHERE lower(email) >= :lo AND lower(email) < :hi
+            """
+            ids = [row[0] for row in self.db.session.execute(
+                text(f"SELECT id FROM ({prefix_query}) ORDER BY id LIMIT :limit"), params
+            )]
+            count = self.db.session.execute(
+                text(f"SELECT COUNT(*) FROM (SELECT id FROM ({prefix_query}) LIMIT :cap)"), params
+            ).scalar()
+            mode = 'prefix'
+
+        return {
+            'ids': ids,
+            'count': min(count, count_cap),
+            'count_is_estimate': count > count_cap,
+            'mode': mode
+        }
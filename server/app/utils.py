@@ -0,0 +1,76 @@
+"""
+Shared helpers for the API routes
+"""
+
+import base64
+import json
+from typing import Any, Dict, Optional
+
+def safe_datetime_format(dt_value):
+    """Format a datetime column value that may already be a string"""
+    if dt_value is None:
+        return None
+    if isinstance(dt_value, str):
+        return dt_value
+    try:
+        return dt_value.isoformat()
+    except AttributeError:
+        return str(dt_value)
+
+def serialize_raw_user_row(row) -> Dict[str, Any]:
+    """Convert a raw users row into the camelCase shape used by the user explorer"""
+    return {
+        'id': row.id,
+        'uuid': row.uuid,
+        'username': row.username,
+        'email': row.email,
+        'accountAgeDays': row.account_age_days,
+        'totalSessions': row.total_sessions,
+        'engagementScore': row.engagement_score,
+        'lifetimeValue': row.lifetime_value,
+        'churnRisk': row.churn_risk,
+        'preferredContentType': row.preferred_content_type,
+        'communicationPreference': row.communication_preference,
+        'referralSource': row.referral_source,
+        'accountCreated': safe_datetime_format(row.account_created),
+        'lastLogin': safe_datetime_format(row.last_login),
+        'age': row.age,
+        'gender': row.gender,
+        'location': row.location,
+        'language': row.language,
+        'timezone': row.timezone,
+        'avgVisitTime': row.avg_visit_time,
+        'sessionFrequency': row.session_frequency,
+        'lastEmailOpen': safe_datetime_format(row.last_email_open),
+        'lastEmailClick': safe_datetime_format(row.last_email_click),
+        'emailOpenRate': row.email_open_rate,
+        'emailClickRate': row.email_click_rate,
+        'lastAppLogin': safe_datetime_format(row.last_app_login),
+        'lastAppClick': safe_datetime_format(row.last_app_click),
+        'lastCompletedAction': row.last_completed_action,
+        'plan': row.plan,
+        'planStartDate': safe_datetime_format(row.plan_start_date),
+        'totalPurchases': row.total_purchases,
+        'averagePurchaseValue': row.average_purchase_value,
+        'notificationSettings': row.notification_settings,
+        'featureUsageJson': row.feature_usage_json,
+        'referralCount': row.referral_count,
+        'marketingConsent': row.marketing_consent,
+        'lastConsentUpdate': safe_datetime_format(row.last_consent_update)
+    }
+
+def encode_cursor(last_id: int) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor"""
+    payload = json.dumps({'after_id': last_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Optional[int]:
+    """Decode a cursor produced by encode_cursor; an empty cursor means the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return int(payload['after_id'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
@@ -0,0 +1,322 @@
+# bulk_seed.py
+"""
+Bulk seeding engine for the users table
+
+Generates users column-wise in NumPy batches (Faker is only used to
+pre-sample pools of names, emails, countries, languages and timezones),
+optionally across worker processes, and writes them with executemany in
+large transactions. On SQLite the load runs with pragmas tuned for bulk
+inserts (restored afterwards) and the search-index triggers are suspended
+and rebuilt afterwards.
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from faker import Faker
+from sqlalchemy import text
+from tqdm import tqdm
+
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+PLANS = ['basic', 'plus', 'premium']
+GENDERS = ['male', 'female', 'non-binary', 'prefer_not_to_say']
+CONTENT_TYPES = ['video', 'text', 'audio', 'interactive']
+COMMUNICATION_PREFS = ['email', 'sms', 'push_notification', 'none']
+COMPLETED_ACTIONS = ['profile_update', 'purchase', 'subscription_change', 'content_create']
+REFERRAL_SOURCES = ['organic', 'paid_ad', 'referral', 'social_media']
+
+# Every column except the autoincrement primary key, in table order
+USER_COLUMNS = [column.name for column in User.__table__.columns if column.name != 'id']
+
+# Pragmas applied to the loading connection for the load; the previous values
+# are restored before the (pooled) connection is handed back
+SQLITE_BULK_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',
+    'foreign_keys': 'OFF'
+}
+
+SEARCH_TRIGGERS = ['users_fts_ai', 'users_fts_ad', 'users_fts_au']
+
+TWO_YEARS_SECONDS = 2 * 365 * 24 * 3600
+
+class FakerPools:
+    """Pre-sampled Faker values that batches index into instead of calling Faker per row"""
+
+    def __init__(self, size: int = 10000, seed: Optional[int] = None):
+        fake = Faker()
+        if seed is not None:
+            fake.seed_instance(seed)
+        self.user_names = np.array([fake.user_name() for _ in range(size)], dtype=object)
+        self.emails = np.array([fake.email() for _ in range(size)], dtype=object)
+        self.countries = np.array([fake.country() for _ in range(min(size, 1000))], dtype=object)
+        self.language_codes = np.array([fake.language_code() for _ in range(min(size, 1000))], dtype=object)
+        self.timezones = np.array([fake.timezone() for _ in range(min(size, 1000))], dtype=object)
+
+def _uuid4_strings(rng: np.random.Generator, count: int) -> List[str]:
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hex_digits = raw.tobytes().hex()
+    return [
+        f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+        for h in (hex_digits[i:i + 32] for i in range(0, count * 32, 32))
+    ]
+
+def _between(rng: np.random.Generator, start: np.ndarray, end: np.datetime64) -> np.ndarray:
+    """Uniform timestamps in [start, end] per row"""
+    span = (end - start).astype(np.int64)
+    return start + (rng.random(len(start)) * span).astype(np.int64).astype('timedelta64[us]')
+
+def _choice(rng: np.random.Generator, values, count: int) -> List:
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), size=count)].tolist()
+
+def _round(values: np.ndarray) -> List[float]:
+    return np.round(values, 2).tolist()
+
+def generate_user_rows(start_index: int, count: int, pools: FakerPools, seed: Optional[int] = None,
+                       raw_sqlite: bool = False, now: Optional[datetime] = None) -> List[Tuple]:
+    """Generate ``count`` users as tuples in ``USER_COLUMNS`` order.
+
+    Distributions follow User.generate_fake_users. With ``raw_sqlite`` the
+    datetimes and JSON values are pre-encoded the way SQLAlchemy stores them
+    in SQLite so rows can go straight to the driver.
+    """
+    rng = np.random.default_rng(seed)
+    now = np.datetime64(now or datetime.utcnow(), 'us')
+    index = np.arange(start_index, start_index + count)
+
+    account_created = now - (rng.random(count) * TWO_YEARS_SECONDS * 1e6).astype(np.int64).astype('timedelta64[us]')
+    account_age_days = ((now - account_created) // np.timedelta64(1, 'D')).astype(np.int64)
+
+    total_sessions = rng.integers(1, 501, size=count)
+    lifetime_value = np.round(rng.uniform(0, 1000, size=count), 2)
+    total_purchases = rng.integers(0, 21, size=count)
+    notification_flags = rng.random((count, 3)) < 0.5
+    feature_usage = np.round(rng.random((count, 3)), 2)
+
+    def timestamps(values: np.ndarray) -> List:
+        if raw_sqlite:
+            return np.char.replace(np.datetime_as_string(values, unit='us'), 'T', ' ').tolist()
+        return values.astype('datetime64[us]').tolist()
+
+    if raw_sqlite:
+        notification_settings = [
+            f'{{"email": {"true" if e else "false"}, "sms": {"true" if s else "false"}, "push": {"true" if p else "false"}}}'
+            for e, s, p in notification_flags.tolist()
+        ]
+        feature_usage_json = [
+            f'{{"feature1": {a!r}, "feature2": {b!r}, "feature3": {c!r}}}'
+            for a, b, c in feature_usage.tolist()
+        ]
+        marketing_consent = (rng.random(count) < 0.5).astype(np.int64).tolist()
+    else:
+        notification_settings = [
+            {'email': e, 'sms': s, 'push': p} for e, s, p in notification_flags.tolist()
+        ]
+        feature_usage_json = [
+            {'feature1': a, 'feature2': b, 'feature3': c} for a, b, c in feature_usage.tolist()
+        ]
+        marketing_consent = (rng.random(count) < 0.5).tolist()
+
+    user_names = pools.user_names[rng.integers(0, len(pools.user_names), size=count)]
+    emails = pools.emails[rng.integers(0, len(pools.emails), size=count)]
+
+    columns = {
+        'uuid': _uuid4_strings(rng, count),
+        # The index suffix/prefix keeps usernames and emails unique across batches
+        'username': [f"{name}_{i}" for name, i in zip(user_names.tolist(), index.tolist())],
+        'email': [f"{i}_{email}" for email, i in zip(emails.tolist(), index.tolist())],
+        'account_created': timestamps(account_created),
+        'last_login': timestamps(_between(rng, account_created, now)),
+        'account_age_days': account_age_days.tolist(),
+        'age': rng.integers(18, 66, size=count).tolist(),
+        'gender': _choice(rng, GENDERS, count),
+        'location': _choice(rng, pools.countries, count),
+        'language': _choice(rng, pools.language_codes, count),
+        'timezone': _choice(rng, pools.timezones, count),
+        'avg_visit_time': _round(rng.uniform(1, 60, size=count)),
+        'total_sessions': total_sessions.tolist(),
+        'session_frequency': _round(total_sessions / 52),
+        'last_email_open': timestamps(_between(rng, account_created, now)),
+        'last_email_click': timestamps(_between(rng, account_created, now)),
+        'email_open_rate': _round(rng.random(count)),
+        'email_click_rate': _round(rng.random(count)),
+        'last_app_login': timestamps(_between(rng, account_created, now)),
+        'last_app_click': timestamps(_between(rng, account_created, now)),
+        'last_completed_action': _choice(rng, COMPLETED_ACTIONS, count),
+        'plan': _choice(rng, PLANS, count),
+        'plan_start_date': timestamps(account_created),
+        'lifetime_value': lifetime_value.tolist(),
+        'total_purchases': total_purchases.tolist(),
+        'average_purchase_value': _round(lifetime_value / np.maximum(1, total_purchases)),
+        'churn_risk': _round(rng.random(count)),
+        'engagement_score': _round(rng.random(count)),
+        'preferred_content_type': _choice(rng, CONTENT_TYPES, count),
+        'communication_preference': _choice(rng, COMMUNICATION_PREFS, count),
+        'notification_settings': notification_settings,
+        'feature_usage_json': feature_usage_json,
+        'referral_source': _choice(rng, REFERRAL_SOURCES, count),
+        'referral_count': rng.integers(0, 11, size=count).tolist(),
+        'marketing_consent': marketing_consent,
+        'last_consent_update': timestamps(_between(rng, account_created, now))
+    }
+    return list(zip(*(columns[name] for name in USER_COLUMNS)))
+
+# Worker processes build their Faker pools once and reuse them for every batch
+_worker_pools: Optional[FakerPools] = None
+
+def _init_worker(pool_size: int, seed: Optional[int]):
+    global _worker_pools
+    _worker_pools = FakerPools(pool_size, seed)
+
+def _generate_in_worker(start_index: int, count: int, seed: Optional[int], raw_sqlite: bool, now: datetime):
+    return generate_user_rows(start_index, count, _worker_pools, seed, raw_sqlite, now)
+
+class BulkUserSeeder:
+    """Loads generated users into the users table as fast as the backend allows"""
+
+    def __init__(self, engine, batch_size: int = 10000, commit_every: int = 200000,
+                 workers: int = 1, pool_size: int = 10000, seed: Optional[int] = None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.commit_every = max(commit_every, batch_size)
+        self.workers = max(1, workers)
+        self.pool_size = pool_size
+        self.random_seed = seed
+        self.is_sqlite = engine.dialect.name == 'sqlite'
+
+    def _batch_seed(self, batch_number: int) -> Optional[int]:
+        return None if self.random_seed is None else self.random_seed + batch_number
+
+    def _batches(self, start_index: int, rows: int):
+        """Yield generated row batches in order, generating ahead in worker processes"""
+        now = datetime.utcnow()
+        specs = [
+            (start_index + offset, min(self.batch_size, rows - offset), self._batch_seed(number))
+            for number, offset in enumerate(range(0, rows, self.batch_size))
+        ]
+
+        if self.workers == 1:
+            pools = FakerPools(self.pool_size, self.random_seed)
+            for start, count, seed in specs:
+                yield generate_user_rows(start, count, pools, seed, self.is_sqlite, now)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.pool_size, self.random_seed)) as executor:
+            # Keep a bounded window in flight so generation cannot run far ahead of inserts
+            window = self.workers * 2
+            pending = []
+            for spec in specs:
+                pending.append(executor.submit(_generate_in_worker, *spec, self.is_sqlite, now))
+                if len(pending) >= window:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def _prepare_connection(self, connection) -> Tuple[List[str], Dict[str, Any]]:
+        """Apply the bulk pragmas and suspend the search triggers.
+
+        Returns the suspended triggers and the pragma values to restore.
+        """
+        if not self.is_sqlite:
+            return [], {}
+        previous = {}
+        for name, value in SQLITE_BULK_PRAGMAS.items():
+            current = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            if name == 'journal_mode' and str(current).lower() == 'wal':
+                # Leaving WAL is persistent and would affect every other connection
+                continue
+            previous[name] = current
+            connection.exec_driver_sql(f"PRAGMA {name}={value}")
+        # Per-row FTS triggers dominate insert time; rebuild the index once at the end instead
+        existing = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        suspended = [row[0] for row in existing if row[0] in SEARCH_TRIGGERS]
+        for trigger in suspended:
+            connection.exec_driver_sql(f"DROP TRIGGER {trigger}")
+        connection.commit()
+        return suspended, previous
+
+    def _restore_pragmas(self, connection, previous: Dict[str, Any]):
+        for name, value in previous.items():
+            connection.exec_driver_sql(f"PRAGMA {name}={value}")
+        connection.commit()
+
+    def _restore_search_index(self, connection):
+        from app.services.user_search import SEARCH_INDEX_DDL
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        connection.commit()
+
+    def seed(self, rows: int, progress: bool = True) -> Dict[str, Any]:
+        """Insert ``rows`` generated users and return throughput stats"""
+        started = time.perf_counter()
+        User.__table__.create(self.engine, checkfirst=True)
+
+        if self.is_sqlite:
+            insert_sql = (
+                f"INSERT INTO users ({', '.join(USER_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in USER_COLUMNS)})"
+            )
+        insert_statement = User.__table__.insert()
+
+        inserted = 0
+        progress_bar = tqdm(total=rows, desc="Bulk inserting users", disable=not progress)
+        with self.engine.connect() as connection:
+            start_index = connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM users")).scalar() + 1
+            suspended, previous_pragmas = self._prepare_connection(connection)
+            try:
+                uncommitted = 0
+                for batch in self._batches(start_index, rows):
+                    if self.is_sqlite:
+                        connection.exec_driver_sql(insert_sql, batch)
+                    else:
+                        connection.execute(insert_statement, [dict(zip(USER_COLUMNS, row)) for row in batch])
+                    inserted += len(batch)
+                    uncommitted += len(batch)
+                    progress_bar.update(len(batch))
+                    if uncommitted >= self.commit_every:
+                        connection.commit()
+                        uncommitted = 0
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                progress_bar.close()
+                try:
+                    if suspended:
+                        self._restore_search_index(connection)
+                finally:
+                    self._restore_pragmas(connection, previous_pragmas)
+
+        seconds = time.perf_counter() - started
+        stats = {
+            'rows': inserted,
+            'seconds': round(seconds, 2),
+            'rows_per_second': round(inserted / seconds) if seconds else inserted,
+            'workers': self.workers
+        }
+        logger.info(f"Bulk seeded {inserted} users in {seconds:.1f}s")
+        return stats
+
+def bulk_seed(engine, rows: int, workers: int = None, batch_size: int = 10000,
+              commit_every: int = 200000, seed: Optional[int] = None, progress: bool = True) -> Dict[str, Any]:
+    """Generate and insert ``rows`` users; ``workers`` defaults to the CPU count"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    seeder = BulkUserSeeder(engine, batch_size=batch_size, commit_every=commit_every,
+                            workers=workers, seed=seed)
+    return seeder.seed(rows, progress=progress)
@@ -0,0 +1,234 @@
+# chart_pipeline.py
+"""
+Parallel, cached chart rendering
+
+Charts are described by a module-level render function plus the data it
+draws. Each chart is keyed on a hash of that data (and of the renderer's
+code); charts whose key matches the manifest are skipped, the rest are
+rendered with the Agg backend in a process pool and written atomically into
+the output directory alongside a manifest.json.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+def _update_hash(digest, obj):
+    """Feed a stable representation of ``obj`` into ``digest``"""
+    if isinstance(obj, pd.DataFrame):
+        digest.update(repr((list(obj.columns), [str(t) for t in obj.dtypes])).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, pd.Series):
+        digest.update(repr((obj.name, str(obj.dtype))).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        digest.update(repr((obj.shape, str(obj.dtype))).encode('utf-8'))
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        digest.update(b'{')
+        for key in sorted(obj, key=str):
+            digest.update(str(key).encode('utf-8'))
+            _update_hash(digest, obj[key])
+        digest.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for item in obj:
+            _update_hash(digest, item)
+        digest.update(b']')
+    else:
+        digest.update(repr(obj).encode('utf-8'))
+
+def chart_key(renderer: Callable, data: Any, options: Dict[str, Any] = None) -> str:
+    """Hash of the renderer code, its input data and options"""
+    digest = hashlib.sha256()
+    digest.update(f"{renderer.__module__}.{renderer.__qualname__}".encode('utf-8'))
+    digest.update(renderer.__code__.co_code)
+    digest.update(repr(renderer.__code__.co_consts).encode('utf-8'))
+    _update_hash(digest, data)
+    _update_hash(digest, options or {})
+    return digest.hexdigest()
+
+def _mp_context():
+    # Workers are started without fork: the app already runs threads (pools,
+    # writers) whose locks a forked child would inherit in whatever state they were
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _render_chart(renderer: Callable, data: Any, path: str, options: Dict[str, Any]) -> float:
+    """Render one chart to ``path``; runs in a worker process"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    started = time.perf_counter()
+    directory, filename = os.path.split(path)
+    temp_path = os.path.join(directory, f".{os.getpid()}.{filename}")
+    try:
+        renderer(data, temp_path, **options)
+        os.replace(temp_path, path)
+    finally:
+        plt.close('all')
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return time.perf_counter() - started
+
+class ChartPipeline:
+    """Renders charts in a process pool, skipping charts whose inputs are unchanged.
+
+    ``submit`` queues a chart; ``flush`` waits for the queued charts and
+    writes the manifest. Inside ``batch()`` flushes are deferred so charts
+    from several analyses render concurrently.
+    """
+
+    def __init__(self, output_dir: str = None, max_workers: Optional[int] = None):
+        self.output_dir = output_dir or os.environ.get('CHART_OUTPUT_DIR', 'analysis_charts')
+        if max_workers is None:
+            max_workers = int(os.environ.get('CHART_WORKERS', 0)) or min(4, os.cpu_count() or 1)
+        self.max_workers = max_workers
+        self.manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._batch_depth = 0
+        self.last_run = {'rendered': [], 'skipped': [], 'failed': {}}
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f).get('charts', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({
+                'updated_at': datetime.utcnow().isoformat(),
+                'charts': self.manifest
+            }, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 1:
+            return None
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context(),
+                                                     initializer=_init_worker)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool unavailable, rendering charts inline: {e}")
+                self.max_workers = 1
+                return None
+        return self._executor
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.output_dir, filename)
+
+    def written(self, filenames: Iterable[str]) -> List[str]:
+        """The charts among ``filenames`` that are rendered and current on disk.
+
+        Charts still queued in an open batch are not counted, so call this
+        once the batch has flushed.
+        """
+        return [
+            filename for filename in filenames
+            if filename not in self._pending and filename in self.manifest and os.path.exists(self.path(filename))
+        ]
+
+    def submit(self, filename: str, renderer: Callable, data: Any, **options) -> str:
+        """Queue ``renderer(data, path, **options)`` unless the chart is already current"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        key = chart_key(renderer, data, options)
+        path = self.path(filename)
+
+        entry = self.manifest.get(filename)
+        if entry and entry.get('key') == key and os.path.exists(path):
+            self.last_run['skipped'].append(filename)
+            return path
+
+        executor = self._get_executor()
+        job = {'key': key, 'renderer': f"{renderer.__module__}.{renderer.__qualname__}"}
+        if executor is not None:
+            job['future'] = executor.submit(_render_chart, renderer, data, path, options)
+        else:
+            try:
+                job['seconds'] = _render_chart(renderer, data, path, options)
+            except Exception as e:
+                job['error'] = e
+        self._pending[filename] = job
+
+        if not self._batch_depth:
+            self.flush()
+        return path
+
+    @contextmanager
+    def batch(self):
+        """Defer rendering waits until the outermost batch exits"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self) -> Dict[str, Any]:
+        """Wait for queued charts, record them in the manifest and report what ran"""
+        if self._batch_depth:
+            return self.last_run
+
+        for filename, job in self._pending.items():
+            try:
+                seconds = job['future'].result() if 'future' in job else job.get('seconds')
+                if 'error' in job:
+                    raise job['error']
+            except Exception as e:
+                logger.error(f"Error rendering chart {filename}: {e}")
+                self.last_run['failed'][filename] = str(e)
+                self.manifest.pop(filename, None)
+                continue
+            self.manifest[filename] = {
+                'key': job['key'],
+                'renderer': job['renderer'],
+                'rendered_at': datetime.utcnow().isoformat(),
+                'render_seconds': round(seconds, 3)
+            }
+            self.last_run['rendered'].append(filename)
+
+        if self._pending:
+            self._pending = {}
+            self._write_manifest()
+
+        summary = self.last_run
+        self.last_run = {'rendered': [], 'skipped': [], 'failed': {}}
+        return summary
+
+    def close(self):
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
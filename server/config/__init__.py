@@ -20,9 +20,52 @@ class Config:
         'real_time_sync': False
     }
     
+    # Pages fetched in parallel by the ?all=true list endpoints
+    SIGMA_PAGE_FETCH_WORKERS = int(os.environ.get('SIGMA_PAGE_FETCH_WORKERS', 4))
+    
+    # Background workbook exports (concurrent exports, seconds before giving up)
+    # Jobs are held in process memory: polls and downloads must reach the process that started them
+    SIGMA_EXPORT_DIR = os.environ.get('SIGMA_EXPORT_DIR', 'sigma_exports')
+    SIGMA_EXPORT_WORKERS = int(os.environ.get('SIGMA_EXPORT_WORKERS', 2))
+    SIGMA_EXPORT_TIMEOUT = int(os.environ.get('SIGMA_EXPORT_TIMEOUT', 600))
+    
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     
+    # SQLite adapter pool (WAL mode: pooled readers plus one queued writer)
+    SQLITE_READ_CONNECTIONS = int(os.environ.get('SQLITE_READ_CONNECTIONS', 4))
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5.0))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384))
+    
+    # Rows committed per transaction by DatabaseAdapter.bulk_load
+    BULK_LOAD_BATCH_SIZE = int(os.environ.get('BULK_LOAD_BATCH_SIZE', 5000))
+    
+    # Rows fetched per round trip by DatabaseAdapter.stream_query / iter_query
+    QUERY_STREAM_BATCH_SIZE = int(os.environ.get('QUERY_STREAM_BATCH_SIZE', 1000))
+    
+    # Tables and columns /api/database/tables/<table>/rows may export (no identifying columns),
+    # and the most rows one request may stream
+    TABLE_ROWS_ALLOWLIST = {
+        'users': [
+            'id', 'account_created', 'account_age_days', 'plan', 'lifetime_value',
+            'total_purchases', 'average_purchase_value', 'total_sessions', 'avg_visit_time',
+            'session_frequency', 'engagement_score', 'churn_risk', 'preferred_content_type',
+            'communication_preference', 'referral_source', 'referral_count'
+        ]
+    }
+    TABLE_ROWS_MAX_LIMIT = int(os.environ.get('TABLE_ROWS_MAX_LIMIT', 10000))
+    
+    # Materialized aggregate cache (seconds; a refresh interval of 0 disables the scheduler)
+    AGGREGATE_CACHE_TTL = int(os.environ.get('AGGREGATE_CACHE_TTL', 300))
+    AGGREGATE_REFRESH_INTERVAL = int(os.environ.get('AGGREGATE_REFRESH_INTERVAL', 0))
+    
+    # Rows fetched per round trip when streaming /api/raw-user-data as NDJSON
+    RAW_USER_STREAM_BATCH_SIZE = int(os.environ.get('RAW_USER_STREAM_BATCH_SIZE', 1000))
+    
+    # Prepared statements kept per SQLite connection (sqlite3 cached_statements)
+    SQLITE_CACHED_STATEMENTS = int(os.environ.get('SQLITE_CACHED_STATEMENTS', 256))
+    
     # Mock Warehouse Configuration (for testing)
     MOCK_WAREHOUSE_CONFIG = {
         'enabled': SIGMA_MODE == 'mock_warehouse',
@@ -31,6 +74,11 @@ class Config:
         'auto_sync': True
     }
     
+    # Mock warehouse write-behind log (seconds between flushes; 0 writes through on every insert)
+    MOCK_WAREHOUSE_FLUSH_INTERVAL = float(os.environ.get('MOCK_WAREHOUSE_FLUSH_INTERVAL', 0.2))
+    MOCK_WAREHOUSE_COMPACT_THRESHOLD = int(os.environ.get('MOCK_WAREHOUSE_COMPACT_THRESHOLD', 50000))
+    MOCK_WAREHOUSE_FSYNC = os.environ.get('MOCK_WAREHOUSE_FSYNC', 'false').lower() == 'true'
+    
     # Real Warehouse Configuration (for production)
     WAREHOUSE_CONFIG = {
         'enabled': SIGMA_MODE == 'sigma',
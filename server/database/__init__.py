@@ -4,19 +4,63 @@ Supports multiple database backends: SQLite, Mock Warehouse, and Sigma Warehouse
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Any, Optional
 import logging
+from .bulk_load import DEFAULT_BATCH_SIZE, BulkLoadResult, iter_row_batches, run_bulk_load
+from .streaming import DEFAULT_STREAM_BATCH_SIZE, QueryStream, iter_json_chunks, iter_ndjson_chunks
 
 logger = logging.getLogger(__name__)
 
+def config_value(config, key: str, default: Any = None) -> Any:
+    """Read a setting from a dict/Flask config or from a Config class or instance"""
+    if config is None:
+        return default
+    if isinstance(config, Mapping):
+        return config.get(key, default)
+    return getattr(config, key, default)
+
 class DatabaseAdapter(ABC):
     """Abstract base class for database operations"""
     
+    # Rows committed per transaction by bulk_load unless the caller overrides it
+    bulk_batch_size = DEFAULT_BATCH_SIZE
+    
+    # Rows fetched per round trip by stream_query unless the caller overrides it
+    stream_batch_size = DEFAULT_STREAM_BATCH_SIZE
+    
     @abstractmethod
     def execute_query(self, query: str, params: Dict = None) -> List[Dict]:
         """Execute SQL query and return results"""
         pass
     
+    def stream_query(self, query: str, params: Dict = None, batch_size: int = None,
+                     as_tuples: bool = False) -> QueryStream:
+        """Execute a query and return its rows as a lazily fetched stream of batches
+        
+        Adapters with a cursor override this to fetch from the server batch by
+        batch; the default slices the materialized execute_query result.
+        """
+        batch_size = batch_size or self.stream_batch_size
+        
+        def open_batches():
+            rows = self.execute_query(query, params)
+            columns = list(rows[0].keys()) if rows else []
+            
+            def batches():
+                for start in range(0, len(rows), batch_size):
+                    batch = rows[start:start + batch_size]
+                    yield [tuple(row.get(column) for column in columns) for row in batch] if as_tuples else batch
+            
+            return columns, batches()
+        
+        return QueryStream(open_batches)
+    
+    def iter_query(self, query: str, params: Dict = None, batch_size: int = None,
+                   as_tuples: bool = False):
+        """Execute a query and yield its rows one at a time (see stream_query)"""
+        return self.stream_query(query, params, batch_size, as_tuples).rows()
+    
     @abstractmethod
     def create_table(self, table_name: str, schema: Dict) -> bool:
         """Create table with specified schema"""
@@ -27,6 +71,31 @@ class DatabaseAdapter(ABC):
         """Insert data into specified table"""
         pass
     
+    def load_batch(self, table_name: str, rows: List[Dict]) -> int:
+        """Load one batch of rows in a single transaction and return the number loaded
+        
+        Adapters override this with a native batched write; the default goes
+        through insert_data.
+        """
+        if not self.insert_data(table_name, rows):
+            raise RuntimeError(f"Insert into {table_name} failed")
+        return len(rows)
+    
+    def bulk_load(self, table_name: str, rows, batch_size: int = None,
+                  on_batch: Callable[[Dict[str, Any]], None] = None) -> BulkLoadResult:
+        """Stream rows into a table, committing every ``batch_size`` rows
+        
+        ``rows`` may be an iterator of row dicts, a dict of column lists, a
+        pandas DataFrame or a pyarrow Table/RecordBatch. Failed batches are
+        retried row by row; per-batch throughput is reported in the result.
+        """
+        return run_bulk_load(
+            table_name, rows,
+            lambda batch: self.load_batch(table_name, batch),
+            batch_size=batch_size or self.bulk_batch_size,
+            on_batch=on_batch
+        )
+    
     @abstractmethod
     def get_table_schema(self, table_name: str) -> Dict:
         """Get table schema information"""
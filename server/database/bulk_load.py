@@ -0,0 +1,154 @@
+"""
+Bulk Load Helpers
+Streams row iterators and columnar batches into adapters in fixed-size, timed batches
+"""
+
+import time
+import logging
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Failed batches keep at most this many error messages in the result
+MAX_REPORTED_ERRORS = 20
+
+def _is_columnar_dict(source) -> bool:
+    return isinstance(source, dict) and all(isinstance(values, (list, tuple)) for values in source.values())
+
+def iter_row_batches(source, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Lists of at most ``batch_size`` row dicts from any supported input.
+
+    Accepts an iterable of row dicts (consumed lazily, so generators stream),
+    a column dict mapping names to equal-length lists, a pandas DataFrame, or
+    a pyarrow Table/RecordBatch. Only one batch is materialized at a time.
+    """
+    batch_size = max(1, int(batch_size))
+
+    if _is_columnar_dict(source):
+        names = list(source)
+        total = len(source[names[0]]) if names else 0
+        for start in range(0, total, batch_size):
+            columns = [source[name][start:start + batch_size] for name in names]
+            yield [dict(zip(names, values)) for values in zip(*columns)]
+        return
+
+    # pandas DataFrame: object dtype yields plain Python scalars, NaN/NaT become None
+    if hasattr(source, 'iloc') and hasattr(source, 'to_dict'):
+        for start in range(0, len(source), batch_size):
+            chunk = source.iloc[start:start + batch_size]
+            yield chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+        return
+
+    # pyarrow Table (to_batches) or RecordBatch (to_pylist); duck-typed so pyarrow stays optional
+    if hasattr(source, 'to_batches'):
+        for record_batch in source.to_batches(max_chunksize=batch_size):
+            yield record_batch.to_pylist()
+        return
+    if hasattr(source, 'to_pylist') and hasattr(source, 'num_rows'):
+        for start in range(0, source.num_rows, batch_size):
+            yield source.slice(start, batch_size).to_pylist()
+        return
+
+    # A lone row dict is a one-row input
+    rows = iter([source] if isinstance(source, dict) else source)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+@dataclass
+class BulkLoadResult:
+    table: str
+    rows_loaded: int = 0
+    rows_failed: int = 0
+    batches: int = 0
+    fallback_batches: int = 0
+    seconds: float = 0.0
+    batch_stats: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return self.rows_failed == 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_loaded / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'table': self.table,
+            'success': self.success,
+            'rows_loaded': self.rows_loaded,
+            'rows_failed': self.rows_failed,
+            'batches': self.batches,
+            'fallback_batches': self.fallback_batches,
+            'seconds': round(self.seconds, 4),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'batch_stats': self.batch_stats,
+            'errors': self.errors
+        }
+
+def run_bulk_load(table_name: str, source, load_batch: Callable[[List[Dict[str, Any]]], int],
+                  batch_size: int = DEFAULT_BATCH_SIZE,
+                  on_batch: Optional[Callable[[Dict[str, Any]], None]] = None) -> BulkLoadResult:
+    """Feed ``source`` to ``load_batch`` one committed batch at a time.
+
+    ``load_batch`` loads a list of rows in one transaction and returns the
+    number loaded. When a batch fails, its rows are retried one at a time so
+    a single bad row costs only itself rather than the whole batch.
+    """
+    result = BulkLoadResult(table=table_name)
+    started = time.perf_counter()
+
+    def record_error(error: Exception) -> None:
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(str(error))
+
+    for number, rows in enumerate(iter_row_batches(source, batch_size), 1):
+        batch_started = time.perf_counter()
+        fallback = False
+        try:
+            loaded, failed = load_batch(rows), 0
+        except Exception as e:
+            logger.warning(f"Bulk load batch {number} into {table_name} failed ({e}); retrying row by row")
+            record_error(e)
+            fallback = True
+            loaded = failed = 0
+            for row in rows:
+                try:
+                    loaded += load_batch([row])
+                except Exception as row_error:
+                    failed += 1
+                    record_error(row_error)
+
+        elapsed = time.perf_counter() - batch_started
+        stats = {
+            'batch': number,
+            'rows': len(rows),
+            'loaded': loaded,
+            'failed': failed,
+            'fallback': fallback,
+            'seconds': round(elapsed, 4),
+            'rows_per_second': round(loaded / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        result.batches += 1
+        result.fallback_batches += int(fallback)
+        result.rows_loaded += loaded
+        result.rows_failed += failed
+        result.batch_stats.append(stats)
+        logger.debug(f"Bulk load {table_name} batch {number}: {loaded} rows in {elapsed:.3f}s")
+        if on_batch:
+            on_batch(stats)
+
+    result.seconds = time.perf_counter() - started
+    logger.info(
+        f"Bulk loaded {result.rows_loaded} rows into {table_name} in {result.batches} batches "
+        f"({result.rows_per_second:.0f} rows/s, {result.rows_failed} failed)"
+    )
+    return result
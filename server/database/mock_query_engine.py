@@ -0,0 +1,663 @@
+"""
+Mock Warehouse Query Engine
+Columnar in-memory tables and a small SQL SELECT engine for the mock warehouse
+"""
+
+import re
+import heapq
+import numbers
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueryError(ValueError):
+    """Raised for SQL the mock engine cannot parse or execute"""
+
+def _index_key(value: Any) -> Any:
+    """Equality key for indexes, grouping and DISTINCT.
+
+    Python treats ``True == 1 == 1.0`` and hashes them alike, so a plain dict
+    would put them in one bucket. Numbers keep comparing by value (1 matches
+    1.0), but every other value is keyed by ``(type, value)``, so a boolean
+    never matches a number. Raises TypeError for unhashable values.
+    """
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        hash(value)
+        return value
+    return (type(value), value)
+
+class ColumnarTable:
+    """Table stored as one list per column, with lazily built per-column hash indexes.
+
+    Indexes are keyed by ``_index_key`` so values that only compare equal
+    in Python (``True`` and ``1``) stay in separate buckets.
+
+    Behaves like the list of row dicts it replaces (len, indexing, iteration)
+    so existing callers keep working.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]] = None):
+        self.columns: Dict[str, List[Any]] = {}
+        self.row_count = 0
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {}
+        self._unindexable = set()
+        if rows:
+            self.extend(rows)
+
+    def _add_column(self, name: str):
+        self.columns[name] = [None] * self.row_count
+
+    def append(self, row: Dict[str, Any]) -> int:
+        """Append a row and return its position"""
+        position = self.row_count
+        for name in row:
+            if name not in self.columns:
+                self._add_column(name)
+        for name, values in self.columns.items():
+            value = row.get(name)
+            values.append(value)
+            index = self._indexes.get(name)
+            if index is not None:
+                try:
+                    index.setdefault(_index_key(value), []).append(position)
+                except TypeError:
+                    # Unhashable value (dict/list): this column can no longer use an index
+                    del self._indexes[name]
+                    self._unindexable.add(name)
+        self.row_count += 1
+        return position
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def index_for(self, column: str) -> Optional[Dict[Any, List[int]]]:
+        """Hash index value -> row positions, built on first use"""
+        if column not in self.columns or column in self._unindexable:
+            return None
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            try:
+                for position, value in enumerate(self.columns[column]):
+                    index.setdefault(_index_key(value), []).append(position)
+            except TypeError:
+                self._unindexable.add(column)
+                return None
+            self._indexes[column] = index
+        return index
+
+    def row(self, position: int, columns: Sequence[str] = None) -> Dict[str, Any]:
+        names = columns if columns is not None else self.columns.keys()
+        return {name: self.columns[name][position] if name in self.columns else None for name in names}
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return [self.row(position) for position in range(self.row_count)]
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        if position < 0:
+            position += self.row_count
+        if not 0 <= position < self.row_count:
+            raise IndexError('row index out of range')
+        return self.row(position)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for position in range(self.row_count):
+            yield self.row(position)
+
+# -- parsing -----------------------------------------------------------------
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*')
+      | (?P<number>\d+\.\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?|\d+(?:[eE][-+]?\d+)?)
+      | (?P<param>:[A-Za-z_]\w*|%\([A-Za-z_]\w*\)s|\?)
+      | (?P<ident>"[^"]+"|`[^`]+`|[A-Za-z_][\w$]*(?:\.(?:"[^"]+"|[A-Za-z_][\w$]*))*)
+      | (?P<op><=|>=|<>|!=|=|<|>|-)
+      | (?P<punct>[(),*;])
+    )""", re.VERBOSE)
+
+AGGREGATES = {'COUNT', 'SUM', 'AVG', 'MIN', 'MAX'}
+
+def _unquote(identifier: str) -> str:
+    # Qualified names (schema.table, alias.column) resolve to their last part
+    part = identifier.split('.')[-1]
+    if part[:1] in ('"', '`'):
+        return part[1:-1]
+    return part
+
+def tokenize(query: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    query = query.strip().rstrip(';')
+    while position < len(query):
+        match = TOKEN_RE.match(query, position)
+        if not match or match.end() == position:
+            if query[position:].strip() == '':
+                break
+            raise QueryError(f"Unexpected input near: {query[position:position + 20]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+class SelectParser:
+    """Recursive-descent parser for SELECT ... FROM ... [WHERE] [GROUP BY] [ORDER BY] [LIMIT]"""
+
+    def __init__(self, query: str, params: Union[Dict[str, Any], Sequence[Any], None] = None):
+        self.tokens = tokenize(query)
+        self.pos = 0
+        self.params = params if params is not None else {}
+        self._positional = 0
+
+    # token helpers
+    def _peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def _keyword(self, *words: str) -> bool:
+        for offset, word in enumerate(words):
+            kind, value = self._peek(offset)
+            if kind != 'ident' or value.upper() != word:
+                return False
+        return True
+
+    def _accept_keyword(self, *words: str) -> bool:
+        if self._keyword(*words):
+            self.pos += len(words)
+            return True
+        return False
+
+    def _expect_keyword(self, *words: str):
+        if not self._accept_keyword(*words):
+            raise QueryError(f"Expected {' '.join(words)}")
+
+    def _accept(self, value: str) -> bool:
+        kind, token = self._peek()
+        if kind in ('punct', 'op') and token == value:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, value: str):
+        if not self._accept(value):
+            raise QueryError(f"Expected {value!r}")
+
+    def _identifier(self) -> str:
+        kind, value = self._peek()
+        if kind != 'ident':
+            raise QueryError(f"Expected identifier, got {value!r}")
+        self.pos += 1
+        return _unquote(value)
+
+    # grammar
+    def parse(self) -> Dict[str, Any]:
+        self._expect_keyword('SELECT')
+        statement = {'distinct': self._accept_keyword('DISTINCT'), 'where': None, 'group_by': [],
+                     'order_by': [], 'limit': None, 'offset': 0}
+        statement['items'] = self._select_list()
+        self._expect_keyword('FROM')
+        statement['table'] = self._identifier()
+        # Optional table alias
+        kind, value = self._peek()
+        if self._accept_keyword('AS'):
+            self._identifier()
+        elif kind == 'ident' and value.upper() not in ('WHERE', 'GROUP', 'ORDER', 'LIMIT', 'OFFSET'):
+            self.pos += 1
+
+        if self._accept_keyword('WHERE'):
+            statement['where'] = self._or_expression()
+        if self._accept_keyword('GROUP', 'BY'):
+            statement['group_by'] = [self._identifier()]
+            while self._accept(','):
+                statement['group_by'].append(self._identifier())
+        if self._accept_keyword('ORDER', 'BY'):
+            statement['order_by'] = [self._order_item()]
+            while self._accept(','):
+                statement['order_by'].append(self._order_item())
+        if self._accept_keyword('LIMIT'):
+            statement['limit'] = int(self._value())
+            if self._accept(','):
+                # MySQL-style LIMIT offset, count
+                statement['offset'], statement['limit'] = statement['limit'], int(self._value())
+        if self._accept_keyword('OFFSET'):
+            statement['offset'] = int(self._value())
+        if self.pos != len(self.tokens):
+            raise QueryError(f"Unexpected token {self._peek()[1]!r}")
+        return statement
+
+    def _select_list(self) -> List[Dict[str, Any]]:
+        items = [self._select_item()]
+        while self._accept(','):
+            items.append(self._select_item())
+        return items
+
+    def _select_item(self) -> Dict[str, Any]:
+        if self._accept('*'):
+            return {'kind': 'star'}
+        kind, value = self._peek()
+        next_kind, next_value = self._peek(1)
+        if kind == 'ident' and value.upper() in AGGREGATES and next_value == '(':
+            func = value.upper()
+            self.pos += 2
+            distinct = self._accept_keyword('DISTINCT')
+            column = None if self._accept('*') else self._identifier()
+            self._expect(')')
+            expression = f"{func.lower()}({'distinct ' if distinct else ''}{column or '*'})"
+            item = {'kind': 'agg', 'func': func, 'column': column, 'distinct': distinct,
+                    'label': expression, 'expression': expression}
+        else:
+            column = self._identifier()
+            item = {'kind': 'column', 'column': column, 'label': column}
+        if self._accept_keyword('AS'):
+            item['label'] = self._identifier()
+        elif self._peek()[0] == 'ident' and self._peek()[1].upper() != 'FROM':
+            item['label'] = self._identifier()
+        return item
+
+    def _order_item(self) -> Tuple[Any, bool]:
+        kind, value = self._peek()
+        if kind == 'number':
+            self.pos += 1
+            key = int(value)
+        elif kind == 'ident' and value.upper() in AGGREGATES and self._peek(1)[1] == '(':
+            key = self._select_item_for_order()
+        else:
+            key = self._identifier()
+        descending = False
+        if self._accept_keyword('DESC'):
+            descending = True
+        else:
+            self._accept_keyword('ASC')
+        return key, descending
+
+    def _select_item_for_order(self) -> str:
+        func = self._peek()[1].upper()
+        self.pos += 2
+        distinct = self._accept_keyword('DISTINCT')
+        column = None if self._accept('*') else self._identifier()
+        self._expect(')')
+        return f"{func.lower()}({'distinct ' if distinct else ''}{column or '*'})"
+
+    def _or_expression(self):
+        nodes = [self._and_expression()]
+        while self._accept_keyword('OR'):
+            nodes.append(self._and_expression())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def _and_expression(self):
+        nodes = [self._not_expression()]
+        while self._accept_keyword('AND'):
+            nodes.append(self._not_expression())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def _not_expression(self):
+        if self._accept_keyword('NOT'):
+            return ('not', self._not_expression())
+        if self._accept('('):
+            node = self._or_expression()
+            self._expect(')')
+            return node
+        return self._predicate()
+
+    def _predicate(self):
+        column = self._identifier()
+        negate = self._accept_keyword('NOT')
+        if self._accept_keyword('IN'):
+            self._expect('(')
+            values = [self._value()]
+            while self._accept(','):
+                values.append(self._value())
+            self._expect(')')
+            return ('in', column, values, negate)
+        if self._accept_keyword('LIKE'):
+            return ('like', column, _like_regex(self._value()), negate)
+        if self._accept_keyword('ILIKE'):
+            return ('like', column, _like_regex(self._value(), re.IGNORECASE), negate)
+        if self._accept_keyword('BETWEEN'):
+            low = self._value()
+            self._expect_keyword('AND')
+            return ('between', column, low, self._value(), negate)
+        if negate:
+            raise QueryError("Expected IN, LIKE or BETWEEN after NOT")
+        if self._accept_keyword('IS'):
+            negate = self._accept_keyword('NOT')
+            self._expect_keyword('NULL')
+            return ('null', column, negate)
+
+        kind, op = self._peek()
+        if kind != 'op' or op == '-':
+            raise QueryError(f"Expected comparison operator after {column}")
+        self.pos += 1
+        return ('cmp', column, '!=' if op == '<>' else op, self._value())
+
+    def _value(self) -> Any:
+        kind, value = self._peek()
+        if kind is None:
+            raise QueryError("Unexpected end of query")
+        self.pos += 1
+        if kind == 'string':
+            return value[1:-1].replace("''", "'")
+        if kind == 'number':
+            return float(value) if any(c in value for c in '.eE') else int(value)
+        if kind == 'op' and value == '-':
+            return -self._value()
+        if kind == 'param':
+            return self._param(value)
+        if kind == 'ident':
+            upper = value.upper()
+            if upper == 'NULL':
+                return None
+            if upper in ('TRUE', 'FALSE'):
+                return upper == 'TRUE'
+        raise QueryError(f"Expected a literal or parameter, got {value!r}")
+
+    def _param(self, token: str) -> Any:
+        if token == '?':
+            if not isinstance(self.params, (list, tuple)):
+                raise QueryError("Positional parameter used without a parameter list")
+            value = self.params[self._positional]
+            self._positional += 1
+            return value
+        name = token[1:] if token.startswith(':') else token[2:-2]
+        if not isinstance(self.params, dict) or name not in self.params:
+            raise QueryError(f"Missing parameter: {name}")
+        return self.params[name]
+
+def _like_regex(pattern: Any, flags: int = 0):
+    regex = ''.join(
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in str(pattern)
+    )
+    return re.compile(f'^{regex}$', flags | re.DOTALL)
+
+# -- execution ---------------------------------------------------------------
+
+def _compare(value: Any, op: str, target: Any) -> bool:
+    if value is None or target is None:
+        return False
+    try:
+        if op == '=':
+            return _hashable(value) == _hashable(target)
+        if op == '!=':
+            return _hashable(value) != _hashable(target)
+        if op == '<':
+            return value < target
+        if op == '<=':
+            return value <= target
+        if op == '>':
+            return value > target
+        if op == '>=':
+            return value >= target
+    except TypeError:
+        return False
+    return False
+
+class QueryEngine:
+    """Executes parsed SELECT statements against a dict of ColumnarTable"""
+
+    def __init__(self, tables: Dict[str, ColumnarTable]):
+        self.tables = tables
+
+    def resolve_table(self, name: str) -> Optional[ColumnarTable]:
+        if name in self.tables:
+            return self.tables[name]
+        return self.tables.get(name.lower())
+
+    def execute(self, query: str, params: Union[Dict[str, Any], Sequence[Any], None] = None) -> List[Dict[str, Any]]:
+        statement = SelectParser(query, params).parse()
+        table = self.resolve_table(statement['table'])
+        if table is None:
+            return []
+
+        positions = self._filter(table, statement['where'], range(table.row_count))
+        grouped = statement['group_by'] or any(item['kind'] == 'agg' for item in statement['items'])
+        if grouped:
+            rows = self._aggregate(table, statement, positions)
+            # ORDER BY count(*) etc. refers to the aggregate even when it is aliased
+            aliases = {item['expression']: item['label'] for item in statement['items'] if item['kind'] == 'agg'}
+            statement['order_by'] = [(aliases.get(key, key), descending) for key, descending in statement['order_by']]
+            return self._order_and_limit(rows, statement, lambda row, key: row.get(key))
+
+        columns = self._projection(table, statement['items'])
+        if statement['distinct']:
+            rows, seen = [], set()
+            for position in positions:
+                row = self._project_row(table, position, columns)
+                marker = tuple(_hashable(value) for value in row.values())
+                if marker not in seen:
+                    seen.add(marker)
+                    rows.append(row)
+            return self._order_and_limit(rows, statement, lambda row, key: row.get(key))
+
+        if not statement['order_by']:
+            # Only materialize the rows that will be returned
+            start = statement['offset']
+            end = None if statement['limit'] is None else start + statement['limit']
+            return [self._project_row(table, position, columns) for position in list(positions)[start:end]]
+
+        labels = [label for label, _ in columns]
+        keyed = [(position, self._project_row(table, position, columns)) for position in positions]
+
+        def lookup(entry, key):
+            position, row = entry
+            if key in row:
+                return row[key]
+            values = table.columns.get(key)
+            return values[position] if values is not None else None
+
+        ordered = self._order_and_limit(keyed, statement, lookup, labels)
+        return [row for _, row in ordered]
+
+    # filtering
+    def _filter(self, table: ColumnarTable, node, candidates) -> List[int]:
+        if node is None:
+            return list(candidates)
+        kind = node[0]
+
+        if kind == 'and':
+            # Indexed equality/IN predicates first: they shrink the candidate set cheapest
+            parts = sorted(node[1], key=lambda child: 0 if self._indexable(table, child) else 1)
+            for child in parts:
+                candidates = self._filter(table, child, candidates)
+                if not candidates:
+                    break
+            return list(candidates)
+        if kind == 'or':
+            matched = set()
+            for child in node[1]:
+                matched.update(self._filter(table, child, candidates))
+            return sorted(matched)
+        if kind == 'not':
+            excluded = set(self._filter(table, node[1], candidates))
+            return [position for position in candidates if position not in excluded]
+
+        column = node[1]
+        # An unknown column behaves as all-NULL
+        values = table.columns.get(column)
+
+        if self._indexable(table, node):
+            index = table.index_for(column)
+            keys = [node[3]] if kind == 'cmp' else node[2]
+            hits = set()
+            for key in keys:
+                try:
+                    hits.update(index.get(_index_key(key), ()))
+                except TypeError:
+                    continue
+            if isinstance(candidates, range) and len(candidates) == table.row_count:
+                return sorted(hits)
+            return [position for position in candidates if position in hits]
+
+        if kind == 'cmp':
+            _, _, op, target = node
+            if values is None:
+                return []
+            return [position for position in candidates if _compare(values[position], op, target)]
+        if kind == 'in':
+            _, _, targets, negate = node
+            if values is None:
+                return []
+            keys = {_hashable(target) for target in targets}
+            if negate:
+                return [p for p in candidates if values[p] is not None and _hashable(values[p]) not in keys]
+            return [p for p in candidates if _hashable(values[p]) in keys]
+        if kind == 'like':
+            _, _, regex, negate = node
+            if values is None:
+                return []
+            return [
+                p for p in candidates
+                if values[p] is not None and bool(regex.match(str(values[p]))) != negate
+            ]
+        if kind == 'between':
+            _, _, low, high, negate = node
+            if values is None:
+                return []
+            return [
+                p for p in candidates
+                if values[p] is not None
+                and (_compare(values[p], '>=', low) and _compare(values[p], '<=', high)) != negate
+            ]
+        if kind == 'null':
+            _, _, negate = node
+            if values is None:
+                return [] if negate else list(candidates)
+            return [p for p in candidates if (values[p] is None) != negate]
+        raise QueryError(f"Unsupported predicate: {kind}")
+
+    def _indexable(self, table: ColumnarTable, node) -> bool:
+        if node[0] == 'cmp' and node[2] == '=' and node[3] is not None:
+            return table.index_for(node[1]) is not None
+        if node[0] == 'in' and not node[3]:
+            return table.index_for(node[1]) is not None
+        return False
+
+    # projection
+    def _projection(self, table: ColumnarTable, items: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        columns = []
+        for item in items:
+            if item['kind'] == 'star':
+                columns.extend((name, name) for name in table.columns)
+            else:
+                columns.append((item['label'], item['column']))
+        return columns
+
+    def _project_row(self, table: ColumnarTable, position: int, columns: List[Tuple[str, str]]) -> Dict[str, Any]:
+        row = {}
+        for label, column in columns:
+            values = table.columns.get(column)
+            row[label] = values[position] if values is not None else None
+        return row
+
+    # aggregation
+    def _aggregate(self, table: ColumnarTable, statement: Dict[str, Any], positions: List[int]) -> List[Dict[str, Any]]:
+        group_columns = [table.columns.get(name) for name in statement['group_by']]
+        groups: Dict[Tuple, List[int]] = {}
+        for position in positions:
+            key = tuple(
+                _hashable(values[position]) if values is not None else None
+                for values in group_columns
+            )
+            groups.setdefault(key, []).append(position)
+        if not groups and not statement['group_by']:
+            # Aggregates over an empty input still return one row
+            groups[()] = []
+
+        rows = []
+        for members in groups.values():
+            row = {}
+            for item in statement['items']:
+                if item['kind'] == 'star':
+                    raise QueryError("SELECT * cannot be combined with GROUP BY or aggregates")
+                if item['kind'] == 'column':
+                    values = table.columns.get(item['column'])
+                    row[item['label']] = values[members[0]] if values is not None and members else None
+                    continue
+                row[item['label']] = self._aggregate_value(table, item, members)
+            rows.append(row)
+        return rows
+
+    def _aggregate_value(self, table: ColumnarTable, item: Dict[str, Any], members: List[int]) -> Any:
+        func = item['func']
+        if item['column'] is None:
+            return len(members)
+        column = table.columns.get(item['column'])
+        values = [column[p] for p in members if column[p] is not None] if column is not None else []
+        if item['distinct']:
+            values = list({_hashable(value): value for value in values}.values())
+        if func == 'COUNT':
+            return len(values)
+        if not values:
+            return None
+        if func == 'MIN':
+            return min(values)
+        if func == 'MAX':
+            return max(values)
+        numeric = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        if func == 'SUM':
+            return sum(numeric) if numeric else None
+        if func == 'AVG':
+            return sum(numeric) / len(numeric) if numeric else None
+        raise QueryError(f"Unsupported aggregate: {func}")
+
+    # ordering
+    def _order_and_limit(self, rows: List[Any], statement: Dict[str, Any], lookup,
+                         labels: List[str] = None) -> List[Any]:
+        order_by = statement['order_by']
+        limit, offset = statement['limit'], statement['offset']
+        if order_by:
+            if labels is None and rows:
+                first = rows[0]
+                labels = list(first.keys()) if isinstance(first, dict) else []
+            resolved = [
+                (labels[key - 1] if isinstance(key, int) and labels and 0 < key <= len(labels) else key, descending)
+                for key, descending in order_by
+            ]
+
+            def sort_key(entry):
+                return tuple(_SortKey(lookup(entry, key), descending) for key, descending in resolved)
+
+            if limit is not None:
+                rows = heapq.nsmallest(offset + limit, rows, key=sort_key)
+            else:
+                rows = sorted(rows, key=sort_key)
+        end = None if limit is None else offset + limit
+        return rows[offset:end]
+
+def _hashable(value: Any) -> Any:
+    """``_index_key``, with unhashable values (dicts, lists) keyed by their repr"""
+    try:
+        return _index_key(value)
+    except TypeError:
+        return (type(value), repr(value))
+
+class _SortKey:
+    """Orders NULLs first ascending (last descending) and tolerates mixed types"""
+    __slots__ = ('value', 'descending')
+
+    def __init__(self, value: Any, descending: bool):
+        self.value = value
+        self.descending = descending
+
+    def _less(self, a: Any, b: Any) -> bool:
+        if a is None:
+            return b is not None
+        if b is None:
+            return False
+        try:
+            return a < b
+        except TypeError:
+            return (type(a).__name__, repr(a)) < (type(b).__name__, repr(b))
+
+    def __lt__(self, other: '_SortKey') -> bool:
+        if self.descending:
+            return self._less(other.value, self.value)
+        return self._less(self.value, other.value)
+
+    def __eq__(self, other: '_SortKey') -> bool:
+        return not self._less(self.value, other.value) and not self._less(other.value, self.value)
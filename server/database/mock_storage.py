@@ -0,0 +1,280 @@
+"""
+Mock Warehouse Storage
+Write-behind, append-only persistence: a JSON snapshot plus a JSON Lines log per table
+"""
+
+import os
+import json
+import atexit
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# First line of every log: {"__log_generation__": n}. A snapshot records the
+# generation it folded in, so a log left behind by an interrupted compaction
+# (snapshot replaced, log not yet removed) is recognised and not replayed.
+LOG_HEADER_KEY = '__log_generation__'
+
+def parse_snapshot(data: Any) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """``(rows, log_generation)`` for a table snapshot, or None for other JSON (dataset files).
+
+    Plain row lists are snapshots from before log generations existed.
+    """
+    if isinstance(data, list):
+        return data, -1
+    if isinstance(data, dict) and set(data) == {'log_generation', 'rows'} and isinstance(data['rows'], list):
+        return data['rows'], int(data['log_generation'])
+    return None
+
+class _SharedWriter:
+    """One background thread that flushes and compacts every started store.
+
+    Stores are held until closed so buffered rows cannot be lost to garbage
+    collection, and any store still open at interpreter exit is closed
+    (flushed) by an atexit hook.
+    """
+
+    def __init__(self):
+        self._stores = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.close_all)
+
+    def register(self, store: 'AppendOnlyTableStore') -> None:
+        with self._lock:
+            self._stores.add(store)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='mock-warehouse-writer', daemon=True)
+                self._thread.start()
+
+    def unregister(self, store: 'AppendOnlyTableStore') -> None:
+        with self._lock:
+            self._stores.discard(store)
+        self._wakeup.set()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                stores = list(self._stores)
+                if not stores:
+                    self._thread = None
+                    return
+            # Stores with different intervals are all served at the shortest one
+            self._wakeup.wait(min(store.flush_interval for store in stores))
+            self._wakeup.clear()
+            for store in stores:
+                try:
+                    store.write_pending()
+                except Exception as e:
+                    logger.error(f"Mock warehouse writer error: {str(e)}")
+
+    def close_all(self) -> None:
+        with self._lock:
+            stores = list(self._stores)
+        for store in stores:
+            store.close()
+
+_writer = _SharedWriter()
+
+class AppendOnlyTableStore:
+    """Persists table rows as ``<table>.json`` snapshots plus ``<table>.jsonl`` logs.
+
+    Appends are buffered in memory and written to the log by a shared
+    background thread every ``flush_interval`` seconds (group commit), so an
+    insert costs one buffered line instead of a full-table rewrite. Once a
+    table's log holds ``compact_threshold`` rows it is folded into a fresh
+    snapshot in the background. Loading reads the snapshot and replays the
+    log tail.
+    """
+
+    def __init__(self, data_path: str, flush_interval: float = 0.2,
+                 compact_threshold: int = 50000, fsync: bool = False):
+        self.data_path = data_path
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+
+        self._pending: Dict[str, List[str]] = {}
+        self._log_rows: Dict[str, int] = {}
+        # Generation of each table's current log; a compaction moves to the next one
+        self._generations: Dict[str, int] = {}
+        # Guards the in-memory tables together with the pending buffer
+        self.buffer_lock = threading.RLock()
+        # Serializes file writes (flushes and compactions)
+        self._io_lock = threading.Lock()
+        self._compact_requests: Dict[str, Callable[[], List[Dict[str, Any]]]] = {}
+        self._started = False
+        self.stats = {'appended_rows': 0, 'flushes': 0, 'compactions': 0}
+
+    # -- paths ---------------------------------------------------------------
+
+    def snapshot_path(self, table_name: str) -> str:
+        return os.path.join(self.data_path, f"{table_name}.json")
+
+    def log_path(self, table_name: str) -> str:
+        return os.path.join(self.data_path, f"{table_name}.jsonl")
+
+    # -- loading -------------------------------------------------------------
+
+    def note_snapshot(self, table_name: str, log_generation: int) -> None:
+        """Record that the loaded snapshot already contains logs up to ``log_generation``"""
+        self._generations[table_name] = max(self._generations.get(table_name, 0), log_generation + 1)
+
+    def load_log(self, table_name: str) -> List[Dict[str, Any]]:
+        """Rows appended since the last snapshot; a torn final line is ignored"""
+        path = self.log_path(table_name)
+        rows = []
+        if not os.path.exists(path):
+            return rows
+
+        generation = 0
+        with open(path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable log line {line_number} in {path}")
+                    continue
+                if line_number == 1 and isinstance(row, dict) and set(row) == {LOG_HEADER_KEY}:
+                    generation = int(row[LOG_HEADER_KEY])
+                    continue
+                rows.append(row)
+
+        if generation < self._generations.get(table_name, 0):
+            # Compaction was interrupted after the snapshot was replaced: these rows are in it
+            logger.info(f"Discarding {path}: already folded into the {table_name} snapshot")
+            os.remove(path)
+            return []
+
+        self._generations[table_name] = generation
+        self._log_rows[table_name] = len(rows)
+        return rows
+
+    def log_tables(self) -> List[str]:
+        """Tables that only exist as a log (no snapshot yet)"""
+        return [
+            filename[:-6] for filename in os.listdir(self.data_path)
+            if filename.endswith('.jsonl') and not os.path.exists(self.snapshot_path(filename[:-6]))
+        ]
+
+    # -- writing -------------------------------------------------------------
+
+    def start(self) -> None:
+        """Hand the store to the shared background writer"""
+        if self._started or self.flush_interval <= 0:
+            return
+        self._started = True
+        _writer.register(self)
+
+    def append(self, table_name: str, rows: List[Dict[str, Any]],
+               apply: Callable[[List[Dict[str, Any]]], None] = None) -> None:
+        """Queue rows for the table's log.
+
+        ``apply`` updates the in-memory table under the same lock as the
+        queue so a concurrent compaction sees both or neither.
+        """
+        lines = [json.dumps(row, default=str, separators=(',', ':')) for row in rows]
+        with self.buffer_lock:
+            if apply is not None:
+                apply(rows)
+            self._pending.setdefault(table_name, []).extend(lines)
+            self.stats['appended_rows'] += len(rows)
+        if not self._started:
+            # No background writer: write through
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered lines to their logs"""
+        with self._io_lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        with self.buffer_lock:
+            pending, self._pending = self._pending, {}
+        for table_name, lines in pending.items():
+            if not lines:
+                continue
+            path = self.log_path(table_name)
+            header = [] if os.path.exists(path) else [
+                json.dumps({LOG_HEADER_KEY: self._generations.get(table_name, 0)})
+            ]
+            with open(path, 'a') as f:
+                f.write('\n'.join(header + lines) + '\n')
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self._log_rows[table_name] = self._log_rows.get(table_name, 0) + len(lines)
+        if pending:
+            with self.buffer_lock:
+                self.stats['flushes'] += 1
+
+    def needs_compaction(self, table_name: str) -> bool:
+        """Whether the table's log, counting buffered lines, has reached the threshold"""
+        with self.buffer_lock:
+            logged = self._log_rows.get(table_name, 0) + len(self._pending.get(table_name, ()))
+            return table_name not in self._compact_requests and logged >= self.compact_threshold
+
+    def request_compaction(self, table_name: str, snapshot_rows: Callable[[], List[Dict[str, Any]]]) -> None:
+        """Compact ``table_name`` in the background; ``snapshot_rows`` returns every current row"""
+        if not self._started:
+            self.compact(table_name, snapshot_rows)
+            return
+        with self.buffer_lock:
+            self._compact_requests[table_name] = snapshot_rows
+        _writer.wake()
+
+    def compact(self, table_name: str, snapshot_rows: Callable[[], List[Dict[str, Any]]]) -> None:
+        """Write a fresh snapshot and start a new log generation.
+
+        Replacing the snapshot is the commit point. The snapshot names the
+        log generation it includes, so if the process dies before the old
+        log is removed, the next load discards that log instead of
+        replaying it on top of the snapshot.
+        """
+        with self._io_lock:
+            # Rows captured here include everything still pending, so the pending lines are dropped
+            with self.buffer_lock:
+                rows = snapshot_rows()
+                self._pending.pop(table_name, None)
+            generation = self._generations.get(table_name, 0)
+            temp_path = self.snapshot_path(table_name) + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump({'log_generation': generation, 'rows': rows}, f, default=str, separators=(',', ':'))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path(table_name))
+            if os.path.exists(self.log_path(table_name)):
+                os.remove(self.log_path(table_name))
+            self._generations[table_name] = generation + 1
+            self._log_rows[table_name] = 0
+            with self.buffer_lock:
+                self.stats['compactions'] += 1
+
+    def write_pending(self) -> None:
+        """Flush buffered lines, then run any requested compactions"""
+        self.flush()
+        with self.buffer_lock:
+            requests, self._compact_requests = self._compact_requests, {}
+        for table_name, snapshot_rows in requests.items():
+            self.compact(table_name, snapshot_rows)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.buffer_lock:
+            return dict(self.stats)
+
+    def close(self) -> None:
+        """Detach from the background writer and flush everything still buffered"""
+        if self._started:
+            _writer.unregister(self)
+            self._started = False
+        self.write_pending()
@@ -1,4 +1,6 @@
-from . import DatabaseAdapter
+from . import DatabaseAdapter, config_value
+from .mock_query_engine import ColumnarTable, QueryEngine
+from .mock_storage import AppendOnlyTableStore, parse_snapshot
 from typing import Dict, List, Any
 import json
 import os
@@ -17,11 +19,22 @@ class MockWarehouseAdapter(DatabaseAdapter):
             config = {}
         
         # Extract data path from config or use default
-        self.data_path = config.get('MOCK_WAREHOUSE_DATA_PATH', 'server/mock_warehouse/data')
+        self.data_path = config_value(config, 'MOCK_WAREHOUSE_DATA_PATH', 'server/mock_warehouse/data')
         self.features = ['warehouse_sql', 'json_support', 'sigds_schema', 'real_time', 'ai_functions']
-        self.tables = {}
+        self.bulk_batch_size = int(config_value(config, 'BULK_LOAD_BATCH_SIZE', self.bulk_batch_size))
+        self.stream_batch_size = int(config_value(config, 'QUERY_STREAM_BATCH_SIZE', self.stream_batch_size))
+        self.tables: Dict[str, ColumnarTable] = {}
+        self.query_engine = QueryEngine(self.tables)
+        # Inserts go to a buffered append-only log instead of rewriting the table file
+        self.store = AppendOnlyTableStore(
+            self.data_path,
+            flush_interval=float(config_value(config, 'MOCK_WAREHOUSE_FLUSH_INTERVAL', 0.2)),
+            compact_threshold=int(config_value(config, 'MOCK_WAREHOUSE_COMPACT_THRESHOLD', 50000)),
+            fsync=bool(config_value(config, 'MOCK_WAREHOUSE_FSYNC', False))
+        )
         self._load_mock_data()
         self._setup_sigds_schema()
+        self.store.start()
     
     def _load_mock_data(self):
         """Load mock data from files"""
@@ -30,15 +43,38 @@ class MockWarehouseAdapter(DatabaseAdapter):
                 os.makedirs(self.data_path, exist_ok=True)
             
             # Load existing mock data
-            for filename in os.listdir(self.data_path):
+            single_tables = {}
+            for filename in sorted(os.listdir(self.data_path)):
                 if filename.endswith('.json'):
                     table_name = filename[:-5]  # Remove .json extension
                     filepath = os.path.join(self.data_path, filename)
                     with open(filepath, 'r') as f:
-                        self.tables[table_name] = json.load(f)
+                        data = json.load(f)
+                    snapshot = parse_snapshot(data)
+                    if snapshot is not None:
+                        single_tables[table_name] = snapshot
+                    elif isinstance(data, dict):
+                        # A dataset file mapping table name -> rows
+                        for name, rows in data.items():
+                            if isinstance(rows, list):
+                                self.tables[name] = ColumnarTable(rows)
+            
+            # Per-table files hold the latest saved rows and take precedence
+            for table_name, (rows, log_generation) in single_tables.items():
+                self.tables[table_name] = ColumnarTable(rows)
+                self.store.note_snapshot(table_name, log_generation)
+            
+            # Replay rows appended since each table's last snapshot; a table with
+            # no snapshot starts from its dataset rows, or empty if it has none
+            for table_name in self.store.log_tables():
+                if table_name not in self.tables:
+                    self.tables[table_name] = ColumnarTable()
+            for table_name, table in self.tables.items():
+                for row in self.store.load_log(table_name):
+                    table.append(row)
         except Exception as e:
             logger.warning(f"Could not load mock data: {str(e)}")
-            self.tables = {}
+            self.tables.clear()
     
     def _setup_sigds_schema(self):
         """Setup SIGDS schema tables for Sigma compatibility"""
@@ -75,30 +111,45 @@ class MockWarehouseAdapter(DatabaseAdapter):
         
         for table_name, schema in sigds_tables.items():
             if table_name not in self.tables:
-                self.tables[table_name] = []
+                self.tables[table_name] = ColumnarTable()
     
     def _save_table_data(self, table_name: str):
         """Save table data to file"""
         try:
-            filepath = os.path.join(self.data_path, f"{table_name}.json")
-            with open(filepath, 'w') as f:
-                json.dump(self.tables[table_name], f, indent=2, default=str)
+            self.store.compact(table_name, self.tables[table_name].to_rows)
         except Exception as e:
             logger.error(f"Error saving mock data: {str(e)}")
     
+    def _append_rows(self, table_name: str, rows: List[Dict]):
+        """Add rows in memory and queue them for the table's log"""
+        table = self.tables[table_name]
+        
+        def apply(new_rows):
+            for row in new_rows:
+                table.append(row)
+        
+        self.store.append(table_name, rows, apply=apply)
+        if self.store.needs_compaction(table_name):
+            self.store.request_compaction(table_name, table.to_rows)
+    
+    def close(self):
+        """Flush buffered writes and stop the background writer"""
+        self.store.close()
+    
     def _mock_query_executor(self, query: str, params: Dict = None) -> List[Dict]:
         """Execute mock queries against in-memory data"""
         try:
-            # Simple SQL parsing for mock execution
-            query = query.strip().upper()
+            # Dispatch on the statement keyword; literals keep their case
+            query = query.strip()
+            statement = query[:6].upper()
             
-            if query.startswith('SELECT'):
+            if statement == 'SELECT':
                 return self._execute_select(query, params)
-            elif query.startswith('INSERT'):
+            elif statement == 'INSERT':
                 return self._execute_insert(query, params)
-            elif query.startswith('UPDATE'):
+            elif statement == 'UPDATE':
                 return self._execute_update(query, params)
-            elif query.startswith('DELETE'):
+            elif statement == 'DELETE':
                 return self._execute_delete(query, params)
             else:
                 return []
@@ -108,17 +159,8 @@ class MockWarehouseAdapter(DatabaseAdapter):
     
     def _execute_select(self, query: str, params: Dict = None) -> List[Dict]:
         """Execute SELECT queries"""
-        # Extract table name from query
-        match = re.search(r'FROM\s+(\w+)', query, re.IGNORECASE)
-        if not match:
-            return []
-        
-        table_name = match.group(1).lower()
-        if table_name not in self.tables:
-            return []
-        
-        # For now, return all data (can be enhanced with WHERE clauses)
-        return self.tables[table_name]
+        # Projection, WHERE, GROUP BY aggregates, ORDER BY and LIMIT run on columnar storage
+        return self.query_engine.execute(query, params)
     
     def _execute_insert(self, query: str, params: Dict = None) -> List[Dict]:
         """Execute INSERT queries"""
@@ -129,15 +171,14 @@ class MockWarehouseAdapter(DatabaseAdapter):
         
         table_name = match.group(1).lower()
         if table_name not in self.tables:
-            self.tables[table_name] = []
+            self.tables[table_name] = ColumnarTable()
         
         # Add mock data
         if params:
             new_row = params.copy()
             new_row['id'] = str(uuid.uuid4())
             new_row['created_at'] = datetime.utcnow().isoformat()
-            self.tables[table_name].append(new_row)
-            self._save_table_data(table_name)
+            self._append_rows(table_name, [new_row])
         
         return [{'affected_rows': 1}]
     
@@ -159,7 +200,7 @@ class MockWarehouseAdapter(DatabaseAdapter):
         """Create table with specified schema"""
         try:
             if table_name not in self.tables:
-                self.tables[table_name] = []
+                self.tables[table_name] = ColumnarTable()
                 self._save_table_data(table_name)
             return True
         except Exception as e:
@@ -169,21 +210,28 @@ class MockWarehouseAdapter(DatabaseAdapter):
     def insert_data(self, table_name: str, data: List[Dict]) -> bool:
         """Insert data into specified table"""
         try:
-            if table_name not in self.tables:
-                self.tables[table_name] = []
-            
-            for row in data:
-                new_row = row.copy()
-                new_row['id'] = str(uuid.uuid4())
-                new_row['created_at'] = datetime.utcnow().isoformat()
-                self.tables[table_name].append(new_row)
-            
-            self._save_table_data(table_name)
+            self.load_batch(table_name, data)
             return True
         except Exception as e:
             logger.error(f"Mock warehouse data insertion error: {str(e)}")
             return False
     
+    def load_batch(self, table_name: str, rows: List[Dict]) -> int:
+        """Stamp a batch with ids and append it to the table and its log in one buffered write"""
+        if table_name not in self.tables:
+            self.tables[table_name] = ColumnarTable()
+        
+        created_at = datetime.utcnow().isoformat()
+        new_rows = []
+        for row in rows:
+            new_row = row.copy()
+            new_row['id'] = str(uuid.uuid4())
+            new_row['created_at'] = created_at
+            new_rows.append(new_row)
+        
+        self._append_rows(table_name, new_rows)
+        return len(new_rows)
+    
     def get_table_schema(self, table_name: str) -> Dict:
         """Get table schema information"""
         try:
@@ -236,6 +284,7 @@ class MockWarehouseAdapter(DatabaseAdapter):
                 'connection': True,
                 'tables': list(self.tables.keys()),
                 'data_path': self.data_path,
+                'storage': self.store.get_stats(),
                 'timestamp': datetime.utcnow().isoformat()
             }
         except Exception as e:
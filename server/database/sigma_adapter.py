@@ -1,4 +1,4 @@
-from . import DatabaseAdapter
+from . import DatabaseAdapter, config_value
 from typing import Dict, List, Any
 import logging
 import json
@@ -11,13 +11,15 @@ class SigmaWarehouseAdapter(DatabaseAdapter):
     def __init__(self, warehouse_config: Dict):
         self.config = warehouse_config
         self.features = ['warehouse_sql', 'json_support', 'sigds_schema', 'real_time', 'ai_functions', 'warehouse_native']
+        self.bulk_batch_size = int(config_value(warehouse_config, 'BULK_LOAD_BATCH_SIZE', self.bulk_batch_size))
+        self.stream_batch_size = int(config_value(warehouse_config, 'QUERY_STREAM_BATCH_SIZE', self.stream_batch_size))
         self._connection = None
         self._connect_to_warehouse()
     
     def _connect_to_warehouse(self):
         """Connect to the configured warehouse"""
         try:
-            warehouse_type = self.config.get('warehouse_type', 'snowflake')
+            warehouse_type = config_value(self.config, 'warehouse_type', 'snowflake')
             
             if warehouse_type == 'snowflake':
                 self._connect_to_snowflake()
@@ -41,10 +43,10 @@ class SigmaWarehouseAdapter(DatabaseAdapter):
             self._connection = {
                 'type': 'snowflake',
                 'status': 'connected',
-                'account': self.config.get('account'),
-                'warehouse': self.config.get('warehouse'),
-                'database': self.config.get('database'),
-                'schema': self.config.get('schema')
+                'account': config_value(self.config, 'account'),
+                'warehouse': config_value(self.config, 'warehouse'),
+                'database': config_value(self.config, 'database'),
+                'schema': config_value(self.config, 'schema')
             }
         except Exception as e:
             logger.error(f"Snowflake connection failed: {str(e)}")
@@ -58,8 +60,8 @@ class SigmaWarehouseAdapter(DatabaseAdapter):
             self._connection = {
                 'type': 'bigquery',
                 'status': 'connected',
-                'project': self.config.get('project'),
-                'dataset': self.config.get('dataset')
+                'project': config_value(self.config, 'project'),
+                'dataset': config_value(self.config, 'dataset')
             }
         except Exception as e:
             logger.error(f"BigQuery connection failed: {str(e)}")
@@ -73,9 +75,9 @@ class SigmaWarehouseAdapter(DatabaseAdapter):
             self._connection = {
                 'type': 'databricks',
                 'status': 'connected',
-                'workspace': self.config.get('workspace'),
-                'catalog': self.config.get('catalog'),
-                'schema': self.config.get('schema')
+                'workspace': config_value(self.config, 'workspace'),
+                'catalog': config_value(self.config, 'catalog'),
+                'schema': config_value(self.config, 'schema')
             }
         except Exception as e:
             logger.error(f"Databricks connection failed: {str(e)}")
@@ -117,19 +119,25 @@ class SigmaWarehouseAdapter(DatabaseAdapter):
     def insert_data(self, table_name: str, data: List[Dict]) -> bool:
         """Insert data into specified table"""
         try:
-            if not self._connection:
-                return False
-            
-            # This would insert data into the warehouse
-            logger.info(f"Inserting {len(data)} rows into {table_name}...")
-            
-            # For now, return success
+            self.load_batch(table_name, data)
             return True
             
         except Exception as e:
             logger.error(f"Warehouse data insertion error: {str(e)}")
             return False
     
+    def load_batch(self, table_name: str, rows: List[Dict]) -> int:
+        """Load one batch into the warehouse"""
+        if not self._connection:
+            raise Exception("No warehouse connection available")
+        
+        # This would stage the batch and load it with the warehouse's bulk path
+        # (Snowflake COPY INTO / write_pandas, BigQuery load jobs, Databricks COPY INTO)
+        logger.info(f"Loading batch of {len(rows)} rows into {table_name}...")
+        
+        # For now, report the batch as loaded
+        return len(rows)
+    
     def get_table_schema(self, table_name: str) -> Dict:
         """Get table schema information"""
         try:
@@ -3,21 +3,53 @@ SQLite Database Adapter for GrowthMarketer AI
 Wraps existing SQLAlchemy functionality for backward compatibility
 """
 
+import os
+import re
+import json
+from datetime import date, datetime
 from typing import Dict, List, Any, Optional
 from sqlalchemy import text
-from . import DatabaseAdapter
+from . import DatabaseAdapter, config_value
+from .streaming import QueryStream, cursor_batches, open_generator_stream
+from .sqlite_pool import SQLiteConnectionPool, is_read_statement, resolve_sqlite_path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Flask-SQLAlchemy resolves relative sqlite:/// paths against the app's instance folder
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+
+IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+BINDABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+def _sqlite_value(value: Any) -> Any:
+    """Convert values sqlite3 cannot bind the way SQLAlchemy would store them"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
 class SQLiteAdapter(DatabaseAdapter):
-    """SQLite implementation for local development/testing"""
+    """SQLite implementation for local development/testing
+    
+    Raw SQL goes through a WAL-mode connection pool (concurrent readers, one
+    queued writer) when the database is a file; in-memory and non-SQLite
+    URIs fall back to the shared SQLAlchemy session.
+    """
     
     def __init__(self, config: Dict):
         self.config = config
         self.features = ['basic_sql', 'json_support', 'local_storage', 'sqlalchemy_orm']
         self.db_session = None
+        self.pool = None
+        self.bulk_batch_size = int(config_value(config, 'BULK_LOAD_BATCH_SIZE', self.bulk_batch_size))
+        self.stream_batch_size = int(config_value(config, 'QUERY_STREAM_BATCH_SIZE', self.stream_batch_size))
         self._init_database()
+        self._init_pool()
     
     def _init_database(self):
         """Initialize database connection"""
@@ -29,18 +61,80 @@ class SQLiteAdapter(DatabaseAdapter):
             logger.error(f"Failed to initialize SQLite adapter: {e}")
             self.db_session = None
     
+    def _init_pool(self):
+        """Open the WAL connection pool for file-backed databases"""
+        try:
+            path = config_value(self.config, 'SQLITE_DATABASE_PATH') or resolve_sqlite_path(
+                config_value(self.config, 'SQLALCHEMY_DATABASE_URI', ''), INSTANCE_PATH
+            )
+            if not path:
+                logger.info("SQLite adapter using the SQLAlchemy session (no database file to pool)")
+                return
+            self.pool = SQLiteConnectionPool(
+                path,
+                read_connections=int(config_value(self.config, 'SQLITE_READ_CONNECTIONS', 4)),
+                busy_timeout=float(config_value(self.config, 'SQLITE_BUSY_TIMEOUT', 5.0)),
+                mmap_size=int(config_value(self.config, 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+                cache_size_kb=int(config_value(self.config, 'SQLITE_CACHE_SIZE_KB', 16384))
+            )
+            self.features.extend(['connection_pool', 'concurrent_reads'])
+            logger.info(f"SQLite adapter pooling {self.pool.read_connections} read connections on {path}")
+        except Exception as e:
+            logger.error(f"Failed to open SQLite connection pool: {e}")
+            self.pool = None
+    
     def execute_query(self, query: str, params: Dict = None) -> List[Dict]:
-        """Execute SQL query and return results"""
+        """Execute SQL query and return results; errors are logged and re-raised"""
+        if self.pool:
+            try:
+                if is_read_statement(query):
+                    return self.pool.read(query, params)
+                return self.pool.execute_write(query, params)
+            except Exception as e:
+                logger.error(f"Error executing query: {e}")
+                raise
+        
         if not self.db_session:
-            logger.error("Database session not available")
-            return []
+            raise Exception("Database session not available")
         
         try:
             result = self.db_session.execute(text(query), params or {})
-            return [dict(row) for row in result]
+            return [dict(row._mapping) for row in result]
         except Exception as e:
             logger.error(f"Error executing query: {e}")
-            return []
+            raise
+    
+    def stream_query(self, query: str, params: Dict = None, batch_size: int = None,
+                     as_tuples: bool = False) -> QueryStream:
+        """Stream rows from a live cursor, fetching ``batch_size`` rows at a time"""
+        batch_size = batch_size or self.stream_batch_size
+        
+        if self.pool:
+            if not is_read_statement(query):
+                raise ValueError("Only read statements can be streamed")
+            return QueryStream(lambda: open_generator_stream(
+                cursor_batches(self.pool.cursor(query, params), batch_size, as_tuples)
+            ))
+        
+        if not self.db_session:
+            return super().stream_query(query, params, batch_size, as_tuples)
+        
+        def open_batches():
+            result = self.db_session.execute(
+                text(query), params or {},
+                execution_options={'stream_results': True, 'yield_per': batch_size}
+            )
+            
+            def batches():
+                try:
+                    for partition in result.partitions(batch_size):
+                        yield [tuple(row) for row in partition] if as_tuples else [dict(row._mapping) for row in partition]
+                finally:
+                    result.close()
+            
+            return list(result.keys()), batches()
+        
+        return QueryStream(open_batches)
     
     def create_table(self, table_name: str, schema: Dict) -> bool:
         """Create table with specified schema"""
@@ -80,6 +174,60 @@ class SQLiteAdapter(DatabaseAdapter):
             self.db_session.rollback()
             return False
     
+    def _column_defaults(self, table_name: str) -> Dict[str, Any]:
+        """Python-side column defaults from the SQLAlchemy model, which raw INSERTs would skip"""
+        try:
+            from app import db
+            import app.models  # noqa: F401 (registers the model tables)
+            table = db.metadata.tables.get(table_name)
+        except Exception:
+            table = None
+        if table is None:
+            return {}
+        return {
+            column.name: column.default
+            for column in table.columns
+            if column.default is not None and (column.default.is_scalar or column.default.is_callable)
+        }
+    
+    def load_batch(self, table_name: str, rows: List[Dict]) -> int:
+        """Insert a batch with one executemany on the writer connection (one transaction)"""
+        if not self.pool:
+            return super().load_batch(table_name, rows)
+        
+        defaults = self._column_defaults(table_name)
+        columns = list(dict.fromkeys([key for row in rows for key in row] + list(defaults)))
+        for name in [table_name] + columns:
+            if not IDENTIFIER_PATTERN.match(name):
+                raise ValueError(f"Invalid identifier for bulk load: {name!r}")
+        
+        # Most values bind as-is; only containers and dates need converting
+        scalar_defaults = {name: _sqlite_value(default.arg) for name, default in defaults.items() if default.is_scalar}
+        callable_defaults = {name: default.arg for name, default in defaults.items() if default.is_callable}
+        
+        values = []
+        for row in rows:
+            record = []
+            for column in columns:
+                if column in row:
+                    value = row[column]
+                    if type(value) not in BINDABLE_TYPES:
+                        value = _sqlite_value(value)
+                elif column in callable_defaults:
+                    value = _sqlite_value(callable_defaults[column](None))
+                else:
+                    value = scalar_defaults.get(column)
+                record.append(value)
+            values.append(record)
+        
+        statement = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        
+        def work(connection):
+            connection.executemany(statement, values)
+            return len(values)
+        
+        return self.pool.write(work)
+    
     def get_table_schema(self, table_name: str) -> Dict:
         """Get table schema information"""
         if not self.db_session:
@@ -115,28 +263,36 @@ class SQLiteAdapter(DatabaseAdapter):
     
     def get_capabilities(self) -> Dict[str, Any]:
         """Get database capabilities and features"""
+        pooled = self.pool is not None
         return {
             'type': 'sqlite',
             'features': self.features,
             'supports_warehouse': False,
             'supports_real_time': False,
             'supports_ai_functions': False,
-            'max_connections': 1,
+            # Pooled readers run in parallel next to the single writer
+            'max_connections': self.pool.read_connections + 1 if pooled else 1,
+            'max_concurrent_reads': self.pool.read_connections if pooled else 1,
+            'max_concurrent_writes': 1,
+            'journal_mode': self.pool.journal_mode if pooled else None,
             'storage_type': 'local_file'
         }
     
     def health_check(self) -> Dict[str, Any]:
         """Check database health and status"""
         try:
-            if self.db_session:
+            if self.pool or self.db_session:
                 # Test basic query
                 result = self.execute_query("SELECT 1 as test")
-                return {
+                health = {
                     'status': 'healthy',
                     'type': 'sqlite',
                     'connection': 'active',
                     'test_query': 'successful' if result else 'failed'
                 }
+                if self.pool:
+                    health['pool'] = self.pool.info()
+                return health
             else:
                 return {
                     'status': 'unhealthy',
@@ -150,4 +306,10 @@ class SQLiteAdapter(DatabaseAdapter):
                 'type': 'sqlite',
                 'connection': 'error',
                 'error': str(e)
-            } 
\ No newline at end of file
+            } 
+    
+    def close(self):
+        """Stop the writer thread and close pooled connections"""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
@@ -0,0 +1,284 @@
+"""
+SQLite Connection Pool
+WAL-mode SQLite access: pooled read connections plus one writer thread fed by a queue
+"""
+
+import os
+import re
+import queue
+import sqlite3
+import threading
+import logging
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statements that never write, so they can run on a pooled read connection
+READ_KEYWORDS = ('select', 'with', 'explain', 'values')
+
+# A CTE can front INSERT/UPDATE/DELETE/REPLACE, so WITH statements are only
+# reads when none of these appear outside string literals and quoted names
+WRITE_KEYWORD_RE = re.compile(r'\b(insert|update|delete|replace)\b')
+QUOTED_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]")
+
+def is_read_statement(query: str) -> bool:
+    stripped = query.lstrip().lower()
+    keyword = stripped.split(None, 1)[0] if stripped else ''
+    if keyword == 'pragma':
+        # "PRAGMA name" reads a setting, "PRAGMA name = value" changes it
+        return '=' not in stripped
+    if keyword == 'with':
+        # Ambiguous matches (e.g. the replace() function) go to the writer, which can also read
+        return not WRITE_KEYWORD_RE.search(QUOTED_RE.sub(' ', stripped))
+    return keyword in READ_KEYWORDS
+
+def resolve_sqlite_path(uri: str, instance_path: str) -> Optional[str]:
+    """Database file behind a ``sqlite:///`` URI, or None for in-memory/non-SQLite URIs.
+
+    Relative paths are resolved against the Flask instance folder, the same
+    way Flask-SQLAlchemy does.
+    """
+    if not uri or not uri.startswith('sqlite:///'):
+        return None
+    path = uri[len('sqlite:///'):].split('?', 1)[0]
+    if not path or path == ':memory:':
+        return None
+    return path if os.path.isabs(path) else os.path.join(instance_path, path)
+
+class SQLiteConnectionPool:
+    """Concurrent access to one SQLite file.
+
+    The database runs in WAL journal mode, so readers never block the
+    writer and the writer never blocks readers. Reads borrow a connection
+    from a pool of up to ``read_connections`` (connections are reused per
+    thread while borrowed and kept warm between requests). Writes are queued
+    to a single writer thread that owns the only write connection: SQLite
+    allows one writer at a time anyway, and draining the queue in one
+    transaction (each statement in its own savepoint) turns a burst of
+    small writes into a single commit. If that commit fails (for example a
+    deferred foreign key one job violated), the batch is rolled back and
+    each job is retried in a transaction of its own, so only the offending
+    job fails.
+    """
+
+    def __init__(self, path: str, read_connections: int = 4, busy_timeout: float = 5.0,
+                 mmap_size: int = 256 * 1024 * 1024, cache_size_kb: int = 16384,
+                 max_write_batch: int = 64):
+        self.path = path
+        self.read_connections = max(1, read_connections)
+        self.busy_timeout = busy_timeout
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.max_write_batch = max(1, max_write_batch)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.read_connections)
+        self._opened = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self._writes: 'queue.Queue' = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {'reads': 0, 'writes': 0, 'write_batches': 0, 'read_waits': 0, 'batch_retries': 0}
+        self._stats_lock = threading.Lock()
+
+        # Switching to WAL is persistent, so one connection does it up front
+        connection = self._connect()
+        self.journal_mode = connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        connection.close()
+        if self.journal_mode != 'wal':
+            logger.warning(f"SQLite database {path} is in {self.journal_mode} mode; readers may block on writes")
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                     isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        connection.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        connection.execute("PRAGMA temp_store=MEMORY")
+        connection.execute("PRAGMA foreign_keys=ON")
+        if read_only:
+            connection.execute("PRAGMA query_only=ON")
+        return connection
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    # -- reads ---------------------------------------------------------------
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read connection (the same one for nested use on a thread)"""
+        borrowed = getattr(self._local, 'connection', None)
+        if borrowed is not None:
+            yield borrowed
+            return
+
+        if not self._slots.acquire(blocking=False):
+            self._count('read_waits')
+            if not self._slots.acquire(timeout=self.busy_timeout):
+                raise TimeoutError(f"No SQLite read connection free after {self.busy_timeout}s")
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect(read_only=True)
+                with self._lock:
+                    self._opened += 1
+            self._local.connection = connection
+            try:
+                yield connection
+            finally:
+                self._local.connection = None
+                if connection.in_transaction:
+                    connection.rollback()
+                self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, query: str, params: Any = None) -> Iterator[sqlite3.Cursor]:
+        """An executed cursor on a borrowed read connection, for fetching rows incrementally"""
+        with self.reader() as connection:
+            cursor = connection.execute(query, params or {})
+            self._count('reads')
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def read(self, query: str, params: Any = None) -> List[Dict[str, Any]]:
+        with self.reader() as connection:
+            rows = connection.execute(query, params or {}).fetchall()
+        self._count('reads')
+        return [dict(row) for row in rows]
+
+    # -- writes --------------------------------------------------------------
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SQLite connection pool is closed")
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name='sqlite-writer', daemon=True)
+                self._writer.start()
+
+    def submit(self, work: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue ``work(connection)`` for the writer thread; it runs inside a transaction"""
+        self._ensure_writer()
+        future: Future = Future()
+        self._writes.put((work, future))
+        return future
+
+    def write(self, work: Callable[[sqlite3.Connection], Any], timeout: Optional[float] = None) -> Any:
+        if threading.current_thread() is self._writer:
+            raise RuntimeError("Nested SQLite write from the writer thread")
+        return self.submit(work).result(timeout)
+
+    def execute_write(self, query: str, params: Any = None) -> List[Dict[str, Any]]:
+        def work(connection):
+            cursor = connection.execute(query, params or {})
+            rows = [dict(row) for row in cursor.fetchall()] if cursor.description else []
+            return rows or [{'rows_affected': cursor.rowcount}]
+        return self.write(work)
+
+    def _write_loop(self) -> None:
+        connection = self._connect()
+        try:
+            while True:
+                job = self._writes.get()
+                if job is None:
+                    return
+                batch = [job]
+                while len(batch) < self.max_write_batch:
+                    try:
+                        job = self._writes.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        self._writes.put(None)
+                        break
+                    batch.append(job)
+                self._run_batch(connection, batch)
+        finally:
+            connection.close()
+
+    def _run_batch(self, connection: sqlite3.Connection, batch: List[tuple]) -> None:
+        jobs = [(work, future) for work, future in batch if future.set_running_or_notify_cancel()]
+        if jobs:
+            self._run_jobs(connection, jobs)
+
+    def _run_jobs(self, connection: sqlite3.Connection, jobs: List[tuple]) -> None:
+        results = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for work, future in jobs:
+                # A failing job rolls back to its savepoint without undoing the rest of the batch
+                connection.execute("SAVEPOINT job")
+                try:
+                    value = work(connection)
+                    connection.execute("RELEASE job")
+                    results.append((future, value, None))
+                except Exception as e:
+                    connection.execute("ROLLBACK TO job")
+                    connection.execute("RELEASE job")
+                    results.append((future, None, e))
+            connection.execute("COMMIT")
+        except Exception as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            if len(jobs) > 1:
+                logger.warning(f"SQLite write batch of {len(jobs)} failed ({e}); retrying each job on its own")
+                self._count('batch_retries')
+                for job in jobs:
+                    self._run_jobs(connection, [job])
+                return
+            logger.error(f"SQLite write failed: {e}")
+            jobs[0][1].set_exception(e)
+            return
+
+        self._count('write_batches')
+        self._count('writes', len(results))
+        for future, value, error in results:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'journal_mode': self.journal_mode,
+            'read_connections': self.read_connections,
+            'open_read_connections': self._opened,
+            'pending_writes': self._writes.qsize(),
+            **self.get_stats()
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._writes.put(None)
+            writer.join(timeout=5)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
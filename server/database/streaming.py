@@ -0,0 +1,84 @@
+"""
+Query Streaming
+Lazily opened result streams that yield fixed-size row batches, plus chunked JSON encoders
+"""
+
+import json
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+DEFAULT_STREAM_BATCH_SIZE = 1000
+
+class QueryStream:
+    """Row batches from one query, fetched as the caller iterates.
+
+    ``open_batches`` runs the query and returns ``(columns, batch_iterator)``;
+    it is called on first iteration, after which ``columns`` is set. Rows are
+    tuples in ``columns`` order or dicts, depending on how the stream was
+    requested. Closing the stream (or exhausting it) releases the cursor.
+    """
+
+    def __init__(self, open_batches: Callable[[], Tuple[List[str], Iterator[List[Any]]]]):
+        self._open_batches = open_batches
+        self._batches: Optional[Iterator[List[Any]]] = None
+        self.columns: Optional[List[str]] = None
+
+    def open(self) -> 'QueryStream':
+        """Run the query now so errors surface before any output is sent"""
+        if self._batches is None:
+            self.columns, self._batches = self._open_batches()
+        return self
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        return self.open()._batches
+
+    def rows(self) -> Iterator[Any]:
+        for batch in self:
+            yield from batch
+
+    def close(self) -> None:
+        if self._batches is not None and hasattr(self._batches, 'close'):
+            self._batches.close()
+
+def cursor_batches(open_cursor, batch_size: int, as_tuples: bool) -> Iterator[Any]:
+    """Generator over a DB-API cursor: yields the column names first, then row batches.
+
+    ``open_cursor`` is a context manager yielding an executed cursor; it stays
+    open until the generator finishes or is closed.
+    """
+    with open_cursor as cursor:
+        columns = [description[0] for description in cursor.description or []]
+        yield columns
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield [tuple(row) for row in batch] if as_tuples else [dict(zip(columns, row)) for row in batch]
+
+def open_generator_stream(generator: Iterator[Any]) -> Tuple[List[str], Iterator[List[Any]]]:
+    """Split a ``cursor_batches``-style generator into its columns and its batches"""
+    return next(generator), generator
+
+def iter_json_chunks(stream: QueryStream) -> Iterator[str]:
+    """Encode a stream as ``{"columns": [...], "rows": [...]}``, one chunk per batch"""
+    stream.open()
+    try:
+        yield '{"columns": ' + json.dumps(stream.columns) + ', "rows": ['
+        first = True
+        for batch in stream:
+            if not batch:
+                continue
+            chunk = ', '.join(json.dumps(row, default=str) for row in batch)
+            yield chunk if first else ', ' + chunk
+            first = False
+        yield ']}'
+    finally:
+        stream.close()
+
+def iter_ndjson_chunks(stream: QueryStream) -> Iterator[str]:
+    """Encode a stream as newline-delimited JSON, one chunk per batch"""
+    stream.open()
+    try:
+        for batch in stream:
+            yield ''.join(json.dumps(row, default=str) + '\n' for row in batch)
+    finally:
+        stream.close()
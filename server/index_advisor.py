@@ -0,0 +1,162 @@
+# index_advisor.py
+"""
+Index advisor for the users analytics queries
+Collects the literal SQL passed to text() or registered with the query registry
+in the analytics modules, runs each statement through SQLite's EXPLAIN QUERY
+PLAN and reports full table scans and temporary sort trees
+"""
+
+import os
+import re
+import ast
+import sys
+import sqlite3
+import argparse
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules whose route/service SQL is checked by default
+DEFAULT_SOURCES = [
+    os.path.join('app', '__init__.py'),
+    os.path.join('app', 'services', 'analytics_service.py'),
+]
+
+PARAM_PATTERN = re.compile(r'(?<!:):([A-Za-z_]\w*)')
+
+@dataclass
+class QueryPlan:
+    source: str
+    line: int
+    function: str
+    sql: str
+    plan: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def full_scans(self) -> List[str]:
+        # "SCAN users" reads every row; "SCAN users USING [COVERING] INDEX" walks an index instead
+        return [
+            step for step in self.plan
+            if step.startswith('SCAN ') and ' USING ' not in step
+            and 'CONSTANT ROW' not in step and 'SUBQUERY' not in step.upper()
+        ]
+
+    @property
+    def temp_sorts(self) -> List[str]:
+        return [step for step in self.plan if 'TEMP B-TREE' in step]
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return 'ERROR'
+        if self.full_scans:
+            return 'SCAN'
+        return 'OK'
+
+def _string_arg(call: ast.Call, index: int) -> Optional[str]:
+    if len(call.args) > index and isinstance(call.args[index], ast.Constant) and isinstance(call.args[index].value, str):
+        return call.args[index].value
+    return None
+
+def collect_queries(path: str) -> List[QueryPlan]:
+    """Literal SQL in ``path``: strings passed to ``text()`` and ``QueryRegistry.register()`` calls.
+
+    Text statements are labelled with the enclosing function, registered
+    ones with their query name. The ``{filters}`` placeholder of registered
+    queries is dropped, so the base variant is explained.
+    """
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    queries = []
+
+    def add(node, label, sql):
+        sql = ' '.join(sql.replace('{filters}', '').split())
+        if sql.upper().startswith(('SELECT', 'WITH')):
+            queries.append(QueryPlan(os.path.relpath(path, SERVER_DIR), node.lineno, label, sql))
+
+    def visit(node, function):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                visit(child, child.name)
+                continue
+            if isinstance(child, ast.Call):
+                if isinstance(child.func, ast.Name) and child.func.id == 'text' and _string_arg(child, 0):
+                    add(child, function, _string_arg(child, 0))
+                elif (isinstance(child.func, ast.Attribute) and child.func.attr == 'register'
+                        and _string_arg(child, 0) and _string_arg(child, 1)):
+                    add(child, _string_arg(child, 0), _string_arg(child, 1))
+            visit(child, function)
+
+    visit(tree, '<module>')
+    return queries
+
+def schema_connection(database: Optional[str] = None) -> sqlite3.Connection:
+    """Connection to ``database``, or an in-memory database with the users schema from the model"""
+    if database:
+        return sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.schema import CreateIndex, CreateTable
+    from database.models import User
+
+    connection = sqlite3.connect(':memory:')
+    dialect = create_engine('sqlite://').dialect
+    connection.execute(str(CreateTable(User.__table__).compile(dialect=dialect)))
+    for index in User.__table__.indexes:
+        connection.execute(str(CreateIndex(index).compile(dialect=dialect)))
+    return connection
+
+def explain(connection: sqlite3.Connection, query: QueryPlan) -> QueryPlan:
+    params = {name: None for name in PARAM_PATTERN.findall(query.sql)}
+    try:
+        rows = connection.execute(f"EXPLAIN QUERY PLAN {query.sql}", params).fetchall()
+        query.plan = [row[3] for row in rows]
+    except sqlite3.Error as e:
+        query.error = str(e)
+    return query
+
+def advise(sources: List[str], database: Optional[str] = None) -> List[QueryPlan]:
+    connection = schema_connection(database)
+    try:
+        return [
+            explain(connection, query)
+            for source in sources
+            for query in collect_queries(os.path.join(SERVER_DIR, source))
+        ]
+    finally:
+        connection.close()
+
+def print_report(results: List[QueryPlan], verbose: bool = False) -> None:
+    for query in results:
+        print(f"[{query.status:5}] {query.source}:{query.line} {query.function}")
+        if query.error:
+            print(f"        error: {query.error}")
+        for step in query.plan if verbose else query.full_scans + query.temp_sorts:
+            print(f"        {step}")
+
+    scans = sum(1 for query in results if query.status == 'SCAN')
+    errors = sum(1 for query in results if query.error)
+    sorts = sum(1 for query in results if query.temp_sorts)
+    print(f"\n{len(results)} queries checked: {scans} full table scans, {sorts} with temp sorts, {errors} errors")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report full table scans in the analytics SQL")
+    parser.add_argument('sources', nargs='*', default=DEFAULT_SOURCES,
+                        help="python modules to scan for text() and registered SQL (relative to the server directory)")
+    parser.add_argument('--database', help="SQLite file to explain against (default: in-memory schema from the model)")
+    parser.add_argument('--verbose', action='store_true', help="print every plan step")
+    parser.add_argument('--strict', action='store_true', help="exit non-zero on full table scans or errors")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SERVER_DIR)
+    results = advise(args.sources, args.database)
+    print_report(results, args.verbose)
+
+    if args.strict and any(query.status != 'OK' for query in results):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
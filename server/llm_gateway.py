@@ -0,0 +1,275 @@
+# llm_gateway.py
+"""
+LLM gateway for the marketing insight scripts
+
+Routes chat completions through a pluggable backend (OpenAI, or a
+deterministic offline stub) with an on-disk response cache keyed by a
+content hash of the request, a token-bucket rate limiter, bounded
+concurrency for batches of prompts, and token-budget prompt compaction.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+Messages = List[Dict[str, str]]
+
+# Rough characters per token for English prose when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str, model: str = 'gpt-4-turbo') -> int:
+    """Token count of ``text`` (exact with tiktoken, estimated otherwise)"""
+    if TIKTOKEN_AVAILABLE:
+        try:
+            return len(tiktoken.encoding_for_model(model).encode(text))
+        except KeyError:
+            return len(tiktoken.get_encoding('cl100k_base').encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def _squeeze(text: str) -> str:
+    """Drop indentation, trailing spaces and blank lines"""
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+def compact_sections(sections: Sequence[Tuple[str, str]], token_budget: int,
+                     model: str = 'gpt-4-turbo') -> str:
+    """Join ``(title, body)`` sections into a prompt that fits ``token_budget``.
+
+    Sections are given most important first. Whitespace is squeezed out of
+    every section; if the prompt is still too long, the least important
+    sections lose lines from the end (the first line of a section is kept as
+    long as possible), then whole sections are dropped.
+    """
+    parts = [(title, _squeeze(body).splitlines()) for title, body in sections]
+
+    def render() -> str:
+        return '\n\n'.join(
+            f"{title}:\n" + '\n'.join(lines) if title else '\n'.join(lines)
+            for title, lines in parts if lines
+        )
+
+    prompt = render()
+    if estimate_tokens(prompt, model) <= token_budget:
+        return prompt
+
+    for index in range(len(parts) - 1, 0, -1):
+        lines = parts[index][1]
+        while len(lines) > 1 and estimate_tokens(prompt, model) > token_budget:
+            lines.pop()
+            prompt = render()
+        if estimate_tokens(prompt, model) <= token_budget:
+            return prompt
+        lines.clear()
+        prompt = render()
+        if estimate_tokens(prompt, model) <= token_budget:
+            return prompt
+
+    # Only the leading section is left: hard-truncate it
+    return prompt[:token_budget * CHARS_PER_TOKEN]
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` calls per second with bursts of ``burst``"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a call is allowed; returns the seconds spent waiting"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class ResponseCache:
+    """Completions stored as ``<sha256>.json`` files under ``cache_dir``"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(request: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)['content']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, request: Dict[str, Any], content: str) -> None:
+        # Write to a temp file and rename so concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'request': request, 'content': content, 'created_at': time.time()}, f)
+        os.replace(temp_path, self._path(key))
+
+class OpenAIBackend:
+    """Chat completions through the OpenAI API"""
+
+    name = 'openai'
+
+    def __init__(self, api_key: str, timeout: float = 60.0, max_retries: int = 2):
+        import openai
+        self.client = openai.OpenAI(api_key=api_key, timeout=timeout, max_retries=max_retries)
+
+    def complete(self, messages: Messages, model: str, max_tokens: int, temperature: float) -> str:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+class StubBackend:
+    """Deterministic offline backend: the same request always yields the same text.
+
+    ``latency`` simulates a network round trip so concurrency and rate
+    limiting can be exercised and benchmarked without an API key.
+    """
+
+    name = 'stub'
+
+    SECTIONS = [
+        'Targeted Acquisition', 'Personalized Retention', 'Upsell and Cross-sell',
+        'Churn Prevention', 'Content and Communication Personalization'
+    ]
+    TACTICS = [
+        'Run lookalike campaigns seeded from the highest-LTV users',
+        'Trigger win-back offers when engagement drops for two weeks',
+        'Bundle the next plan tier with a time-limited discount',
+        'Send onboarding nudges tied to the preferred content type',
+        'Shift spend to the channel with the best click-through rate',
+        'Offer annual billing to users with stable engagement',
+        'Use the preferred communication channel for renewal reminders',
+        'Surface usage milestones to reinforce perceived value'
+    ]
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def complete(self, messages: Messages, model: str, max_tokens: int, temperature: float) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).digest()
+        prompt = messages[-1]['content'] if messages else ''
+        lines = [f"[stub:{model}] Strategy for: {_squeeze(prompt).splitlines()[0] if prompt.strip() else 'empty prompt'}"]
+        for index, section in enumerate(self.SECTIONS):
+            tactic = self.TACTICS[digest[index] % len(self.TACTICS)]
+            lines.append(f"{index + 1}. {section}: {tactic}.")
+        text = '\n'.join(lines)
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+class LLMGateway:
+    """Cached, rate-limited and concurrent access to an LLM backend"""
+
+    def __init__(self, backend, cache_dir: Optional[str] = 'llm_cache', max_concurrency: int = 4,
+                 rate_per_second: float = 2.0, burst: int = 4, token_budget: int = 6000,
+                 model: str = 'gpt-4-turbo'):
+        self.backend = backend
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(rate_per_second, burst)
+        self.token_budget = token_budget
+        self.model = model
+        self.stats = {'calls': 0, 'cache_hits': 0, 'rate_limited_seconds': 0.0, 'backend_seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def compact(self, sections: Sequence[Tuple[str, str]]) -> str:
+        """Build a prompt from ranked sections within this gateway's token budget"""
+        return compact_sections(sections, self.token_budget, self.model)
+
+    def complete(self, messages: Messages, max_tokens: int = 1500, temperature: float = 0.7,
+                 model: Optional[str] = None) -> str:
+        """One chat completion, served from the cache when the identical request was made before"""
+        request = {
+            'backend': self.backend.name,
+            'model': model or self.model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature
+        }
+        key = ResponseCache.key(request)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count('cache_hits')
+                return cached
+
+        self._count('rate_limited_seconds', self.rate_limiter.acquire())
+        started = time.perf_counter()
+        content = self.backend.complete(messages, request['model'], max_tokens, temperature)
+        self._count('backend_seconds', time.perf_counter() - started)
+        self._count('calls')
+
+        if self.cache is not None:
+            self.cache.put(key, request, content)
+        return content
+
+    def complete_many(self, conversations: Sequence[Messages], **params) -> List[str]:
+        """Run several completions concurrently; results keep the input order"""
+        if len(conversations) <= 1 or self.max_concurrency <= 1:
+            return [self.complete(messages, **params) for messages in conversations]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(conversations))) as executor:
+            return list(executor.map(lambda messages: self.complete(messages, **params), conversations))
+
+def gateway_from_env() -> LLMGateway:
+    """Gateway configured from LLM_* environment variables.
+
+    LLM_BACKEND selects ``openai`` (default, needs OPENAI_API_KEY) or ``stub``.
+    """
+    backend_name = os.getenv('LLM_BACKEND', 'openai').lower()
+    if backend_name == 'stub':
+        backend = StubBackend(latency=float(os.getenv('LLM_STUB_LATENCY', 0)))
+    elif backend_name == 'openai':
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError(
+                "OpenAI API key is not set. Please set the OPENAI_API_KEY environment variable "
+                "(or LLM_BACKEND=stub to run offline)."
+            )
+        backend = OpenAIBackend(api_key, timeout=float(os.getenv('LLM_TIMEOUT', 60)))
+    else:
+        raise ValueError(f"Unknown LLM backend: {backend_name}")
+
+    return LLMGateway(
+        backend,
+        cache_dir=os.getenv('LLM_CACHE_DIR', 'llm_cache') or None,
+        max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 4)),
+        rate_per_second=float(os.getenv('LLM_RATE_LIMIT', 2)),
+        token_budget=int(os.getenv('LLM_TOKEN_BUDGET', 6000)),
+        model=os.getenv('LLM_MODEL', 'gpt-4-turbo')
+    )
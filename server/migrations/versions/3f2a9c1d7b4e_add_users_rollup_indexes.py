@@ -0,0 +1,55 @@
+"""add covering indexes for users rollups
+
+Revision ID: 3f2a9c1d7b4e
+Revises: 
+Create Date: 2026-10-17 09:12:44.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b4e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Grouping key first, aggregated columns after it, so each rollup reads only the index
+ROLLUP_INDEXES = {
+    'ix_users_engagement_rollup': ['engagement_score', 'lifetime_value', 'churn_risk', 'account_age_days'],
+    'ix_users_churn_rollup': ['churn_risk', 'lifetime_value', 'account_age_days'],
+    'ix_users_referral_rollup': ['referral_source', 'lifetime_value', 'engagement_score', 'churn_risk', 'referral_count'],
+    'ix_users_journey_rollup': ['account_age_days', 'total_sessions', 'lifetime_value', 'churn_risk'],
+    'ix_users_content_rollup': ['preferred_content_type', 'engagement_score', 'lifetime_value'],
+    'ix_users_communication_rollup': ['communication_preference', 'engagement_score'],
+    'ix_users_plan_rollup': ['plan', 'churn_risk', 'lifetime_value'],
+}
+
+
+def _existing_indexes():
+    inspector = sa.inspect(op.get_bind())
+    if 'users' not in inspector.get_table_names():
+        return None
+    return {index['name'] for index in inspector.get_indexes('users')}
+
+
+def upgrade():
+    # The users table predates migrations (db.create_all), and a fresh create_all
+    # already builds these indexes from the model, so only add what is missing
+    existing = _existing_indexes()
+    if existing is None:
+        return
+    for name, columns in ROLLUP_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'users', columns, unique=False)
+    # Refresh planner statistics so the new indexes are picked up right away
+    if op.get_bind().dialect.name in ('sqlite', 'postgresql'):
+        op.execute('ANALYZE users')
+
+
+def downgrade():
+    existing = _existing_indexes() or set()
+    for name in ROLLUP_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name='users')
@@ -1,9 +1,10 @@
 import os
-import openai
 import pandas as pd
 import numpy as np
 from app import create_app, db
 from app.models import User
+from segmentation import SEGMENT_WEIGHTS, min_max_normalize, score_segments, mini_batch_kmeans, build_segment_profiles
+from llm_gateway import gateway_from_env
 import json
 import random
 from sqlalchemy import text
@@ -13,16 +14,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class UserInsightGenerator:
-    def __init__(self, users_df):
-        # Get API key from environment variable
-        api_key = os.getenv('OPENAI_API_KEY')
-        
-        # Validate API key
-        if not api_key:
-            raise ValueError("OpenAI API key is not set. Please set the OPENAI_API_KEY environment variable.")
-        
+    def __init__(self, users_df, gateway=None):
+        # LLM_BACKEND=stub runs offline; the default OpenAI backend needs OPENAI_API_KEY
         self.users_df = users_df
-        self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.gateway = gateway or gateway_from_env()
     
     def _min_max_normalize(self, series):
         """
@@ -61,121 +56,119 @@ class UserInsightGenerator:
         
         return self
     
-    def perform_custom_segmentation(self):
+    def perform_custom_segmentation(self, method='score', n_segments=5, random_state=42):
         """
         Custom segmentation using clustering-like approach
+        
+        method='score' bins a weighted score of the normalized features into
+        five segments; method='kmeans' runs mini-batch k-means with
+        ``n_segments`` clusters, numbered by ascending score. A feature that
+        is constant across all users normalizes to 0 (it used to divide by
+        zero and send every user to the top segment).
         """
         # Select features for segmentation
-        segmentation_features = [
-            'age', 'total_sessions', 'lifetime_value', 
-            'engagement_composite', 'ltv_potential', 
-            'comm_effectiveness'
-        ]
+        segmentation_features = list(SEGMENT_WEIGHTS.keys())
+        weights = np.array([SEGMENT_WEIGHTS[feature] for feature in segmentation_features])
         
         # Normalize features
-        normalized_df = self.users_df[segmentation_features].apply(self._min_max_normalize)
-        
-        # Custom clustering-like segmentation
-        def assign_segment(row):
-            # Create a scoring mechanism for segmentation
-            segment_score = (
-                row['age'] * 0.2 +
-                row['total_sessions'] * 0.2 +
-                row['lifetime_value'] * 0.2 +
-                row['engagement_composite'] * 0.15 +
-                row['ltv_potential'] * 0.15 +
-                row['comm_effectiveness'] * 0.1
-            )
-            
-            # Divide into 5 segments based on the score
-            if segment_score < 0.2:
-                return 0
-            elif segment_score < 0.4:
-                return 1
-            elif segment_score < 0.6:
-                return 2
-            elif segment_score < 0.8:
-                return 3
-            else:
-                return 4
+        normalized = min_max_normalize(
+            self.users_df[segmentation_features].to_numpy(dtype=np.float64, na_value=np.nan)
+        )
+        
+        if method == 'kmeans':
+            clusters = mini_batch_kmeans(normalized, n_segments, random_state=random_state)
+            # Renumber clusters so segment 0 has the lowest score, as in score mode
+            order = np.argsort(clusters['centers'] @ weights)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            segments = rank[clusters['labels']]
+        elif method == 'score':
+            segments = score_segments(normalized, weights)
+        else:
+            raise ValueError(f"Unknown segmentation method: {method}")
         
         # Assign segments
-        self.users_df['customer_segment'] = normalized_df.apply(assign_segment, axis=1)
+        self.users_df['customer_segment'] = segments
         
         # Analyze segment characteristics
-        segment_profiles = self.users_df.groupby('customer_segment').agg({
-            'age': 'mean',
-            'lifetime_value': 'mean',
-            'total_sessions': 'mean',
-            'engagement_composite': 'mean',
-            'plan': lambda x: x.value_counts().index[0],
-            'preferred_content_type': lambda x: x.value_counts().index[0],
-            'communication_preference': lambda x: x.value_counts().index[0]
-        })
+        segment_profiles = build_segment_profiles(
+            self.users_df,
+            segments,
+            mean_columns=['age', 'lifetime_value', 'total_sessions', 'engagement_composite'],
+            mode_columns=['plan', 'preferred_content_type', 'communication_preference']
+        )
         
         return segment_profiles
     
     def generate_gpt_marketing_strategy(self, segment_profiles):
         """
         Use GPT to generate marketing strategies based on customer segments
+        
+        One overall strategy plus one focused strategy per segment, requested
+        concurrently through the LLM gateway (cached, rate limited, and
+        compacted to the gateway's token budget).
         """
-        # Prepare insights for GPT prompt
-        insights_summary = f"""
-        Customer Segmentation Analysis:
-        
-        Segment Profiles:
-        {segment_profiles.to_string()}
-        
-        Overall User Metrics:
-        - Total Users: {len(self.users_df)}
-        - Average Age: {self.users_df['age'].mean():.2f}
-        - Average Lifetime Value: ${self.users_df['lifetime_value'].mean():.2f}
-        - Churn Risk Distribution: 
-          Low Risk: {(self.users_df['churn_risk'] < 0.3).mean():.2%}
-          Medium Risk: {((self.users_df['churn_risk'] >= 0.3) & (self.users_df['churn_risk'] < 0.7)).mean():.2%}
-          High Risk: {(self.users_df['churn_risk'] >= 0.7).mean():.2%}
-        
-        Subscription Plan Distribution:
-        {self.users_df['plan'].value_counts(normalize=True)}
-        
-        Content Preference Distribution:
-        {self.users_df['preferred_content_type'].value_counts(normalize=True)}
-        
-        Communication Preference Distribution:
-        {self.users_df['communication_preference'].value_counts(normalize=True)}
+        churn_risk = self.users_df['churn_risk']
+        
+        # Prompt sections, most important first: compaction trims from the end
+        overview = f"""
+        Total Users: {len(self.users_df)}
+        Average Age: {self.users_df['age'].mean():.2f}
+        Average Lifetime Value: ${self.users_df['lifetime_value'].mean():.2f}
+        Churn Risk: Low {(churn_risk < 0.3).mean():.2%}, Medium {((churn_risk >= 0.3) & (churn_risk < 0.7)).mean():.2%}, High {(churn_risk >= 0.7).mean():.2%}
         """
+        distributions = [
+            (title, self.users_df[column].value_counts(normalize=True).round(3).to_string())
+            for title, column in [
+                ('Subscription Plan Distribution', 'plan'),
+                ('Content Preference Distribution', 'preferred_content_type'),
+                ('Communication Preference Distribution', 'communication_preference')
+            ]
+        ]
         
         # GPT Prompt Engineering
-        prompt = f"""
+        instructions = """
         Based on the following customer segmentation and user behavior insights, 
         develop a comprehensive, data-driven marketing strategy that includes:
-
         1. Targeted Acquisition Strategies
         2. Personalized Retention Tactics
         3. Upsell and Cross-sell Recommendations
         4. Churn Prevention Initiatives
         5. Content and Communication Personalization
-
         Provide specific, actionable recommendations for each customer segment.
-
-        Customer Insights:
-        {insights_summary}
         """
+        prompts = [self.gateway.compact(
+            [('', instructions), ('Segment Profiles', segment_profiles.to_string()), ('Overall User Metrics', overview)]
+            + distributions
+        )]
+        
+        for segment, profile in segment_profiles.iterrows():
+            segment_instructions = f"""
+            Develop a focused marketing strategy for the customer segment "{segment}".
+            Cover acquisition, retention, upsell, churn prevention and content/communication
+            personalization with specific, actionable recommendations for this segment only.
+            """
+            prompts.append(self.gateway.compact([
+                ('', segment_instructions),
+                ('Segment Profile', profile.to_string()),
+                ('Overall User Metrics', overview)
+            ]))
+        
+        conversations = [
+            [
+                {"role": "system", "content": "You are a strategic marketing consultant analyzing customer data."},
+                {"role": "user", "content": prompt}
+            ]
+            for prompt in prompts
+        ]
         
         # Generate marketing strategy using GPT
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a strategic marketing consultant analyzing customer data."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.7
-            )
+            strategies = self.gateway.complete_many(conversations, max_tokens=1500, temperature=0.7)
             
             return {
-                'marketing_strategy': response.choices[0].message.content,
+                'marketing_strategy': strategies[0],
+                'segment_strategies': dict(zip(map(str, segment_profiles.index), strategies[1:])),
                 'segment_profiles': segment_profiles.to_dict()
             }
         
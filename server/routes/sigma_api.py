@@ -3,10 +3,13 @@ Sigma API Routes
 Provides REST API endpoints for Sigma integration
 """
 
-from flask import Blueprint, request, jsonify, current_app
-from services.sigma_api_client import SigmaAPIClient, SigmaCredentials
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, send_file
+from services.sigma_api_client import SigmaAPIClient, SigmaCredentials, client_registry
+from services.sigma_export_jobs import COMPLETED, EXPORT_MIMETYPES, get_export_manager
 from config import get_config
 from typing import Dict, Any
+import os
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -50,7 +53,43 @@ def get_sigma_client() -> SigmaAPIClient:
         cloud_provider=current_app.config.get('SIGMA_API_CLOUD_PROVIDER', 'AWS-US (West)')
     )
     
-    return SigmaAPIClient(credentials)
+    # Clients (and their tokens) are shared across requests with the same credentials
+    return client_registry.get(credentials)
+
+@sigma_api.after_request
+def add_conditional_headers(response):
+    """Tag buffered GET responses with an ETag and answer matching revalidations with 304"""
+    if request.method == 'GET' and response.status_code == 200 and not response.is_streamed:
+        response.add_etag()
+        # Let browsers keep the body but check back each time; a match costs no payload
+        response.headers.setdefault('Cache-Control', 'private, no-cache')
+        response.make_conditional(request)
+    return response
+
+def wants_all_pages() -> bool:
+    """Whether the request asked for every page (``?all=true``)"""
+    return request.args.get('all', 'false').lower() in ('true', '1', 'yes')
+
+def stream_all_pages(client: SigmaAPIClient, resource: str, size: int) -> Response:
+    """Stream every item of a list endpoint as NDJSON while pages are fetched concurrently"""
+    max_workers = current_app.config.get('SIGMA_PAGE_FETCH_WORKERS', 4)
+    batches = client.iter_all_batches(resource, size=size, max_workers=max_workers)
+    # Fetch the first page before responding so auth/connection errors still get a 500
+    first_batch = next(batches, [])
+    
+    def generate():
+        try:
+            if first_batch:
+                yield ''.join(json.dumps(item, default=str) + '\n' for item in first_batch)
+            for batch in batches:
+                if batch:
+                    yield ''.join(json.dumps(item, default=str) + '\n' for item in batch)
+        except Exception as e:
+            # Headers are already sent; report the failure as the last line
+            logger.error(f"Failed to stream {resource}: {e}")
+            yield json.dumps({'error': str(e)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @sigma_api.route('/api/sigma/status', methods=['GET'])
 def get_sigma_status():
@@ -102,6 +141,8 @@ def list_connections():
         size = min(int(request.args.get('size', 50)), 1000)  # Respect max page size
         
         client = get_sigma_client()
+        if wants_all_pages():
+            return stream_all_pages(client, 'connections', size)
         connections = client.list_connections(page=page, size=size)
         
         return jsonify(connections)
@@ -117,6 +158,8 @@ def list_workbooks():
         size = min(int(request.args.get('size', 50)), 1000)
         
         client = get_sigma_client()
+        if wants_all_pages():
+            return stream_all_pages(client, 'workbooks', size)
         workbooks = client.list_workbooks(page=page, size=size)
         
         return jsonify(workbooks)
@@ -126,26 +169,85 @@ def list_workbooks():
 
 @sigma_api.route('/api/sigma/workbooks/<workbook_id>/export', methods=['POST'])
 def export_workbook(workbook_id: str):
-    """Export workbook data with OAuth override support"""
+    """Start a workbook export with OAuth override support.
+    
+    Returns 202 with the export job at once; poll ``status_url`` and fetch
+    the file from ``download_url`` when the job is completed. An identical
+    export already in progress is joined rather than started again.
+    Formats other than those in EXPORT_MIMETYPES are rejected with 400.
+    """
     try:
         data = request.get_json() or {}
         export_format = data.get('format', 'csv')
+        if export_format not in EXPORT_MIMETYPES:
+            return jsonify({'error': f"Unsupported export format: {export_format}",
+                            'supported_formats': sorted(EXPORT_MIMETYPES)}), 400
         oauth_overrides = data.get('oauth_overrides')
         reject_default_tokens = data.get('reject_default_tokens', False)
         
         client = get_sigma_client()
-        export_result = client.export_workbook(
+        job = get_export_manager(current_app.config).submit(
+            client,
             workbook_id=workbook_id,
             export_format=export_format,
             oauth_overrides=oauth_overrides,
             reject_default_tokens=reject_default_tokens
         )
         
-        return jsonify(export_result)
+        return jsonify(export_job_payload(job)), 202
     except Exception as e:
         logger.error(f"Failed to export workbook {workbook_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+def export_job_payload(job) -> Dict[str, Any]:
+    payload = job.to_dict()
+    payload['status_url'] = f'/api/sigma/exports/{job.id}'
+    payload['download_url'] = f'/api/sigma/exports/{job.id}/download' if job.status == COMPLETED else None
+    return payload
+
+@sigma_api.route('/api/sigma/exports', methods=['GET'])
+def list_exports():
+    """List export jobs, newest first"""
+    try:
+        jobs = get_export_manager(current_app.config).list_jobs()
+        return jsonify({'jobs': [export_job_payload(job) for job in jobs]})
+    except Exception as e:
+        logger.error(f"Failed to list exports: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sigma_api.route('/api/sigma/exports/<job_id>', methods=['GET'])
+def get_export(job_id: str):
+    """Get export job status"""
+    try:
+        job = get_export_manager(current_app.config).get(job_id)
+        if job is None:
+            return jsonify({'error': 'Export job not found'}), 404
+        return jsonify(export_job_payload(job))
+    except Exception as e:
+        logger.error(f"Failed to get export {job_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sigma_api.route('/api/sigma/exports/<job_id>/download', methods=['GET'])
+def download_export(job_id: str):
+    """Download a finished export; supports Range and conditional requests"""
+    try:
+        job = get_export_manager(current_app.config).get(job_id)
+        if job is None:
+            return jsonify({'error': 'Export job not found'}), 404
+        if job.status != COMPLETED:
+            return jsonify({'error': f'Export is {job.status}', 'job': export_job_payload(job)}), 409
+        
+        return send_file(
+            os.path.abspath(job.file_path),
+            mimetype=job.mimetype,
+            as_attachment=True,
+            download_name=job.filename,
+            conditional=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to download export {job_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @sigma_api.route('/api/sigma/workbooks/<workbook_id>', methods=['GET'])
 def get_workbook(workbook_id: str):
     """Get workbook details"""
@@ -166,6 +268,8 @@ def list_workspaces():
         size = min(int(request.args.get('size', 50)), 1000)
         
         client = get_sigma_client()
+        if wants_all_pages():
+            return stream_all_pages(client, 'workspaces', size)
         workspaces = client.list_workspaces(page=page, size=size)
         
         return jsonify(workspaces)
@@ -181,6 +285,8 @@ def list_datasets():
         size = min(int(request.args.get('size', 50)), 1000)
         
         client = get_sigma_client()
+        if wants_all_pages():
+            return stream_all_pages(client, 'datasets', size)
         datasets = client.list_datasets(page=page, size=size)
         
         return jsonify(datasets)
@@ -196,6 +302,8 @@ def list_teams():
         size = min(int(request.args.get('size', 50)), 1000)
         
         client = get_sigma_client()
+        if wants_all_pages():
+            return stream_all_pages(client, 'teams', size)
         teams = client.list_teams(page=page, size=size)
         
         return jsonify(teams)
@@ -211,6 +319,8 @@ def list_members():
         size = min(int(request.args.get('size', 50)), 1000)
         
         client = get_sigma_client()
+        if wants_all_pages():
+            return stream_all_pages(client, 'members', size)
         members = client.list_members(page=page, size=size)
         
         return jsonify(members)
@@ -301,6 +411,9 @@ def update_sigma_credentials():
             }
             current_app.config['SIGMA_API_BASE_URL'] = sigma_urls.get(cloud_provider, 'https://aws-api.sigmacomputing.com')
         
+        # Tokens issued for the previous credentials must not be reused
+        client_registry.invalidate()
+        
         logger.info(f"Sigma API credentials updated successfully")
         
         return jsonify({
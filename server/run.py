@@ -6,8 +6,10 @@ Supports all Sigma framework modes with clean configuration
 
 import os
 import sys
+import click
 from app import create_app, db
 from app.models import User
+from bulk_seed import bulk_seed
 
 def main():
     """Main application entry point"""
@@ -28,14 +30,17 @@ def main():
     
     # CLI Commands
     @app.cli.command("create-users")
-    def create_users():
+    @click.option('--rows', default=10, show_default=True, help='Number of fake users to create')
+    @click.option('--workers', default=1, show_default=True, help='Worker processes generating batches')
+    @click.option('--batch-size', default=10000, show_default=True, help='Rows generated and inserted per batch')
+    @click.option('--seed', type=int, default=None, help='Random seed for reproducible datasets')
+    def create_users(rows, workers, batch_size, seed):
         """Create a batch of fake users"""
         with app.app_context():
-            # Generate and add fake users
-            fake_users = User.generate_fake_users(10)
-            db.session.add_all(fake_users)
-            db.session.commit()
-            print(f"✅ Created {len(fake_users)} fake users")
+            # Generate columns in vectorized batches and bulk insert them
+            stats = bulk_seed(db.engine, rows, workers=workers, batch_size=batch_size, seed=seed)
+            print(f"✅ Created {stats['rows']} fake users in {stats['seconds']}s "
+                  f"({stats['rows_per_second']} rows/s, {stats['workers']} workers)")
     
     @app.cli.command("list-users")
     def list_users():
@@ -48,6 +53,15 @@ def main():
             if len(users) > 5:
                 print(f"  ... and {len(users) - 5} more users")
     
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """Rebuild the users full-text search index"""
+        with app.app_context():
+            if app.user_search.rebuild():
+                print("✅ User search index rebuilt")
+            else:
+                print("❌ User search index not available (requires SQLite with FTS5)")
+    
     @app.cli.command("toggle-sigma")
     def toggle_sigma():
         """Toggle Sigma framework mode"""
@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 import traceback
 from tqdm import tqdm
 from sqlalchemy.orm import sessionmaker
@@ -7,6 +8,7 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.exc import IntegrityError
 from app import create_app, db
 from app.models import User
+from bulk_seed import bulk_seed
 
 def chunk_generator(total_count, chunk_size=1000):
     """Generate chunks for parallel processing"""
@@ -17,18 +19,30 @@ def generate_user_chunk(start, end):
     """Generate a chunk of users"""
     return User.generate_fake_users(count=end-start, start_index=start)
 
-def seed_database(total_users=10000, chunk_size=1000):
+def seed_database(total_users=10000, chunk_size=1000, workers=1, bulk=True):
     """
     Seed database with fake users
     
     Args:
         total_users (int): Total number of users to generate
         chunk_size (int): Number of users to insert in each batch
+        workers (int): Worker processes generating batches (bulk mode only)
+        bulk (bool): Use the vectorized bulk loader instead of ORM inserts
     """
     # Create Flask application context
     app = create_app()
     
     with app.app_context():
+        if bulk:
+            try:
+                stats = bulk_seed(db.engine, total_users, workers=workers, batch_size=max(chunk_size, 10000))
+                print(f"\nSuccessfully added {stats['rows']} users to the database "
+                      f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s).")
+            except Exception as e:
+                print(f"Unexpected error during bulk seeding: {e}")
+                traceback.print_exc()
+            return
+        
         # Create SQLAlchemy engine
         engine = create_engine(db.engine.url)
         Session = sessionmaker(bind=engine)
@@ -122,8 +136,14 @@ def verify_seed():
             print(f"Error verifying seed: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Seed the users table with fake users")
+    parser.add_argument('--rows', type=int, default=10000, help="number of users to generate")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes for generation")
+    parser.add_argument('--orm', action='store_true', help="insert through the ORM one user at a time")
+    args = parser.parse_args()
+    
     # Seed users
-    seed_database(total_users=10000)
+    seed_database(total_users=args.rows, workers=args.workers, bulk=not args.orm)
     
     # Verify the seeding
     verify_seed()
@@ -0,0 +1,145 @@
+# segmentation.py
+"""
+Vectorized customer segmentation
+
+NumPy scoring/binning and mini-batch k-means used by
+UserInsightGenerator.perform_custom_segmentation, plus bincount-based
+per-segment means and categorical modes for building segment profiles.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Weighted score used by the rule-based segmentation
+SEGMENT_WEIGHTS = {
+    'age': 0.2,
+    'total_sessions': 0.2,
+    'lifetime_value': 0.2,
+    'engagement_composite': 0.15,
+    'ltv_potential': 0.15,
+    'comm_effectiveness': 0.1
+}
+
+# Score thresholds separating the five segments
+SEGMENT_BINS = np.array([0.2, 0.4, 0.6, 0.8])
+
+def min_max_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Column-wise min-max scaling; constant columns scale to 0"""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    minimum = np.nanmin(matrix, axis=0)
+    spread = np.nanmax(matrix, axis=0) - minimum
+    spread[spread == 0] = 1.0
+    return (matrix - minimum) / spread
+
+def score_segments(normalized: np.ndarray, weights: np.ndarray,
+                   bins: np.ndarray = SEGMENT_BINS) -> np.ndarray:
+    """Weighted score per row, binned into segments 0..len(bins)"""
+    scores = normalized @ weights
+    # NaN scores sort past the last bin, matching the original fall-through to the top segment
+    return np.digitize(scores, bins)
+
+def _kmeans_plus_plus(sample: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centers = np.empty((k, sample.shape[1]))
+    centers[0] = sample[rng.integers(len(sample))]
+    closest = ((sample - centers[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        index = rng.choice(len(sample), p=closest / total) if total > 0 else rng.integers(len(sample))
+        centers[i] = sample[index]
+        closest = np.minimum(closest, ((sample - centers[i]) ** 2).sum(axis=1))
+    return centers
+
+def _nearest_center(matrix: np.ndarray, centers: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Index of the nearest center for every row, computed in chunks to bound memory"""
+    labels = np.empty(len(matrix), dtype=np.int64)
+    center_norms = (centers ** 2).sum(axis=1)
+    for start in range(0, len(matrix), chunk_size):
+        chunk = matrix[start:start + chunk_size]
+        # ||x - c||^2 without the per-row ||x||^2 term, which does not change the argmin
+        distances = center_norms - 2.0 * chunk @ centers.T
+        labels[start:start + chunk_size] = distances.argmin(axis=1)
+    return labels
+
+def mini_batch_kmeans(matrix: np.ndarray, k: int, batch_size: int = 4096, max_iter: int = 100,
+                      tol: float = 1e-4, random_state: int = 42) -> Dict[str, np.ndarray]:
+    """Mini-batch k-means (Sculley, 2010) over the rows of ``matrix``.
+
+    Returns ``{'labels': ..., 'centers': ...}``. NaNs are treated as 0.
+    """
+    matrix = np.nan_to_num(np.asarray(matrix, dtype=np.float64))
+    n_rows = len(matrix)
+    if n_rows == 0:
+        return {'labels': np.empty(0, dtype=np.int64), 'centers': np.empty((0, matrix.shape[1]))}
+    k = min(k, n_rows)
+    rng = np.random.default_rng(random_state)
+
+    sample = matrix[rng.choice(n_rows, size=min(n_rows, max(batch_size, 10 * k)), replace=False)]
+    centers = _kmeans_plus_plus(sample, k, rng)
+    counts = np.zeros(k)
+
+    for _ in range(max_iter):
+        batch = matrix[rng.integers(n_rows, size=min(batch_size, n_rows))]
+        batch_labels = _nearest_center(batch, centers)
+        previous = centers.copy()
+
+        batch_counts = np.bincount(batch_labels, minlength=k).astype(np.float64)
+        batch_sums = np.zeros_like(centers)
+        np.add.at(batch_sums, batch_labels, batch)
+
+        # Per-center learning rate 1/count, applied to the batch mean in one step
+        updated = batch_counts > 0
+        counts[updated] += batch_counts[updated]
+        rate = (batch_counts[updated] / counts[updated])[:, None]
+        centers[updated] += rate * (batch_sums[updated] / batch_counts[updated][:, None] - centers[updated])
+
+        if np.sqrt(((centers - previous) ** 2).sum(axis=1)).max() < tol:
+            break
+
+    return {'labels': _nearest_center(matrix, centers), 'centers': centers}
+
+def group_means(labels: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Mean of ``values`` per label, ignoring NaNs"""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    sums = np.bincount(labels[valid], weights=values[valid], minlength=n_groups)
+    counts = np.bincount(labels[valid], minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+def group_modes(labels: np.ndarray, values: pd.Series, n_groups: int) -> List:
+    """Most frequent value per label; ties go to the value seen first within the label"""
+    codes, uniques = pd.factorize(values, sort=False)
+    valid = codes >= 0
+    if not len(uniques):
+        return [None] * n_groups
+    keys = labels[valid] * len(uniques) + codes[valid]
+    counts = np.bincount(keys, minlength=n_groups * len(uniques))
+
+    # Rank by count, then by earliest position so ties match value_counts().index[0]
+    first_seen = np.full(n_groups * len(uniques), len(keys), dtype=np.int64)
+    seen_keys, first_index = np.unique(keys, return_index=True)
+    first_seen[seen_keys] = first_index
+    rank = counts * (len(keys) + 1) - first_seen
+
+    counts = counts.reshape(n_groups, len(uniques))
+    modes = rank.reshape(n_groups, len(uniques)).argmax(axis=1)
+    return [uniques[mode] if counts[group, mode] else None for group, mode in enumerate(modes)]
+
+def build_segment_profiles(users_df: pd.DataFrame, labels: np.ndarray,
+                           mean_columns: List[str], mode_columns: List[str]) -> pd.DataFrame:
+    """Per-segment means and modes, indexed by ``customer_segment`` like a groupby().agg()"""
+    labels = np.asarray(labels, dtype=np.int64)
+    n_groups = int(labels.max()) + 1 if len(labels) else 0
+    present = np.flatnonzero(np.bincount(labels, minlength=n_groups))
+
+    profile = {}
+    for column in mean_columns:
+        profile[column] = group_means(labels, users_df[column].to_numpy(dtype=np.float64, na_value=np.nan), n_groups)[present]
+    for column in mode_columns:
+        modes = group_modes(labels, users_df[column], n_groups)
+        profile[column] = [modes[group] for group in present]
+
+    segment_profiles = pd.DataFrame(profile, index=pd.Index(present, name='customer_segment'))
+    return segment_profiles[mean_columns + mode_columns]
@@ -3,15 +3,35 @@ Sigma API Client Service
 Handles authentication, token management, and API calls to Sigma
 """
 
-import requests
+import os
 import time
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Iterator
 from dataclasses import dataclass
 from flask import current_app
 
+from .sigma_transport import SigmaTransport, get_default_transport
+from .sigma_pagination import iter_page_batches, iter_pages
+from .sigma_response_cache import SigmaResponseCache, response_cache_from_env
+
 logger = logging.getLogger(__name__)
 
+# Seconds before the 5-minute expiry buffer at which a background refresh starts
+TOKEN_REFRESH_AHEAD = 300
+
+# Paginated list endpoints by resource name
+LIST_ENDPOINTS = {
+    'connections': '/v2/connections',
+    'workbooks': '/v2/workbooks',
+    'workspaces': '/v2/workspaces',
+    'datasets': '/v2/datasets',
+    'teams': '/v2/teams',
+    'members': '/v2/members'
+}
+
 @dataclass
 class SigmaCredentials:
     client_id: str
@@ -22,11 +42,18 @@ class SigmaCredentials:
 class SigmaAPIClient:
     """Robust Sigma API client with token management and error handling"""
     
-    def __init__(self, credentials: SigmaCredentials):
+    def __init__(self, credentials: SigmaCredentials, transport: Optional[SigmaTransport] = None,
+                 response_cache: Optional[SigmaResponseCache] = None):
         self.credentials = credentials
+        # Shared pooled transport unless one is supplied (e.g. pointed at a stub server in tests)
+        self.transport = transport or get_default_transport()
+        # GET responses, per client so cached data never crosses credentials
+        self.response_cache = response_cache or response_cache_from_env()
         self.access_token = None
         self.token_expiry = 0
         self.rate_limit_last_call = 0
+        # Held by whichever thread is refreshing the token (single-flight)
+        self._refresh_lock = threading.Lock()
         
         # Check if we should use mock mode
         self.mock_mode = (
@@ -43,11 +70,11 @@ class SigmaAPIClient:
     
     def _get_auth_headers(self) -> Dict[str, str]:
         """Get authentication headers with automatic token refresh"""
-        if self._is_token_expired():
-            self._refresh_token()
-        
+        return self._headers_for(self._current_token())
+    
+    def _headers_for(self, token: str) -> Dict[str, str]:
         return {
-            'Authorization': f'Bearer {self.access_token}',
+            'Authorization': f'Bearer {token}',
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
@@ -56,6 +83,47 @@ class SigmaAPIClient:
         """Check if current token is expired (with 5-minute buffer)"""
         return time.time() >= (self.token_expiry - 300)
     
+    def _is_token_aging(self) -> bool:
+        """Check if the token is close enough to expiry to refresh it ahead of time"""
+        return time.time() >= (self.token_expiry - 300 - TOKEN_REFRESH_AHEAD)
+    
+    def _current_token(self) -> str:
+        """A usable token, refreshing at most once across concurrent callers.
+        
+        An expired token blocks callers until one of them has refreshed it. An
+        aging token is still handed out while a background thread renews it.
+        """
+        if self._is_token_expired():
+            with self._refresh_lock:
+                # Another caller may have refreshed while we waited
+                if self._is_token_expired():
+                    self._refresh_token()
+        elif self._is_token_aging() and self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, name='sigma-token-refresh', daemon=True).start()
+        return self.access_token
+    
+    def _refresh_in_background(self) -> None:
+        # Runs with _refresh_lock already held by the thread that started it
+        try:
+            if self._is_token_aging():
+                self._refresh_token()
+        except Exception as e:
+            logger.warning(f"Background Sigma API token refresh failed: {e}")
+        finally:
+            self._refresh_lock.release()
+    
+    def _replace_rejected_token(self, rejected_token: str) -> None:
+        """Refresh after a 401 unless a concurrent caller already replaced the token"""
+        with self._refresh_lock:
+            if self.access_token == rejected_token:
+                self._refresh_token()
+    
+    def invalidate_token(self) -> None:
+        """Drop the cached token so the next request authenticates again"""
+        with self._refresh_lock:
+            self.access_token = None
+            self.token_expiry = 0
+    
     def _refresh_token(self) -> None:
         """Refresh access token with rate limiting"""
         if self.mock_mode:
@@ -72,7 +140,8 @@ class SigmaAPIClient:
             time.sleep(1 - (current_time - self.rate_limit_last_call))
         
         try:
-            response = requests.post(
+            response = self.transport.request(
+                'POST',
                 f"{self.credentials.base_url}/v2/auth/token",
                 json={
                     'client_id': self.credentials.client_id,
@@ -83,8 +152,9 @@ class SigmaAPIClient:
             response.raise_for_status()
             
             data = response.json()
-            self.access_token = data['access_token']
+            # Expiry first, so a reader never pairs the new token with the old expiry check
             self.token_expiry = time.time() + data['expires_in']
+            self.access_token = data['access_token']
             self.rate_limit_last_call = time.time()
             
             logger.info("Sigma API token refreshed successfully")
@@ -98,39 +168,50 @@ class SigmaAPIClient:
         if self.mock_mode:
             return self._mock_request(method, endpoint, **kwargs)
         
-        max_retries = 3
-        base_delay = 1
+        cached = None
+        if method == 'GET':
+            cached = self.response_cache.get(endpoint)
+            if cached is not None and cached.fresh:
+                self.response_cache.record_hit(cached)
+                return cached.body
+            self.response_cache.record_miss()
         
-        for attempt in range(max_retries):
-            try:
-                headers = self._get_auth_headers()
-                headers.update(kwargs.get('headers', {}))
-                
-                response = requests.request(
-                    method=method,
-                    url=f"{self.credentials.base_url}{endpoint}",
-                    headers=headers,
-                    **{k: v for k, v in kwargs.items() if k != 'headers'}
-                )
-                
-                if response.status_code == 401:
-                    # Token might be invalid, try refreshing
-                    self.access_token = None
-                    self._refresh_token()
-                    continue
-                
-                response.raise_for_status()
-                return response.json()
-                
-            except requests.exceptions.RequestException as e:
-                if attempt == max_retries - 1:
-                    raise
-                
-                delay = base_delay * (2 ** attempt)  # Exponential backoff
-                logger.warning(f"Sigma API request failed (attempt {attempt + 1}): {e}. Retrying in {delay}s...")
-                time.sleep(delay)
+        # Connection errors, 429s and 5xx responses are retried by the transport
+        max_auth_attempts = 2
         
-        raise Exception("Max retries exceeded for Sigma API request")
+        for attempt in range(max_auth_attempts):
+            token = self._current_token()
+            headers = self._headers_for(token)
+            if cached is not None:
+                # Stale entry: ask Sigma whether it changed instead of refetching it
+                headers.update(cached.validators())
+            headers.update(kwargs.get('headers', {}))
+            
+            response = self.transport.request(
+                method,
+                f"{self.credentials.base_url}{endpoint}",
+                headers=headers,
+                **{k: v for k, v in kwargs.items() if k != 'headers'}
+            )
+            
+            if response.status_code == 401 and attempt < max_auth_attempts - 1:
+                # Token might be invalid, try refreshing
+                self._replace_rejected_token(token)
+                continue
+            
+            if cached is not None and response.status_code == 304:
+                self.response_cache.refresh(cached, self.response_cache.ttl_for(endpoint))
+                return cached.body
+            
+            response.raise_for_status()
+            body = response.json()
+            if method == 'GET':
+                self.response_cache.store(
+                    endpoint, body, len(response.content), self.response_cache.ttl_for(endpoint),
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified')
+                )
+            return body
     
     def _mock_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """Mock API responses for testing purposes"""
@@ -170,6 +251,15 @@ class SigmaAPIClient:
                 'pages': 1
             }
         
+        elif endpoint.startswith('/v2/workbooks/') and endpoint.endswith('/export'):
+            return {
+                'export_id': 'mock-export-123',
+                'status': 'completed',
+                'download_url': 'https://example.com/mock-export.csv',
+                'created_at': '2024-01-15T00:00:00Z',
+                'format': 'csv'
+            }
+        
         elif endpoint.startswith('/v2/workbooks'):
             return {
                 'data': [
@@ -292,15 +382,6 @@ class SigmaAPIClient:
                 'pages': 1
             }
         
-        elif endpoint.startswith('/v2/workbooks/') and endpoint.endswith('/export'):
-            return {
-                'export_id': 'mock-export-123',
-                'status': 'completed',
-                'download_url': 'https://example.com/mock-export.csv',
-                'created_at': '2024-01-15T00:00:00Z',
-                'format': 'csv'
-            }
-        
         # Default mock response
         return {
             'message': 'Mock response for testing',
@@ -336,6 +417,46 @@ class SigmaAPIClient:
                                 json={'format': {'type': export_format}},
                                 headers=headers)
     
+    def fetch_export(self, query_id: str, destination: str, chunk_size: int = 1024 * 1024) -> Optional[int]:
+        """Stream a finished export to ``destination`` in chunks.
+        
+        Returns the number of bytes written, or None while Sigma is still
+        preparing the file. The file only appears once fully downloaded.
+        """
+        if self.mock_mode:
+            rows = ['id,name,value'] + [f'{i},mock-row-{i},{i * 10}' for i in range(1, 101)]
+            content = ('\n'.join(rows) + '\n').encode()
+            with open(destination, 'wb') as f:
+                f.write(content)
+            return len(content)
+        
+        token = self._current_token()
+        response = self.transport.request(
+            'GET',
+            f"{self.credentials.base_url}/v2/query/{query_id}/download",
+            headers=self._headers_for(token),
+            stream=True
+        )
+        try:
+            if response.status_code in (202, 204):
+                return None
+            if response.status_code == 401:
+                # Token rotated mid-export; the next poll uses the new one
+                self._replace_rejected_token(token)
+                return None
+            response.raise_for_status()
+            
+            partial_path = destination + '.part'
+            written = 0
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+            os.replace(partial_path, destination)
+            return written
+        finally:
+            response.close()
+    
     def get_workbook_details(self, workbook_id: str) -> Dict[str, Any]:
         """Get detailed workbook information"""
         return self._make_request('GET', f'/v2/workbooks/{workbook_id}')
@@ -354,4 +475,71 @@ class SigmaAPIClient:
     
     def list_members(self, page: int = 1, size: int = 50) -> Dict[str, Any]:
         """List organization members with pagination"""
-        return self._make_request('GET', f'/v2/members?page={page}&size={size}') 
\ No newline at end of file
+        return self._make_request('GET', f'/v2/members?page={page}&size={size}') 
+    
+    def _fetch_list_page(self, resource: str, page: int, size: int) -> Dict[str, Any]:
+        return self._make_request('GET', f'{LIST_ENDPOINTS[resource]}?page={page}&size={size}')
+    
+    def iter_all_batches(self, resource: str, size: int = 50, max_workers: int = 4) -> Iterator[List[Dict[str, Any]]]:
+        """Yield de-duplicated items of every page of a list endpoint, one list per page as it arrives"""
+        if resource not in LIST_ENDPOINTS:
+            raise ValueError(f"Unknown Sigma list resource: {resource}")
+        return iter_page_batches(
+            lambda page, page_size: self._fetch_list_page(resource, page, page_size),
+            size=size, max_workers=max_workers
+        )
+    
+    def iter_all(self, resource: str, size: int = 50, max_workers: int = 4) -> Iterator[Dict[str, Any]]:
+        """Yield every item of a list endpoint, fetching pages concurrently"""
+        if resource not in LIST_ENDPOINTS:
+            raise ValueError(f"Unknown Sigma list resource: {resource}")
+        return iter_pages(
+            lambda page, page_size: self._fetch_list_page(resource, page, page_size),
+            size=size, max_workers=max_workers
+        )
+    
+    def list_all(self, resource: str, size: int = 50, max_workers: int = 4) -> List[Dict[str, Any]]:
+        """Every item of a list endpoint (e.g. ``list_all('workbooks')``)"""
+        return list(self.iter_all(resource, size=size, max_workers=max_workers))
+
+def credentials_key(credentials: SigmaCredentials) -> tuple:
+    """Registry key for a set of credentials; the secret is hashed, never stored as a key"""
+    secret_digest = hashlib.sha256((credentials.client_secret or '').encode()).hexdigest()
+    return (credentials.base_url, credentials.client_id, secret_digest)
+
+class SigmaClientRegistry:
+    """Process-wide cache of SigmaAPIClient instances keyed by credentials.
+    
+    Reusing a client reuses its token, so requests with the same credentials
+    authenticate once per token lifetime instead of once per request.
+    """
+    
+    def __init__(self, max_clients: int = 16):
+        self.max_clients = max_clients
+        self._clients: 'OrderedDict[tuple, SigmaAPIClient]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, credentials: SigmaCredentials) -> SigmaAPIClient:
+        key = credentials_key(credentials)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = SigmaAPIClient(credentials)
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(key)
+            return client
+    
+    def invalidate(self) -> None:
+        """Forget every cached client and token (e.g. after a credentials change)"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.invalidate_token()
+    
+    def __len__(self) -> int:
+        return len(self._clients)
+
+client_registry = SigmaClientRegistry()
@@ -0,0 +1,208 @@
+"""
+Sigma Export Jobs
+Background workbook exports: submit, poll Sigma with backoff, stream the file to disk
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+from .sigma_api_client import credentials_key
+
+logger = logging.getLogger(__name__)
+
+# Job states; only queued and running jobs absorb duplicate submissions
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'json': 'application/json'
+}
+
+@dataclass
+class ExportJob:
+    id: str
+    workbook_id: str
+    export_format: str
+    status: str = QUEUED
+    query_id: Optional[str] = None
+    file_path: Optional[str] = None
+    bytes: int = 0
+    polls: int = 0
+    error: Optional[str] = None
+    requests: int = 1
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def filename(self) -> str:
+        return f"{self.workbook_id}.{self.export_format}"
+
+    @property
+    def mimetype(self) -> str:
+        return EXPORT_MIMETYPES[self.export_format]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop('file_path')
+        data['filename'] = self.filename
+        return data
+
+class ExportJobManager:
+    """Runs workbook exports on a bounded worker pool.
+
+    ``submit`` returns at once. At most ``max_workers`` exports talk to Sigma
+    at a time; the rest wait in the pool's queue. A submission matching a
+    queued or running job (same credentials, workbook, format and OAuth
+    overrides) joins that job instead of starting another export. Workers
+    poll the download endpoint with jittered exponential backoff and stream
+    the file into ``output_dir``. Finished jobs are kept for ``retention``
+    seconds.
+
+    Jobs live only in this process's memory. Under a multi-worker server
+    (e.g. gunicorn with several workers) a status or download request can
+    land on a worker that never saw the job and gets a 404, so run exports
+    with a single worker process (threads are fine) or pin clients to one.
+    Jobs are also lost on restart; their files stay in ``output_dir``.
+    """
+
+    def __init__(self, output_dir: str = 'sigma_exports', max_workers: int = 2,
+                 poll_interval: float = 1.0, poll_cap: float = 15.0,
+                 timeout: float = 600.0, retention: float = 3600.0):
+        self.output_dir = output_dir
+        self.poll_interval = poll_interval
+        self.poll_cap = poll_cap
+        self.timeout = timeout
+        self.retention = retention
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sigma-export')
+        self._jobs: Dict[str, ExportJob] = {}
+        self._active: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def job_key(client, workbook_id: str, export_format: str,
+                oauth_overrides: Optional[List[Dict]], reject_default_tokens: bool) -> tuple:
+        overrides = json.dumps(oauth_overrides, sort_keys=True) if oauth_overrides else None
+        return (credentials_key(client.credentials), workbook_id, export_format, overrides, bool(reject_default_tokens))
+
+    def submit(self, client, workbook_id: str, export_format: str = 'csv',
+               oauth_overrides: Optional[List[Dict]] = None,
+               reject_default_tokens: bool = False) -> ExportJob:
+        """Queue an export, or return the in-flight job for an identical request"""
+        # The format becomes part of a file path and of the download name
+        if export_format not in EXPORT_MIMETYPES:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        self.prune()
+        key = self.job_key(client, workbook_id, export_format, oauth_overrides, reject_default_tokens)
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id is not None:
+                job = self._jobs[job_id]
+                job.requests += 1
+                return job
+            job = ExportJob(id=uuid.uuid4().hex, workbook_id=workbook_id, export_format=export_format)
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+
+        self._executor.submit(self._run, job, key, client, oauth_overrides, reject_default_tokens)
+        logger.info(f"Queued Sigma export {job.id} for workbook {workbook_id} ({export_format})")
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[ExportJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def _update(self, job: ExportJob, **changes) -> None:
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+
+    def _run(self, job: ExportJob, key: tuple, client, oauth_overrides, reject_default_tokens) -> None:
+        try:
+            self._update(job, status=RUNNING)
+            result = client.export_workbook(
+                workbook_id=job.workbook_id,
+                export_format=job.export_format,
+                oauth_overrides=oauth_overrides,
+                reject_default_tokens=reject_default_tokens
+            )
+            query_id = result.get('queryId') or result.get('export_id')
+            if not query_id:
+                raise RuntimeError("Sigma did not return an export id")
+            self._update(job, query_id=query_id)
+
+            destination = os.path.join(self.output_dir, f"{job.id}.{job.export_format}")
+            deadline = time.time() + self.timeout
+            attempt = 0
+            while True:
+                written = client.fetch_export(query_id, destination)
+                job.polls += 1
+                if written is not None:
+                    break
+                if time.time() >= deadline:
+                    raise TimeoutError(f"Export not ready after {self.timeout:.0f}s")
+                # Jitter keeps many pending exports from polling in lockstep
+                delay = random.uniform(self.poll_interval / 2, min(self.poll_cap, self.poll_interval * (2 ** attempt)))
+                attempt += 1
+                if self._stopped.wait(delay):
+                    raise RuntimeError("Export manager stopped")
+
+            self._update(job, status=COMPLETED, file_path=destination, bytes=written)
+            logger.info(f"Sigma export {job.id} finished ({written} bytes, {job.polls} polls)")
+        except Exception as e:
+            logger.error(f"Sigma export {job.id} failed: {e}")
+            self._update(job, status=FAILED, error=str(e))
+        finally:
+            with self._lock:
+                if self._active.get(key) == job.id:
+                    del self._active[key]
+
+    def prune(self) -> None:
+        """Forget finished jobs older than the retention period and delete their files"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.status not in ACTIVE_STATES and job.updated_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_manager: Optional[ExportJobManager] = None
+_manager_lock = threading.Lock()
+
+def get_export_manager(config=None) -> ExportJobManager:
+    """Process-wide export manager, created from app config on first use (one per worker process)"""
+    global _manager
+    config = config or {}
+    with _manager_lock:
+        if _manager is None:
+            _manager = ExportJobManager(
+                output_dir=config.get('SIGMA_EXPORT_DIR', 'sigma_exports'),
+                max_workers=int(config.get('SIGMA_EXPORT_WORKERS', 2)),
+                timeout=float(config.get('SIGMA_EXPORT_TIMEOUT', 600))
+            )
+        return _manager
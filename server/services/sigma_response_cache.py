@@ -0,0 +1,127 @@
+"""
+Sigma Response Cache
+Size-bounded LRU cache of Sigma API GET responses with per-endpoint TTLs and revalidation
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds a response stays fresh, by endpoint prefix (longest match wins)
+DEFAULT_TTLS = {
+    '/v2/users/me': 60,
+    '/v2/workbooks': 60,
+    '/v2/workbooks/': 300,
+    '/v2/workspaces': 300,
+    '/v2/members': 300,
+    '/v2/teams': 300,
+    '/v2/connections': 120,
+    '/v2/datasets': 120
+}
+
+@dataclass
+class CachedResponse:
+    body: Any
+    size: int
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    hits: int = field(default=0)
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class SigmaResponseCache:
+    """Thread-safe LRU of parsed GET responses, bounded by total body size.
+
+    Fresh entries are served without a round trip. Stale entries that carry
+    an ETag or Last-Modified are kept so the client can revalidate them with
+    a conditional request and reuse the body on ``304 Not Modified``.
+    Cached bodies are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttls: Dict[str, float] = None,
+                 default_ttl: float = 0):
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+
+    def ttl_for(self, endpoint: str) -> float:
+        path = endpoint.split('?', 1)[0]
+        matches = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else self.default_ttl
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The entry for ``key`` (fresh or stale), marked most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def record_hit(self, entry: CachedResponse) -> None:
+        with self._lock:
+            entry.hits += 1
+            self.stats['hits'] += 1
+
+    def record_miss(self) -> None:
+        self._count('misses')
+
+    def store(self, key: str, body: Any, size: int, ttl: float,
+              etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        # Entries that can neither be served fresh nor revalidated are not worth keeping
+        if (ttl <= 0 and not etag and not last_modified) or size > self.max_bytes:
+            return
+        entry = CachedResponse(body, size, time.time() + ttl, etag, last_modified)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self.stats['evictions'] += 1
+
+    def refresh(self, entry: CachedResponse, ttl: float) -> None:
+        """Extend an entry after the server confirmed it unchanged (304)"""
+        entry.expires_at = time.time() + ttl
+        self._count('revalidated')
+
+    def invalidate(self, prefix: str = '') -> None:
+        """Drop entries whose endpoint starts with ``prefix`` (all by default)"""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._size -= self._entries.pop(key).size
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries), 'bytes': self._size, 'max_bytes': self.max_bytes}
+
+def response_cache_from_env() -> SigmaResponseCache:
+    return SigmaResponseCache(max_bytes=int(os.environ.get('SIGMA_RESPONSE_CACHE_MAX_BYTES', 8 * 1024 * 1024)))
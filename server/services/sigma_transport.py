@@ -0,0 +1,153 @@
+"""
+Sigma HTTP Transport
+Pooled keep-alive sessions, per-host concurrency limits and jittered retry backoff
+"""
+
+import os
+import random
+import threading
+import time
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class SigmaTransport:
+    """Thread-safe HTTP transport shared by Sigma API clients.
+
+    One ``requests.Session`` keeps connections alive in a pool of
+    ``pool_size`` per host, so repeated calls skip TCP/TLS setup. At most
+    ``max_per_host`` requests are in flight to any one host; callers beyond
+    that wait for a slot. Connection errors and 429/5xx responses are retried
+    with full-jitter exponential backoff, or after ``Retry-After`` when the
+    server sends one.
+    """
+
+    def __init__(self, pool_size: int = 20, max_per_host: int = 8, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                 timeout: tuple = (5, 30)):
+        self.pool_size = pool_size
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        # Retries are handled here so Retry-After and the host limits apply to them
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+        self._closed = threading.Event()
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry ``attempt`` (0-based); Retry-After wins over the jittered backoff"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _wait(self, delay: float) -> None:
+        # Interruptible so close() does not wait out a long Retry-After
+        if self._closed.wait(delay):
+            raise requests.exceptions.ConnectionError("Sigma transport closed")
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying transient failures; returns the final response"""
+        kwargs.setdefault('timeout', self.timeout)
+        slot = self._slot(url)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            with slot:
+                self._count('requests')
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    self._count('errors')
+                    if last_attempt:
+                        raise
+                    delay = self.backoff_delay(attempt)
+                    logger.warning(f"Sigma API request failed (attempt {attempt + 1}): {e}. Retrying in {delay:.2f}s...")
+                    response = None
+
+            if response is not None:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                delay = self.backoff_delay(attempt, parse_retry_after(response.headers.get('Retry-After')))
+                logger.warning(f"Sigma API returned {response.status_code} (attempt {attempt + 1}). Retrying in {delay:.2f}s...")
+                # Hand the connection back to the pool before waiting
+                response.close()
+
+            self._count('retries')
+            # The host slot is released while waiting so other callers can proceed
+            self._wait(delay)
+
+        raise requests.exceptions.RetryError("Max retries exceeded for Sigma API request")
+
+    def close(self) -> None:
+        self._closed.set()
+        self.session.close()
+
+_default_transport: Optional[SigmaTransport] = None
+_default_lock = threading.Lock()
+
+def get_default_transport() -> SigmaTransport:
+    """Process-wide transport so every client shares one connection pool"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = SigmaTransport(
+                pool_size=int(os.environ.get('SIGMA_HTTP_POOL_SIZE', 20)),
+                max_per_host=int(os.environ.get('SIGMA_HTTP_MAX_PER_HOST', 8)),
+                max_retries=int(os.environ.get('SIGMA_HTTP_MAX_RETRIES', 3)),
+                timeout=(float(os.environ.get('SIGMA_HTTP_CONNECT_TIMEOUT', 5)),
+                         float(os.environ.get('SIGMA_HTTP_READ_TIMEOUT', 30)))
+            )
+        return _default_transport
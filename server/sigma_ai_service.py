@@ -9,6 +9,9 @@ for Sigma development workflows.
 import asyncio
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import re
@@ -87,6 +90,168 @@ class WorkbookTemplate:
     created_at: datetime
     updated_at: datetime
 
+# Pattern group for the performance keyword scan (not a pattern_to_type group)
+PERFORMANCE_GROUP = 'performance'
+PERFORMANCE_PATTERNS = ['performance', 'optimization', 'speed', 'efficiency']
+
+# Query pattern groups and the suggestion types they select
+PATTERN_TO_TYPE = {
+    'dashboard': SuggestionType.VISUALIZATION,
+    'input_table': SuggestionType.INPUT_TABLE,
+    'workflow': SuggestionType.WORKFLOW,
+    'layout': SuggestionType.LAYOUT,
+    'data_model': SuggestionType.DATA_MODEL,
+    'filter': SuggestionType.FILTER
+}
+
+@dataclass
+class QueryMatches:
+    """Pattern hits for one query: ``(position, pattern)`` pairs per pattern group"""
+    positions: Dict[str, List[Tuple[int, str]]]
+    
+    def __contains__(self, group: str) -> bool:
+        return group in self.positions
+    
+    def weights(self) -> Dict[str, float]:
+        """Each group's share of all pattern hits"""
+        total = sum(len(hits) for hits in self.positions.values())
+        return {group: len(hits) / total for group, hits in self.positions.items()} if total else {}
+
+def _trie_regex(patterns: List[str]) -> str:
+    """Regex matching any of ``patterns``, factored as a character trie.
+    
+    Shared prefixes are tested once (``d(?:a(?:shboard|ta ...)|esign)``) instead
+    of trying every alternative at each position, and optional tails make the
+    longest pattern win.
+    """
+    root: Dict[str, Any] = {}
+    for pattern in patterns:
+        node = root
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = True
+    
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+    
+    return build(root)
+
+class QueryPatternIndex:
+    """Classifies text against every pattern group in one pass.
+    
+    All patterns are compiled into one trie-shaped regex inside a lookahead,
+    so a match is tried at every position of the lowercased text and
+    overlapping hits are found. Each hit is the longest pattern starting there
+    and also credits the shorter patterns it starts with (``table structure``
+    also counts ``table``), which reports exactly the substring hits of the
+    per-pattern ``in`` checks. Positions index the lowercased text.
+    """
+    
+    def __init__(self, groups: Dict[str, List[str]]):
+        self.groups = list(groups)
+        self._groups_by_pattern: Dict[str, List[str]] = {}
+        for group, patterns in groups.items():
+            for pattern in patterns:
+                pattern_groups = self._groups_by_pattern.setdefault(pattern.lower(), [])
+                if group not in pattern_groups:
+                    pattern_groups.append(group)
+        
+        patterns = list(self._groups_by_pattern)
+        self._regex = re.compile('(?=(' + _trie_regex(patterns) + '))')
+        # (group, pattern) pairs credited when ``pattern`` is the longest hit at a position
+        self._credits = {
+            pattern: [
+                (group, credited)
+                for credited in patterns if pattern.startswith(credited)
+                for group in self._groups_by_pattern[credited]
+            ]
+            for pattern in patterns
+        }
+    
+    def scan(self, text: str) -> QueryMatches:
+        positions: Dict[str, List[Tuple[int, str]]] = {}
+        # Lowercasing once is much cheaper than a case-insensitive regex
+        for match in self._regex.finditer(text.lower()):
+            start = match.start()
+            for group, pattern in self._credits[match.group(1)]:
+                positions.setdefault(group, []).append((start, pattern))
+        # Report groups in their declared order
+        return QueryMatches({group: positions[group] for group in self.groups if group in positions})
+
+@dataclass
+class CachedSuggestions:
+    """Ranked suggestions for one normalized request, with their JSON-ready form"""
+    suggestions: Tuple[AISuggestion, ...]
+    serialized: List[Dict[str, Any]]
+    expires_at: float
+
+class SuggestionCache:
+    """Bounded LRU of suggestion results with a TTL.
+    
+    Entries are shared between callers; the cached suggestions and their
+    serialized dicts must be treated as read-only.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[tuple, CachedSuggestions]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+    
+    @staticmethod
+    def make_key(query: str, context: Optional[Dict[str, Any]], user_experience: str, project_type: str) -> tuple:
+        """Normalize inputs so trivially different requests share an entry"""
+        normalized_query = ' '.join(query.lower().split())
+        normalized_context = json.dumps(context or {}, sort_keys=True, default=str)
+        return (normalized_query, normalized_context, user_experience, project_type)
+    
+    def get(self, key: tuple) -> Optional[CachedSuggestions]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.stats['misses'] += 1
+            return None
+    
+    def put(self, key: tuple, suggestions: List[AISuggestion]) -> CachedSuggestions:
+        entry = CachedSuggestions(
+            suggestions=tuple(suggestions),
+            serialized=[serialize_for_json(asdict(suggestion)) for suggestion in suggestions],
+            expires_at=time.time() + self.ttl
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return entry
+    
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats['invalidations'] += 1
+    
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+            }
+
 class SigmaAIService:
     """
     AI service for Sigma workbook development assistance
@@ -94,8 +259,27 @@ class SigmaAIService:
     
     def __init__(self):
         self.suggestion_patterns = self._initialize_patterns()
+        self.pattern_index = QueryPatternIndex({
+            **self.suggestion_patterns, PERFORMANCE_GROUP: PERFORMANCE_PATTERNS
+        })
         self.component_templates = self._initialize_component_templates()
         self.best_practices = self._initialize_best_practices()
+        # Suggestions are deterministic per normalized request, so they are memoized
+        self.suggestion_cache = SuggestionCache()
+    
+    def invalidate_suggestions(self) -> None:
+        """Drop memoized suggestions; call after changing templates or best practices"""
+        self.suggestion_cache.invalidate()
+    
+    def register_template(self, template_name: str, template_data: Dict[str, Any]) -> None:
+        """Add or replace a component template"""
+        self.component_templates[template_name] = template_data
+        self.invalidate_suggestions()
+    
+    def set_best_practices(self, category: str, practices: List[str]) -> None:
+        """Replace the best practices for a category"""
+        self.best_practices[category] = list(practices)
+        self.invalidate_suggestions()
         
     def _initialize_patterns(self) -> Dict[str, List[str]]:
         """Initialize pattern matching for different types of queries"""
@@ -243,56 +427,131 @@ class SigmaAIService:
             List of AI suggestions
         """
         try:
-            suggestions = []
-            query_lower = query.lower()
-            
-            # Analyze query patterns to determine suggestion types
-            detected_types = self._detect_query_types(query_lower)
-            
-            # Generate suggestions based on detected types
-            for suggestion_type in detected_types:
-                type_suggestions = await self._generate_type_specific_suggestions(
-                    suggestion_type, query, context, user_experience, project_type
-                )
-                suggestions.extend(type_suggestions)
-            
-            # Add general best practices if no specific suggestions
-            if not suggestions:
-                suggestions.extend(await self._generate_best_practice_suggestions(
-                    query, context, user_experience, project_type
-                ))
-            
-            # Add performance and optimization suggestions
-            if any(word in query_lower for word in ['performance', 'optimization', 'speed', 'efficiency']):
-                suggestions.extend(await self._generate_performance_suggestions(context))
-            
-            # Sort suggestions by priority and relevance
-            suggestions = self._rank_suggestions(suggestions, query, context)
-            
-            return suggestions[:10]  # Limit to top 10 suggestions
-            
+            entry = await self._cached_suggestions(query, context, user_experience, project_type)
+            return list(entry.suggestions)
         except Exception as e:
             logger.error(f"Error generating workbook suggestions: {str(e)}")
             return [self._create_error_suggestion(str(e))]
     
+    async def generate_serialized_suggestions(
+        self,
+        query: str,
+        context: Dict[str, Any] = None,
+        user_experience: str = 'intermediate',
+        project_type: str = 'dashboard'
+    ) -> List[Dict[str, Any]]:
+        """Like ``generate_workbook_suggestions`` but returns memoized JSON-ready dicts"""
+        try:
+            entry = await self._cached_suggestions(query, context, user_experience, project_type)
+            return list(entry.serialized)
+        except Exception as e:
+            logger.error(f"Error generating workbook suggestions: {str(e)}")
+            return [serialize_for_json(asdict(self._create_error_suggestion(str(e))))]
+    
+    async def iter_batch_suggestions(
+        self,
+        queries: List[Tuple[str, Optional[Dict[str, Any]]]],
+        user_experience: str = 'intermediate',
+        project_type: str = 'dashboard'
+    ):
+        """Generate suggestions for many ``(query, context)`` pairs concurrently.
+        
+        Requests that normalize to the same cache key are generated once.
+        Yields ``(indices, serialized_suggestions)`` for each distinct request
+        as it finishes, where ``indices`` are the positions it answers.
+        """
+        indices_by_key: Dict[tuple, List[int]] = OrderedDict()
+        requests_by_key: Dict[tuple, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        for index, (query, context) in enumerate(queries):
+            key = self.suggestion_cache.make_key(query, context, user_experience, project_type)
+            indices_by_key.setdefault(key, []).append(index)
+            requests_by_key.setdefault(key, (query, context))
+        
+        async def generate(key):
+            query, context = requests_by_key[key]
+            return key, await self.generate_serialized_suggestions(query, context, user_experience, project_type)
+        
+        for finished in asyncio.as_completed([generate(key) for key in indices_by_key]):
+            key, suggestions = await finished
+            yield indices_by_key[key], suggestions
+    
+    async def generate_batch_suggestions(
+        self,
+        queries: List[Tuple[str, Optional[Dict[str, Any]]]],
+        user_experience: str = 'intermediate',
+        project_type: str = 'dashboard'
+    ) -> List[List[Dict[str, Any]]]:
+        """Serialized suggestions for each ``(query, context)`` pair, in input order"""
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        async for indices, suggestions in self.iter_batch_suggestions(queries, user_experience, project_type):
+            for index in indices:
+                results[index] = suggestions
+        return results
+    
+    async def _cached_suggestions(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]],
+        user_experience: str,
+        project_type: str
+    ) -> CachedSuggestions:
+        key = self.suggestion_cache.make_key(query, context, user_experience, project_type)
+        entry = self.suggestion_cache.get(key)
+        if entry is None:
+            suggestions = await self._compute_workbook_suggestions(query, context, user_experience, project_type)
+            entry = self.suggestion_cache.put(key, suggestions)
+        return entry
+    
+    async def _compute_workbook_suggestions(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]],
+        user_experience: str,
+        project_type: str
+    ) -> List[AISuggestion]:
+        """Detect, generate and rank suggestions (uncached)"""
+        suggestions = []
+        
+        # Analyze query patterns to determine suggestion types (one scan for all groups)
+        matches = self.pattern_index.scan(query)
+        detected_types = self._types_for_matches(matches)
+        
+        # Generate suggestions for all detected types concurrently, so latency
+        # is that of the slowest generator; gather keeps the detection order
+        wants_performance = PERFORMANCE_GROUP in matches
+        generators = [
+            self._generate_type_specific_suggestions(
+                suggestion_type, query, context, user_experience, project_type
+            )
+            for suggestion_type in detected_types
+        ]
+        if wants_performance:
+            generators.append(self._generate_performance_suggestions(context))
+        results = await asyncio.gather(*generators)
+        performance_suggestions = results.pop() if wants_performance else []
+        for type_suggestions in results:
+            suggestions.extend(type_suggestions)
+        
+        # Add general best practices if no specific suggestions
+        if not suggestions:
+            suggestions.extend(await self._generate_best_practice_suggestions(
+                query, context, user_experience, project_type
+            ))
+        
+        # Add performance and optimization suggestions
+        suggestions.extend(performance_suggestions)
+        
+        # Sort suggestions by priority and relevance
+        suggestions = self._rank_suggestions(suggestions, query, context, matches)
+        
+        return suggestions[:10]  # Limit to top 10 suggestions
+    
     def _detect_query_types(self, query: str) -> List[SuggestionType]:
         """Detect which types of suggestions are relevant based on the query"""
-        detected_types = []
-        
-        # Map pattern keys to SuggestionType enum values
-        pattern_to_type = {
-            'dashboard': SuggestionType.VISUALIZATION,
-            'input_table': SuggestionType.INPUT_TABLE,
-            'workflow': SuggestionType.WORKFLOW,
-            'layout': SuggestionType.LAYOUT,
-            'data_model': SuggestionType.DATA_MODEL,
-            'filter': SuggestionType.FILTER
-        }
-        
-        for suggestion_type, patterns in self.suggestion_patterns.items():
-            if any(pattern in query.lower() for pattern in patterns):
-                if suggestion_type in pattern_to_type:
-                    detected_types.append(pattern_to_type[suggestion_type])
+        return self._types_for_matches(self.pattern_index.scan(query))
+    
+    def _types_for_matches(self, matches: QueryMatches) -> List[SuggestionType]:
+        detected_types = [PATTERN_TO_TYPE[group] for group in matches.positions if group in PATTERN_TO_TYPE]
         
         # Always add best practice suggestions
         detected_types.append(SuggestionType.BEST_PRACTICE)
@@ -630,9 +889,20 @@ class SigmaAIService:
         self, 
         suggestions: List[AISuggestion], 
         query: str, 
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        matches: Optional[QueryMatches] = None
     ) -> List[AISuggestion]:
         """Rank suggestions by relevance and priority"""
+        query_words = set(query.lower().split())
+        
+        # Boost suggestion types in proportion to how much of the query matched their patterns
+        type_weights = {}
+        if matches is not None:
+            for group, weight in matches.weights().items():
+                suggestion_type = PATTERN_TO_TYPE.get(group, SuggestionType.PERFORMANCE if group == PERFORMANCE_GROUP else None)
+                if suggestion_type is not None:
+                    type_weights[suggestion_type] = type_weights.get(suggestion_type, 0.0) + weight
+        
         def score_suggestion(suggestion: AISuggestion) -> float:
             score = 0.0
             
@@ -647,7 +917,6 @@ class SigmaAIService:
             score += priority_scores.get(suggestion.priority, 0)
             
             # Query relevance scoring
-            query_words = set(query.lower().split())
             title_words = set(suggestion.title.lower().split())
             description_words = set(suggestion.description.lower().split())
             
@@ -655,6 +924,7 @@ class SigmaAIService:
             description_match = len(query_words.intersection(description_words)) / len(query_words) if query_words else 0
             
             score += title_match * 50 + description_match * 30
+            score += type_weights.get(suggestion.type, 0.0) * 20
             
             # Recency scoring (newer suggestions get slight boost)
             age_hours = (datetime.now() - suggestion.created_at).total_seconds() / 3600
@@ -710,12 +980,10 @@ class SigmaAIService:
     
     async def list_workbook_templates(self) -> List[WorkbookTemplate]:
         """List all available workbook templates"""
-        templates = []
-        for template_name, template_data in self.component_templates.items():
-            template = await self.get_workbook_template(template_name)
-            if template:
-                templates.append(template)
-        return templates
+        templates = await asyncio.gather(*(
+            self.get_workbook_template(template_name) for template_name in self.component_templates
+        ))
+        return [template for template in templates if template]
     
     async def generate_workbook_config(
         self, 
@@ -861,20 +1129,35 @@ def serialize_for_json(obj):
     else:
         return obj
 
+class SuggestionDeduplicator:
+    """Tracks suggestions already returned in a batch, keyed by type and title.
+    
+    Different queries often yield the same suggestion (e.g. the dashboard best
+    practices); each is sent once and later queries refer to it by id.
+    """
+    
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], str] = {}
+    
+    def add(self, suggestions: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Returns the suggestions not seen before and the ids of all of them"""
+        new_suggestions, ids = [], []
+        for suggestion in suggestions:
+            key = (suggestion['type'], suggestion['title'])
+            if key not in self._ids:
+                self._ids[key] = suggestion['id']
+                new_suggestions.append(suggestion)
+            ids.append(self._ids[key])
+        return new_suggestions, ids
+
 # Global instance
 sigma_ai_service = SigmaAIService()
 
 # Convenience functions for external use
 async def get_sigma_suggestions(query: str, context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     """Get AI suggestions for Sigma workbook development"""
-    suggestions = await sigma_ai_service.generate_workbook_suggestions(query, context)
-    # Use custom serialization to handle enums and datetimes
-    serialized_suggestions = []
-    for suggestion in suggestions:
-        suggestion_dict = asdict(suggestion)
-        serialized_suggestion = serialize_for_json(suggestion_dict)
-        serialized_suggestions.append(serialized_suggestion)
-    return serialized_suggestions
+    # Memoized and already serialized (enums and datetimes converted)
+    return await sigma_ai_service.generate_serialized_suggestions(query, context)
 
 async def generate_sigma_config(requirements: Dict[str, Any], template_name: str = None) -> Dict[str, Any]:
     """Generate a complete Sigma workbook configuration"""
@@ -5,7 +5,7 @@ Integrates Sigma compatibility with the existing Flask application
 
 from typing import Dict, Any, Optional
 import logging
-from flask import current_app, request, jsonify
+from flask import current_app, request, jsonify, Response, stream_with_context
 
 logger = logging.getLogger(__name__)
 
@@ -104,6 +104,59 @@ class SigmaIntegration:
                 logger.error(f"Error getting database health: {e}")
                 return jsonify({'status': 'error', 'message': str(e)}), 500
         
+        # Streaming table export
+        @self.app.route('/api/database/tables/<table_name>/rows', methods=['GET'])
+        def stream_table_rows(table_name):
+            """Stream an allowlisted table's rows as chunked JSON (or NDJSON with format=ndjson)
+            
+            Only tables and columns listed in TABLE_ROWS_ALLOWLIST are exported,
+            and ``limit`` defaults to (and is capped at) TABLE_ROWS_MAX_LIMIT, which
+            also bounds how long the response holds a pooled reader connection.
+            JSON output is ``{"columns": [...], "rows": [[...], ...]}`` with
+            positional rows; ``rows=objects`` emits one object per row instead.
+            """
+            try:
+                if not self.database_adapter:
+                    return jsonify({'status': 'error', 'message': 'Database adapter not available'}), 404
+                allowlist = self.app.config.get('TABLE_ROWS_ALLOWLIST', {})
+                if table_name not in allowlist:
+                    return jsonify({'status': 'error', 'message': f'Table {table_name} is not exportable'}), 404
+                
+                columns = allowlist[table_name]
+                requested = request.args.get('columns')
+                if requested:
+                    unknown = sorted(set(requested.split(',')) - set(columns))
+                    if unknown:
+                        return jsonify({'status': 'error', 'message': f"Columns not exportable: {', '.join(unknown)}"}), 400
+                    columns = requested.split(',')
+                
+                max_limit = self.app.config.get('TABLE_ROWS_MAX_LIMIT', 10000)
+                limit = request.args.get('limit', max_limit, type=int)
+                if limit <= 0:
+                    return jsonify({'status': 'error', 'message': 'limit must be a positive integer'}), 400
+                limit = min(limit, max_limit)
+                
+                from database import iter_json_chunks, iter_ndjson_chunks
+                response_format = request.args.get('format', 'json')
+                as_tuples = response_format == 'json' and request.args.get('rows', 'tuples') != 'objects'
+                
+                # Names come from the allowlist, never from the request
+                query = f"SELECT {', '.join(columns)} FROM {table_name} LIMIT :limit"
+                
+                # Open the cursor now so a bad table is a clean error, not a truncated body
+                stream = self.database_adapter.stream_query(
+                    query, {'limit': limit},
+                    batch_size=request.args.get('batch_size', type=int),
+                    as_tuples=as_tuples
+                ).open()
+                
+                if response_format == 'ndjson':
+                    return Response(stream_with_context(iter_ndjson_chunks(stream)), mimetype='application/x-ndjson')
+                return Response(stream_with_context(iter_json_chunks(stream)), mimetype='application/json')
+            except Exception as e:
+                logger.error(f"Error streaming table {table_name}: {e}")
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
         # Sigma Input Tables Management
         @self.app.route('/api/sigma/input-tables', methods=['GET', 'POST'])
         def manage_input_tables():
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the A/B testing rollup and significance tests
+"""
+
+import os
+import sys
+import math
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.ab_testing import (
+    _betainc, analyze_ab_test, compute_ab_rollup, student_t_two_sided_p,
+    two_proportion_z_test, welch_t_test
+)
+
+@pytest.mark.parametrize('t', [0.0, 0.5, 1.0, 3.0, 12.0])
+def test_t_p_value_matches_cauchy_closed_form(t):
+    # df = 1 is the Cauchy distribution
+    assert student_t_two_sided_p(t, 1) == pytest.approx(1 - 2 / math.pi * math.atan(abs(t)), abs=1e-10)
+
+@pytest.mark.parametrize('t', [0.0, 0.5, 2.0, -4.0, 25.0])
+def test_t_p_value_matches_df2_closed_form(t):
+    assert student_t_two_sided_p(t, 2) == pytest.approx(1 - abs(t) / math.sqrt(2 + t * t), abs=1e-10)
+
+def test_t_p_value_converges_to_the_normal():
+    assert student_t_two_sided_p(1.96, 1e6) == pytest.approx(0.05, abs=1e-4)
+    assert student_t_two_sided_p(1.96, float('inf')) == pytest.approx(0.04999579, abs=1e-8)
+    # Critical value of t with 18 degrees of freedom
+    assert student_t_two_sided_p(2.100922, 18) == pytest.approx(0.05, abs=1e-6)
+
+def test_incomplete_beta_bounds_and_symmetry():
+    assert _betainc(2.0, 3.0, 0.0) == 0.0
+    assert _betainc(2.0, 3.0, 1.0) == 1.0
+    assert _betainc(1.0, 1.0, 0.3) == pytest.approx(0.3)
+    assert _betainc(2.5, 4.0, 0.4) == pytest.approx(1 - _betainc(4.0, 2.5, 0.6))
+
+def test_welch_t_test_from_summary_statistics():
+    # Equal sizes and variances: df = n1 + n2 - 2
+    result = welch_t_test(10, 2.100922 * math.sqrt(0.2), 1.0, 10, 0.0, 1.0)
+    assert result['df'] == pytest.approx(18)
+    assert result['statistic'] == pytest.approx(2.100922)
+    assert result['pValue'] == pytest.approx(0.05, abs=1e-6)
+
+    unequal = welch_t_test(5, 1.0, 4.0, 50, 0.0, 1.0)
+    se1, se2 = 4.0 / 5, 1.0 / 50
+    assert unequal['df'] == pytest.approx((se1 + se2) ** 2 / (se1 ** 2 / 4 + se2 ** 2 / 49))
+
+def test_two_proportion_z_test():
+    result = two_proportion_z_test(60, 100, 40, 100)
+    # Pooled p = 0.5, so z = 0.2 / sqrt(0.25 * 0.02) = 2 * sqrt(2)
+    assert result['statistic'] == pytest.approx(2 * math.sqrt(2))
+    assert result['pValue'] == pytest.approx(math.erfc(2.0))
+    assert two_proportion_z_test(0, 10, 0, 10) == {'statistic': 0.0, 'pValue': 1.0}
+    assert two_proportion_z_test(1, 0, 1, 10)['pValue'] == 1.0
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ab.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, engagement_score FLOAT, lifetime_value FLOAT, "
+            "churn_risk FLOAT, account_age_days INTEGER)"
+        ))
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+
+def add_users(session, *rows):
+    for engagement, ltv, churn in rows:
+        session.execute(text(
+            "INSERT INTO users (engagement_score, lifetime_value, churn_risk, account_age_days) "
+            "VALUES (:engagement, :ltv, :churn, 30)"
+        ), {'engagement': engagement, 'ltv': ltv, 'churn': churn})
+
+def test_empty_table(session):
+    analysis = analyze_ab_test(compute_ab_rollup(session))
+    assert analysis['variants'] == [] and analysis['conversions'] == []
+    assert analysis['sampleSize'] == 0
+    assert analysis['significant'] is False
+    assert analysis['statisticalSignificance']['variantA'] == {'average': 0, 'stdDev': 0, 'count': 0}
+
+def test_single_variant_has_nothing_to_compare(session):
+    add_users(session, (0.9, 150.0, 0.1), (0.8, 50.0, 0.5))
+    analysis = analyze_ab_test(compute_ab_rollup(session))
+    assert [v['userCount'] for v in analysis['variants']] == [2]
+    assert analysis['statisticalSignificance']['comparisons'] == []
+    assert analysis['confidenceLevel'] == 0.0
+    assert analysis['significant'] is False
+
+def test_one_user_per_variant_is_not_significant(session):
+    add_users(session, (0.9, 150.0, 0.1), (0.5, 50.0, 0.5))
+    analysis = analyze_ab_test(compute_ab_rollup(session))
+    comparison = analysis['statisticalSignificance']['comparisons'][0]
+    assert comparison['engagement']['pValue'] == 1.0
+    assert analysis['significant'] is False
+
+def test_constant_variants_with_different_means(session):
+    add_users(session, *[(0.9, 200.0, 0.1)] * 3, *[(0.2, 20.0, 0.9)] * 3)
+    analysis = analyze_ab_test(compute_ab_rollup(session))
+    comparison = analysis['statisticalSignificance']['comparisons'][0]
+    assert (comparison['baseline'], comparison['variant']) == ('Variant A', 'Variant C')
+    assert comparison['engagement']['pValue'] == 0.0
+    # 3/3 against 0/3 converted: z = sqrt(6)
+    assert comparison['conversion']['pValue'] == pytest.approx(math.erfc(math.sqrt(3)))
+    assert analysis['statisticalSignificance']['variantA']['stdDev'] == 0.0
+    assert analysis['significant'] is True
+    assert analysis['sampleSize'] == 6
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the materialized aggregate cache and its users-commit invalidation
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import aggregate_cache as aggregate_cache_module
+from app.services.aggregate_cache import AggregateCache
+
+Base = declarative_base()
+
+class Widget(Base):
+    __tablename__ = 'widgets'
+    id = Column(Integer, primary_key=True)
+
+class Gadget(Base):
+    __tablename__ = 'gadgets'
+    id = Column(Integer, primary_key=True)
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def test_counters_are_exact_under_concurrent_reads():
+    cache = AggregateCache(default_ttl=0)
+    cache.register('total', lambda: 42)
+
+    def read():
+        for _ in range(500):
+            assert cache.get('total').value == 42
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.get_status()['stats']
+    assert stats['misses'] == 1
+    assert stats['hits'] + stats['misses'] == 8 * 500
+
+def test_commit_invalidates_only_caches_watching_the_model(session_factory):
+    widget_caches = [AggregateCache() for _ in range(3)]
+    for cache in widget_caches:
+        cache.watch_model(Widget, session_factory)
+    gadget_cache = AggregateCache()
+    gadget_cache.watch_model(Gadget, session_factory)
+
+    session = session_factory()
+    session.add(Widget(id=1))
+    session.commit()
+    session.add(Widget(id=2))
+    session.rollback()
+    session.close()
+
+    assert [cache.stats['invalidations'] for cache in widget_caches] == [1, 1, 1]
+    assert gadget_cache.stats['invalidations'] == 0
+
+def test_listeners_are_installed_once_per_target(session_factory, monkeypatch):
+    calls = []
+    original_listen = aggregate_cache_module.event.listen
+    monkeypatch.setattr(aggregate_cache_module.event, 'listen',
+                        lambda *args: calls.append(args[1]) or original_listen(*args))
+
+    caches = [AggregateCache() for _ in range(5)]
+    for cache in caches:
+        cache.watch_model(Widget, session_factory)
+        cache.watch_model(Widget, session_factory)
+
+    assert sorted(calls) == ['after_commit', 'after_flush', 'after_soft_rollback']
+
+def test_analytics_service_reads_the_app_segments_rollup(tmp_path):
+    from config import TestingConfig
+    from app import create_app, db
+    from app.models import User
+    from app.services.analytics_service import AnalyticsService
+
+    class AnalyticsTestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'analytics.db'}"
+        MOCK_WAREHOUSE_DATA_PATH = str(tmp_path / 'mock_warehouse')
+
+    app = create_app(AnalyticsTestConfig)
+    with app.app_context():
+        db.create_all()
+        service = AnalyticsService()
+        assert service.aggregate_cache is app.aggregate_cache
+        assert service.get_user_segments() == []
+
+        db.session.add(User(username='ada', email='ada@example.com', engagement_score=0.9, lifetime_value=10.0))
+        db.session.commit()
+
+        # The users commit invalidated the shared rollup that /api/segments serves
+        assert [segment['userCount'] for segment in service.get_user_segments()] == [1]
+        assert app.test_client().get('/api/segments').get_json() == service.get_user_segments()
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the background event loop used by the synchronous Flask handlers
+"""
+
+import os
+import sys
+import queue
+import asyncio
+import threading
+import concurrent.futures
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.async_runner import BackgroundEventLoop
+
+@pytest.fixture
+def runner():
+    runner = BackgroundEventLoop('test-loop')
+    yield runner
+    runner.stop()
+
+async def double(value):
+    await asyncio.sleep(0)
+    return value * 2
+
+async def numbers(count, fail_at=None):
+    for value in range(count):
+        if value == fail_at:
+            raise ValueError(f'failed at {value}')
+        await asyncio.sleep(0)
+        yield value
+
+def test_run_returns_results_on_one_loop_thread(runner):
+    assert runner.run(double(21)) == 42
+    loop = runner._loop
+    results = []
+    threads = [threading.Thread(target=lambda value=value: results.append(runner.run(double(value)))) for value in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [value * 2 for value in range(8)]
+    assert runner._loop is loop
+    assert [thread.name for thread in threading.enumerate()].count('test-loop') == 1
+
+def test_run_raises_and_cancels_on_timeout(runner):
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def fail():
+        raise KeyError('missing')
+
+    with pytest.raises(KeyError):
+        runner.run(fail())
+    with pytest.raises(concurrent.futures.TimeoutError):
+        runner.run(slow(), timeout=0.05)
+    assert cancelled.wait(1)
+    # The loop keeps serving after a failure
+    assert runner.run(double(1)) == 2
+
+def test_iterate_yields_items_then_raises_producer_errors(runner):
+    assert list(runner.iterate(numbers(4))) == [0, 1, 2, 3]
+
+    received = []
+    with pytest.raises(ValueError, match='failed at 2'):
+        for item in runner.iterate(numbers(5, fail_at=2)):
+            received.append(item)
+    assert received == [0, 1]
+
+def test_iterate_times_out_and_stops_the_producer(runner):
+    cancelled = threading.Event()
+
+    async def stalled():
+        yield 'first'
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield 'never'
+
+    items = runner.iterate(stalled(), timeout=0.05)
+    assert next(items) == 'first'
+    with pytest.raises(queue.Empty):
+        next(items)
+    assert cancelled.wait(1)
+
+def test_iterate_closed_early_cancels_the_producer(runner):
+    cancelled = threading.Event()
+
+    async def endless():
+        try:
+            value = 0
+            while True:
+                yield value
+                value += 1
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    items = runner.iterate(endless())
+    assert next(items) == 0
+    items.close()
+    assert cancelled.wait(1)
+
+def test_loop_is_recreated_when_its_thread_is_gone(runner):
+    runner.run(double(1))
+    first_loop = runner._loop
+
+    # As after fork: the loop object is inherited but belongs to another process
+    runner._pid = -1
+    assert runner.run(double(2)) == 4
+    assert runner._loop is not first_loop
+    first_loop.call_soon_threadsafe(first_loop.stop)
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_forked_child_gets_its_own_loop(runner):
+    runner.run(double(1))
+    pid = os.fork()
+    if pid == 0:
+        # Child: the inherited loop has no thread here, so run() must start a new one
+        try:
+            os._exit(0 if runner.run(double(5), timeout=5) == 10 and runner._pid == os.getpid() else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert runner.run(double(3)) == 6
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel, cached chart pipeline
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chart_pipeline import ChartPipeline
+
+def render_text(data, path):
+    with open(path, 'w') as f:
+        f.write(str(data))
+
+def render_broken(data, path):
+    raise ValueError('bad chart data')
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_only_written_charts_are_reported(tmp_path, max_workers):
+    with ChartPipeline(output_dir=str(tmp_path), max_workers=max_workers) as charts:
+        with charts.batch():
+            charts.submit('ok.txt', render_text, [1, 2])
+            charts.submit('broken.txt', render_broken, [1, 2])
+            # Still queued inside the batch
+            assert charts.written(['ok.txt']) == []
+        assert charts.written(['ok.txt', 'broken.txt']) == ['ok.txt']
+        assert 'broken.txt' not in charts.manifest
+
+        charts.submit('ok.txt', render_text, [1, 2])
+        assert charts.flush()['skipped'] == ['ok.txt']
+        assert (tmp_path / 'ok.txt').read_text() == '[1, 2]'
+
+def test_ltv_boxplot_renders(tmp_path):
+    from analysis import render_ltv_by_plan_boxplot
+
+    plan_ltv = {'basic': {'mean': 10.0, 'median': 9.0, 'max': 30.0},
+                'pro': {'mean': 50.0, 'median': 45.0, 'max': 120.0}}
+    with ChartPipeline(output_dir=str(tmp_path), max_workers=1) as charts:
+        charts.submit('ltv_by_plan_boxplot.png', render_ltv_by_plan_boxplot, plan_ltv)
+        assert charts.written(['ltv_by_plan_boxplot.png']) == ['ltv_by_plan_boxplot.png']
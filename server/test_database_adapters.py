@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for database adapter construction
+Every adapter must accept Config classes as well as dict/Flask configs.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import DevelopmentConfig, TestingConfig, ProductionConfig
+from database import config_value, create_database_adapter
+from database.mock_warehouse import MockWarehouseAdapter
+from database.sigma_adapter import SigmaWarehouseAdapter
+from database.sqlite_adapter import SQLiteAdapter
+
+def config_classes(tmp_path):
+    class SQLiteTestConfig(DevelopmentConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'adapter.db'}"
+        BULK_LOAD_BATCH_SIZE = 123
+        QUERY_STREAM_BATCH_SIZE = 45
+
+    class MockWarehouseTestConfig(TestingConfig):
+        MOCK_WAREHOUSE_DATA_PATH = str(tmp_path / 'mock_warehouse')
+        BULK_LOAD_BATCH_SIZE = 123
+        QUERY_STREAM_BATCH_SIZE = 45
+
+    class WarehouseTestConfig(ProductionConfig):
+        BULK_LOAD_BATCH_SIZE = 123
+        QUERY_STREAM_BATCH_SIZE = 45
+
+    return {
+        SQLiteAdapter: SQLiteTestConfig,
+        MockWarehouseAdapter: MockWarehouseTestConfig,
+        SigmaWarehouseAdapter: WarehouseTestConfig
+    }
+
+def test_config_value_reads_mappings_and_objects():
+    assert config_value({'A': 1}, 'A') == 1
+    assert config_value({'A': 1}, 'B', 2) == 2
+    assert config_value(DevelopmentConfig, 'DATABASE_MODE') == 'sqlite'
+    assert config_value(DevelopmentConfig(), 'MISSING', 'x') == 'x'
+    assert config_value(None, 'A', 3) == 3
+
+@pytest.mark.parametrize('as_instance', [False, True])
+def test_factory_builds_every_adapter_from_config_class(tmp_path, as_instance):
+    for adapter_class, config_class in config_classes(tmp_path).items():
+        config = config_class() if as_instance else config_class
+        adapter = create_database_adapter(config)
+        try:
+            assert type(adapter) is adapter_class
+            assert adapter.bulk_batch_size == 123
+            assert adapter.stream_batch_size == 45
+            assert adapter.health_check()['status'] == 'healthy'
+        finally:
+            if hasattr(adapter, 'close'):
+                adapter.close()
+
+def test_sqlite_adapter_pools_file_from_config_class(tmp_path):
+    adapter = SQLiteAdapter(config_classes(tmp_path)[SQLiteAdapter])
+    try:
+        assert adapter.pool is not None
+        assert adapter.pool.path == str(tmp_path / 'adapter.db')
+    finally:
+        adapter.close()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the users rollup indexes and the index advisor
+"""
+
+import os
+import sys
+import importlib.util
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from index_advisor import DEFAULT_SOURCES, QueryPlan, advise, collect_queries, explain, schema_connection
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rollup query -> the covering index its plan should read
+EXPECTED_INDEXES = {
+    'user_segments': 'ix_users_engagement_rollup',
+    'churn_prediction': 'ix_users_churn_rollup',
+    'referral_insights': 'ix_users_referral_rollup',
+    'user_journey': 'ix_users_journey_rollup',
+    'content_preferences': 'ix_users_content_rollup',
+    'communication_preferences': 'ix_users_communication_rollup',
+    'churn_by_plan': 'ix_users_plan_rollup',
+    'referral_sources': 'ix_users_referral_rollup',
+    'revenue_by_plan': 'ix_users_plan_rollup'
+}
+
+def load_migration():
+    path = os.path.join(SERVER_DIR, 'migrations', 'versions', '3f2a9c1d7b4e_add_users_rollup_indexes.py')
+    spec = importlib.util.spec_from_file_location('rollup_indexes_migration', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope='module')
+def results():
+    return {query.function: query for query in advise(DEFAULT_SOURCES)}
+
+def test_advisor_finds_no_full_scans_with_the_model_indexes(results):
+    assert set(EXPECTED_INDEXES) <= set(results)
+    assert [query.function for query in results.values() if query.status != 'OK'] == []
+
+@pytest.mark.parametrize('function, index', sorted(EXPECTED_INDEXES.items()))
+def test_rollup_queries_read_their_covering_index(results, function, index):
+    assert any(f'USING COVERING INDEX {index}' in step for step in results[function].plan), results[function].plan
+
+def test_advisor_reports_full_scans_without_the_indexes(results):
+    connection = schema_connection()
+    for index in load_migration().ROLLUP_INDEXES:
+        connection.execute(f"DROP INDEX {index}")
+    try:
+        query = results['churn_by_plan']
+        plan = explain(connection, QueryPlan(query.source, query.line, query.function, query.sql))
+    finally:
+        connection.close()
+    assert plan.status == 'SCAN'
+    assert plan.full_scans == ['SCAN users']
+
+def test_migration_matches_the_model_indexes():
+    from app.models import User as AppUser
+    from database.models import User
+
+    for model in (AppUser, User):
+        model_indexes = {index.name: [column.name for column in index.columns] for index in model.__table__.indexes}
+        for name, columns in load_migration().ROLLUP_INDEXES.items():
+            assert model_indexes[name] == columns
+
+def test_collect_queries_reads_text_and_registered_sql(tmp_path):
+    source = tmp_path / 'queries.py'
+    source.write_text(
+        "def churn():\n"
+        "    return text('SELECT plan FROM users WHERE churn_risk > :risk')\n"
+        "registry.register('by_plan', 'SELECT plan, COUNT(*) FROM users {filters} GROUP BY plan')\n"
+        "text('DELETE FROM users')\n"
+    )
+    queries = collect_queries(str(source))
+    assert [(query.function, query.sql) for query in queries] == [
+        ('churn', 'SELECT plan FROM users WHERE churn_risk > :risk'),
+        ('by_plan', 'SELECT plan, COUNT(*) FROM users GROUP BY plan')
+    ]
+
+    connection = schema_connection()
+    try:
+        errored = explain(connection, QueryPlan('queries.py', 1, 'bad', 'SELECT missing FROM users'))
+    finally:
+        connection.close()
+    assert errored.status == 'ERROR'
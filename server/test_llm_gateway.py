@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM gateway using the offline stub backend
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_gateway import (
+    LLMGateway, RateLimiter, ResponseCache, StubBackend, compact_sections, estimate_tokens
+)
+
+def conversation(prompt):
+    return [{'role': 'system', 'content': 'You are a marketer.'}, {'role': 'user', 'content': prompt}]
+
+class RecordingBackend(StubBackend):
+    """Stub that records calls and finishes earlier prompts last"""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def complete(self, messages, model, max_tokens, temperature):
+        self.prompts.append(messages[-1]['content'])
+        time.sleep(0.05 / int(messages[-1]['content'].split()[-1]))
+        return super().complete(messages, model, max_tokens, temperature)
+
+def test_stub_backend_is_deterministic():
+    backend = StubBackend()
+    first = backend.complete(conversation('Grow  revenue\nfor pro users'), 'gpt-4-turbo', 1500, 0.7)
+
+    assert StubBackend().complete(conversation('Grow  revenue\nfor pro users'), 'gpt-4-turbo', 1500, 0.7) == first
+    assert first.splitlines()[0] == '[stub:gpt-4-turbo] Strategy for: Grow  revenue'
+    assert len(first.splitlines()) == 1 + len(StubBackend.SECTIONS)
+    assert backend.complete(conversation('Reduce churn'), 'gpt-4-turbo', 1500, 0.7) != first
+    assert len(backend.complete(conversation('Reduce churn'), 'gpt-4-turbo', 5, 0.7)) == 20
+
+def test_response_cache_hits_and_misses_on_disk(tmp_path):
+    gateway = LLMGateway(StubBackend(), cache_dir=str(tmp_path), rate_per_second=0)
+    answer = gateway.complete(conversation('Reduce churn'))
+
+    assert gateway.complete(conversation('Reduce churn')) == answer
+    gateway.complete(conversation('Reduce churn'), temperature=0.2)
+    assert (gateway.stats['calls'], gateway.stats['cache_hits']) == (2, 1)
+    assert len(list(tmp_path.glob('*.json'))) == 2
+
+    # A fresh gateway reads the same files
+    reopened = LLMGateway(StubBackend(), cache_dir=str(tmp_path), rate_per_second=0)
+    assert reopened.complete(conversation('Reduce churn')) == answer
+    assert reopened.stats['calls'] == 0
+
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get('missing') is None
+    (tmp_path / 'torn.json').write_text('{"content": ')
+    assert cache.get('torn') is None
+
+def test_compact_sections_fits_the_token_budget():
+    sections = [
+        ('Goal', 'Grow revenue for pro users'),
+        ('Segments', '\n'.join(f'    segment {i}: churn {i / 10:.1f}   ' for i in range(40))),
+        ('Appendix', '\n\n'.join(f'note {i}' for i in range(40)))
+    ]
+    full = compact_sections(sections, 100000)
+    assert full.startswith('Goal:\nGrow revenue for pro users\n\nSegments:\nsegment 0: churn 0.0\n')
+    assert '\n\n\n' not in full
+
+    budget = estimate_tokens(full) // 3
+    trimmed = compact_sections(sections, budget)
+    assert estimate_tokens(trimmed) <= budget
+    # The least important section goes first; the leading section survives
+    assert 'Appendix' not in trimmed
+    assert trimmed.startswith('Goal:\nGrow revenue for pro users')
+    assert 'segment 0: churn 0.0' in trimmed
+
+    assert len(compact_sections([('Goal', 'x' * 1000)], 10)) <= 10 * 4
+
+def test_rate_limiter_paces_calls_after_the_burst():
+    limiter = RateLimiter(rate=20, burst=2)
+    started = time.monotonic()
+    waits = [limiter.acquire() for _ in range(5)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert all(wait > 0 for wait in waits[2:])
+    # Three calls beyond the burst at 20 per second
+    assert time.monotonic() - started >= 0.14
+    assert RateLimiter(rate=0).acquire() == 0.0
+
+def test_complete_many_keeps_input_order():
+    backend = RecordingBackend()
+    gateway = LLMGateway(backend, cache_dir=None, max_concurrency=4, rate_per_second=0)
+    conversations = [conversation(f'prompt {i}') for i in range(1, 7)]
+
+    results = gateway.complete_many(conversations)
+    assert results == [StubBackend().complete(messages, 'gpt-4-turbo', 1500, 0.7) for messages in conversations]
+    assert sorted(backend.prompts) == sorted(f'prompt {i}' for i in range(1, 7))
+
+def test_gateway_from_env_selects_the_stub(monkeypatch, tmp_path):
+    from llm_gateway import gateway_from_env
+
+    monkeypatch.setenv('LLM_BACKEND', 'stub')
+    monkeypatch.setenv('LLM_CACHE_DIR', str(tmp_path))
+    assert isinstance(gateway_from_env().backend, StubBackend)
+
+    monkeypatch.setenv('LLM_BACKEND', 'nope')
+    with pytest.raises(ValueError):
+        gateway_from_env()
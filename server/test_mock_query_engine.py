@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the mock warehouse columnar tables and SELECT engine
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.mock_query_engine import ColumnarTable, QueryEngine, QueryError
+
+USERS = [
+    {'id': 1, 'name': 'ada', 'plan': 'pro', 'ltv': 120.0, 'country': 'NO'},
+    {'id': 2, 'name': 'bob', 'plan': 'basic', 'ltv': 15.5, 'country': 'SE'},
+    {'id': 3, 'name': 'cy', 'plan': 'pro', 'ltv': 80.0, 'country': 'NO'},
+    {'id': 4, 'name': 'dee', 'plan': 'enterprise', 'ltv': 900.0, 'country': None},
+    {'id': 5, 'name': 'eve', 'plan': 'basic', 'ltv': None, 'country': 'DK'},
+]
+
+@pytest.fixture
+def engine():
+    return QueryEngine({'users': ColumnarTable(USERS)})
+
+def ids(rows):
+    return [row['id'] for row in rows]
+
+def test_select_with_aliases_and_qualified_names(engine):
+    rows = engine.execute("SELECT u.id AS user_id, name handle FROM analytics.users u WHERE u.id = 2")
+    assert rows == [{'user_id': 2, 'handle': 'bob'}]
+
+def test_group_by_with_aggregates(engine):
+    rows = engine.execute(
+        "SELECT plan, COUNT(*) AS users, SUM(ltv) AS total, AVG(ltv), MAX(ltv), COUNT(DISTINCT country) "
+        "FROM users GROUP BY plan ORDER BY plan"
+    )
+    assert [row['plan'] for row in rows] == ['basic', 'enterprise', 'pro']
+    basic = rows[0]
+    assert basic['users'] == 2
+    # NULL ltv is skipped by SUM/AVG
+    assert basic['total'] == 15.5
+    assert basic['avg(ltv)'] == 15.5
+    assert rows[2]['max(ltv)'] == 120.0
+    assert rows[2]['count(distinct country)'] == 1
+
+def test_aggregate_without_group_by_over_no_rows(engine):
+    assert engine.execute("SELECT COUNT(*) AS n, SUM(ltv) AS total FROM users WHERE id > 99") == [{'n': 0, 'total': None}]
+
+def test_order_by_alias_aggregate_and_position(engine):
+    by_alias = engine.execute("SELECT plan, COUNT(*) AS users FROM users GROUP BY plan ORDER BY users DESC, plan")
+    assert [(row['plan'], row['users']) for row in by_alias] == [('basic', 2), ('pro', 2), ('enterprise', 1)]
+
+    by_aggregate = engine.execute("SELECT plan, SUM(ltv) AS total FROM users GROUP BY plan ORDER BY SUM(ltv) DESC")
+    assert [row['plan'] for row in by_aggregate] == ['enterprise', 'pro', 'basic']
+
+    by_position = engine.execute("SELECT name, ltv FROM users ORDER BY 2 DESC")
+    # NULLs sort first ascending, so last descending
+    assert [row['name'] for row in by_position] == ['dee', 'ada', 'cy', 'bob', 'eve']
+
+def test_where_in_between_like_and_null(engine):
+    assert ids(engine.execute("SELECT id FROM users WHERE plan IN ('pro', 'enterprise') ORDER BY id")) == [1, 3, 4]
+    assert ids(engine.execute("SELECT id FROM users WHERE plan NOT IN ('pro') ORDER BY id")) == [2, 4, 5]
+    assert ids(engine.execute("SELECT id FROM users WHERE ltv BETWEEN 15.5 AND 120 ORDER BY id")) == [1, 2, 3]
+    assert ids(engine.execute("SELECT id FROM users WHERE ltv NOT BETWEEN 15.5 AND 120")) == [4]
+    assert ids(engine.execute("SELECT id FROM users WHERE name LIKE '_e%' ORDER BY id")) == [4]
+    assert ids(engine.execute("SELECT id FROM users WHERE name ILIKE 'A%'")) == [1]
+    assert ids(engine.execute("SELECT id FROM users WHERE country IS NULL OR ltv IS NULL ORDER BY id")) == [4, 5]
+    assert ids(engine.execute("SELECT id FROM users WHERE NOT (plan = 'pro' AND country = 'NO') ORDER BY id")) == [2, 4, 5]
+
+def test_distinct(engine):
+    rows = engine.execute("SELECT DISTINCT plan FROM users ORDER BY plan")
+    assert rows == [{'plan': 'basic'}, {'plan': 'enterprise'}, {'plan': 'pro'}]
+
+def test_named_positional_and_pyformat_params(engine):
+    assert ids(engine.execute("SELECT id FROM users WHERE plan = :plan AND ltv > :floor", {'plan': 'pro', 'floor': 100})) == [1]
+    assert ids(engine.execute("SELECT id FROM users WHERE id IN (?, ?) ORDER BY id", [4, 2])) == [2, 4]
+    assert ids(engine.execute("SELECT id FROM users WHERE name = %(name)s", {'name': 'cy'})) == [3]
+    with pytest.raises(QueryError):
+        engine.execute("SELECT id FROM users WHERE id = :missing", {})
+
+def test_limit_and_offset(engine):
+    assert ids(engine.execute("SELECT id FROM users LIMIT 2")) == [1, 2]
+    assert ids(engine.execute("SELECT id FROM users ORDER BY id DESC LIMIT 2 OFFSET 1")) == [4, 3]
+    assert ids(engine.execute("SELECT id FROM users ORDER BY id LIMIT 3, 5")) == [4, 5]
+    assert engine.execute("SELECT id FROM users LIMIT 0") == []
+
+def test_unknown_table_and_bad_sql(engine):
+    assert engine.execute("SELECT * FROM nowhere") == []
+    with pytest.raises(QueryError):
+        engine.execute("SELECT id FROM users WHERE")
+    with pytest.raises(QueryError):
+        engine.execute("SELECT * FROM users GROUP BY plan")
+
+@pytest.mark.parametrize('indexed', [False, True])
+def test_equality_distinguishes_booleans_from_numbers(indexed):
+    table = ColumnarTable([{'id': 1, 'flag': 1}, {'id': 2, 'flag': 1.0}, {'id': 3, 'flag': True}, {'id': 4, 'flag': '1'}])
+    if indexed:
+        assert table.index_for('flag') is not None
+    engine = QueryEngine({'flags': table})
+
+    assert ids(engine.execute("SELECT id FROM flags WHERE flag = 1 ORDER BY id")) == [1, 2]
+    assert ids(engine.execute("SELECT id FROM flags WHERE flag = TRUE")) == [3]
+    assert ids(engine.execute("SELECT id FROM flags WHERE flag = '1'")) == [4]
+    assert ids(engine.execute("SELECT id FROM flags WHERE flag IN (TRUE, '1') ORDER BY id")) == [3, 4]
+    assert len(engine.execute("SELECT flag, COUNT(*) FROM flags GROUP BY flag")) == 3
+
+def test_index_follows_appends_and_drops_for_unhashable_values():
+    table = ColumnarTable([{'id': 1, 'tag': 'a'}])
+    engine = QueryEngine({'items': table})
+    assert ids(engine.execute("SELECT id FROM items WHERE tag = 'a'")) == [1]
+
+    table.append({'id': 2, 'tag': 'a'})
+    assert ids(engine.execute("SELECT id FROM items WHERE tag = 'a' ORDER BY id")) == [1, 2]
+
+    table.append({'id': 3, 'tag': ['a']})
+    assert table.index_for('tag') is None
+    assert ids(engine.execute("SELECT id FROM items WHERE tag = 'a' ORDER BY id")) == [1, 2]
+    # Columns added later read as NULL for earlier rows
+    table.append({'id': 4, 'tag': 'b', 'extra': 1})
+    assert table[0]['extra'] is None
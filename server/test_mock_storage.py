@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the mock warehouse write-behind storage
+"""
+
+import os
+import sys
+import json
+import shutil
+import threading
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.mock_storage import AppendOnlyTableStore, LOG_HEADER_KEY
+from database.mock_warehouse import MockWarehouseAdapter
+
+def open_adapter(data_path, **config):
+    return MockWarehouseAdapter({'MOCK_WAREHOUSE_DATA_PATH': str(data_path), **config})
+
+def row_names(adapter, table_name='events'):
+    return sorted(row['name'] for row in adapter.tables[table_name].to_rows())
+
+def writer_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'mock-warehouse-writer']
+
+def test_buffered_rows_survive_reload(tmp_path):
+    adapter = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=60)
+    adapter.insert_data('events', [{'name': 'a'}, {'name': 'b'}])
+    adapter.close()
+
+    with open(tmp_path / 'events.jsonl') as f:
+        assert json.loads(f.readline()) == {LOG_HEADER_KEY: 0}
+
+    reopened = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)
+    assert row_names(reopened) == ['a', 'b']
+
+def test_adapters_share_one_writer_thread(tmp_path):
+    adapters = [open_adapter(tmp_path / str(i), MOCK_WAREHOUSE_FLUSH_INTERVAL=60) for i in range(3)]
+    try:
+        assert len(writer_threads()) == 1
+    finally:
+        for adapter in adapters:
+            adapter.close()
+
+def test_interrupted_compaction_does_not_duplicate_rows(tmp_path):
+    adapter = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)
+    adapter.insert_data('events', [{'name': 'a'}, {'name': 'b'}])
+    log_copy = tmp_path / 'events.jsonl.copy'
+    shutil.copy(tmp_path / 'events.jsonl', log_copy)
+
+    adapter.store.compact('events', adapter.tables['events'].to_rows)
+    # Crash between replacing the snapshot and removing the log
+    shutil.move(log_copy, tmp_path / 'events.jsonl')
+
+    reopened = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)
+    assert row_names(reopened) == ['a', 'b']
+    assert not os.path.exists(tmp_path / 'events.jsonl')
+
+    # The next generation's log is replayed as usual
+    reopened.insert_data('events', [{'name': 'c'}])
+    assert row_names(open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)) == ['a', 'b', 'c']
+
+def test_legacy_snapshot_and_log_are_replayed(tmp_path):
+    with open(tmp_path / 'events.json', 'w') as f:
+        json.dump([{'name': 'a'}], f)
+    with open(tmp_path / 'events.jsonl', 'w') as f:
+        f.write(json.dumps({'name': 'b'}) + '\n')
+
+    adapter = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)
+    assert row_names(adapter) == ['a', 'b']
+
+def test_threshold_compaction_folds_log_into_snapshot(tmp_path):
+    store = AppendOnlyTableStore(str(tmp_path), flush_interval=0, compact_threshold=3)
+    rows = []
+    for name in 'abcd':
+        store.append('events', [{'name': name}], apply=rows.extend)
+        if store.needs_compaction('events'):
+            store.request_compaction('events', lambda: list(rows))
+
+    with open(tmp_path / 'events.json') as f:
+        snapshot = json.load(f)
+    assert snapshot['log_generation'] == 0
+    assert [row['name'] for row in snapshot['rows']] == ['a', 'b', 'c']
+    assert store.load_log('events') == [{'name': 'd'}]
+    assert store.get_stats() == {'appended_rows': 4, 'flushes': 4, 'compactions': 1}
+
+def test_dataset_tables_keep_their_rows_across_reloads(tmp_path):
+    dataset = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_warehouse', 'data', 'sample_data.json')
+    shutil.copy(dataset, tmp_path / 'sample_data.json')
+    with open(dataset) as f:
+        dataset_emails = sorted(row['email'] for row in json.load(f)['users'])
+
+    def user_emails(adapter):
+        return sorted(row['email'] for row in adapter.tables['users'].to_rows())
+
+    adapter = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)
+    adapter.insert_data('users', [{'email': 'new@example.com'}])
+    assert user_emails(adapter) == sorted(dataset_emails + ['new@example.com'])
+
+    reopened = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)
+    assert user_emails(reopened) == sorted(dataset_emails + ['new@example.com'])
+    assert len(reopened.tables['campaigns']) == 2
+
+    # After compaction the snapshot holds the dataset rows too
+    reopened.store.compact('users', reopened.tables['users'].to_rows)
+    reopened.insert_data('users', [{'email': 'newer@example.com'}])
+    final = open_adapter(tmp_path, MOCK_WAREHOUSE_FLUSH_INTERVAL=0)
+    assert user_emails(final) == sorted(dataset_emails + ['new@example.com', 'newer@example.com'])
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled query pattern index used by SigmaAIService
+"""
+
+import os
+import sys
+import random
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sigma_ai_service import (
+    PERFORMANCE_GROUP, PERFORMANCE_PATTERNS, QueryPatternIndex, SigmaAIService, SuggestionType
+)
+
+@pytest.fixture(scope='module')
+def service():
+    return SigmaAIService()
+
+def test_overlapping_and_prefix_hits_are_all_reported():
+    index = QueryPatternIndex({'model': ['table structure', 'columns'], 'entry': ['table', 'able']})
+    matches = index.scan('Table Structure with columns')
+
+    assert matches.positions == {
+        'model': [(0, 'table structure'), (21, 'columns')],
+        'entry': [(0, 'table'), (1, 'able')]
+    }
+    assert matches.weights() == {'model': 0.5, 'entry': 0.5}
+    assert index.scan('nothing here').positions == {}
+    assert index.scan('').weights() == {}
+
+def test_groups_match_per_pattern_substring_checks(service):
+    groups = {**service.suggestion_patterns, PERFORMANCE_GROUP: PERFORMANCE_PATTERNS}
+    words = sorted({word for patterns in groups.values() for pattern in patterns for word in pattern.split()})
+    rng = random.Random(7)
+
+    for _ in range(300):
+        query = ' '.join(rng.choice(words + ['the', 'my', 'x']) for _ in range(rng.randint(0, 8)))
+        expected = [group for group, patterns in groups.items() if any(pattern in query for pattern in patterns)]
+        assert list(service.pattern_index.scan(query).positions) == expected, query
+
+def test_detected_types_follow_pattern_groups(service):
+    detected = service._detect_query_types('Build a DASHBOARD with a filter on the schema')
+    assert detected == [
+        SuggestionType.VISUALIZATION, SuggestionType.DATA_MODEL, SuggestionType.FILTER, SuggestionType.BEST_PRACTICE
+    ]
+    assert service._detect_query_types('hello') == [SuggestionType.BEST_PRACTICE]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the named, prebuilt route query registry
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.query_registry import QueryRegistry
+
+@pytest.fixture
+def registry(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'registry.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name VARCHAR(20))"))
+        for item_id in range(1, 11):
+            connection.execute(text("INSERT INTO items VALUES (:id, :name)"), {'id': item_id, 'name': f'item{item_id}'})
+    session = scoped_session(sessionmaker(bind=engine))
+    yield QueryRegistry(SimpleNamespace(session=session))
+    session.remove()
+    engine.dispose()
+
+def test_variants_are_prebuilt_and_timed_separately(registry):
+    registry.register('items_after', "SELECT id FROM items WHERE id > :after {filters} ORDER BY id",
+                      label={'exact': "name = :name"})
+
+    assert [row.id for row in registry.execute('items_after', {'after': 8})] == [9, 10]
+    assert [row.id for row in registry.execute('items_after', {'after': 0, 'name': 'item3'}, label='exact')] == [3]
+    assert registry.statement('items_after', label='exact') is registry.statement('items_after', label='exact')
+
+    stats = registry.get_stats()['items_after']
+    assert stats['calls'] == 2
+    assert set(stats['variants']) == {'base', 'label=exact'}
+
+def test_registering_the_same_name_twice(registry):
+    registry.register('all_items', "SELECT id FROM items")
+    registry.register('all_items', "SELECT  id\n FROM items")
+    assert registry.names() == ['all_items']
+    with pytest.raises(ValueError):
+        registry.register('all_items', "SELECT name FROM items")
+
+def test_streamed_fetch_time_is_recorded(registry):
+    registry.register('all_items', "SELECT id FROM items ORDER BY id")
+    result = registry.execute('all_items', execution_options={'stream_results': True, 'yield_per': 3})
+    batches = list(registry.timed_batches('all_items', result.partitions(3)))
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    stats = registry.get_stats()['all_items']
+    assert stats['calls'] == 1
+    assert stats['fetch_ms'] > 0
+    assert stats['variants']['base']['fetch_ms'] == stats['fetch_ms']
+
+def test_analytics_service_uses_the_app_registry(tmp_path):
+    from config import TestingConfig
+    from app import create_app, db
+    from app.services.analytics_service import AnalyticsService
+
+    class AnalyticsTestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'analytics.db'}"
+        MOCK_WAREHOUSE_DATA_PATH = str(tmp_path / 'mock_warehouse')
+
+    app = create_app(AnalyticsTestConfig)
+    with app.app_context():
+        db.create_all()
+        route_queries = set(app.query_registry.names())
+        service = AnalyticsService()
+        AnalyticsService()
+
+        assert service.queries is app.query_registry
+        assert set(app.query_registry.names()) - route_queries == {'churn_by_plan', 'referral_sources', 'revenue_by_plan'}
+        assert service.get_user_journey() == []
+        assert service.get_personalization_data() == {'content_preferences': [], 'communication_preferences': []}
+        assert service.get_churn_prediction()['total_high_risk'] == 0
+        assert service.get_revenue_forecast()['total_revenue'] == 0
+        assert app.query_registry.get_stats()['user_journey']['calls'] == 1
+        db.session.remove()
+        db.engine.dispose()
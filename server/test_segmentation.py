@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized customer segmentation
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_gateway import LLMGateway, StubBackend
+from predictive_marketing import UserInsightGenerator
+from segmentation import SEGMENT_WEIGHTS, build_segment_profiles, min_max_normalize, mini_batch_kmeans
+
+FEATURES = list(SEGMENT_WEIGHTS)
+MEAN_COLUMNS = ['age', 'lifetime_value', 'total_sessions', 'engagement_composite']
+MODE_COLUMNS = ['plan', 'preferred_content_type', 'communication_preference']
+
+@pytest.fixture
+def users_df():
+    rng = np.random.default_rng(0)
+    n = 500
+    users = pd.DataFrame({
+        'age': rng.integers(18, 70, n).astype(float),
+        'total_sessions': rng.poisson(40, n).astype(float),
+        'avg_visit_time': rng.gamma(2.0, 5.0, n),
+        'lifetime_value': rng.gamma(2.0, 300.0, n),
+        'engagement_score': rng.random(n),
+        'churn_risk': rng.random(n),
+        'referral_count': rng.integers(0, 10, n),
+        'email_open_rate': rng.random(n),
+        'email_click_rate': rng.random(n) / 2,
+        'plan': rng.choice(['free', 'basic', 'pro', 'enterprise'], n),
+        'preferred_content_type': rng.choice(['video', 'blog', 'webinar'], n),
+        'communication_preference': rng.choice(['email', 'sms', 'push'], n)
+    })
+    # A few missing values exercise the NaN path
+    users.loc[[3, 70], 'age'] = np.nan
+    return users
+
+def make_generator(users_df):
+    gateway = LLMGateway(StubBackend(), cache_dir=None, rate_per_second=0)
+    return UserInsightGenerator(users_df, gateway=gateway).derive_advanced_metrics()
+
+def apply_based_segments(users_df):
+    """The original row-by-row segmentation"""
+    def normalize(series):
+        return (series - series.min()) / (series.max() - series.min())
+
+    def assign_segment(row):
+        score = sum(row[feature] * weight for feature, weight in SEGMENT_WEIGHTS.items())
+        if score < 0.2:
+            return 0
+        elif score < 0.4:
+            return 1
+        elif score < 0.6:
+            return 2
+        elif score < 0.8:
+            return 3
+        return 4
+
+    return users_df[FEATURES].apply(normalize).apply(assign_segment, axis=1)
+
+def test_score_segments_match_the_apply_based_scoring(users_df):
+    generator = make_generator(users_df)
+    expected = apply_based_segments(generator.users_df)
+    profiles = generator.perform_custom_segmentation()
+
+    assert (generator.users_df['customer_segment'].to_numpy() == expected.to_numpy()).all()
+    expected_profiles = generator.users_df.assign(customer_segment=expected).groupby('customer_segment').agg({
+        **{column: 'mean' for column in MEAN_COLUMNS},
+        **{column: (lambda x: x.value_counts().index[0]) for column in MODE_COLUMNS}
+    })
+    pd.testing.assert_frame_equal(profiles, expected_profiles, check_dtype=False, check_index_type=False)
+
+def test_constant_columns_scale_to_zero():
+    normalized = min_max_normalize(np.array([[1.0, 5.0], [3.0, 5.0], [np.nan, 5.0]]))
+    assert normalized[:, 0][:2].tolist() == [0.0, 1.0]
+    assert np.isnan(normalized[2, 0])
+    # The original divided by zero here, so every row's score became NaN
+    assert normalized[:, 1].tolist() == [0.0, 0.0, 0.0]
+
+def test_kmeans_finds_separated_clusters():
+    rng = np.random.default_rng(1)
+    centers = np.array([[0.1, 0.1], [0.5, 0.9], [0.9, 0.2]])
+    labels = np.repeat(np.arange(3), 200)
+    matrix = centers[labels] + rng.normal(0, 0.02, (600, 2))
+
+    result = mini_batch_kmeans(matrix, 3, batch_size=128)
+    found = result['labels']
+    # Each true cluster maps onto exactly one found cluster
+    assert all(len(set(found[labels == cluster])) == 1 for cluster in range(3))
+    assert len(set(found)) == 3
+    assert np.abs(np.sort(result['centers'], axis=0) - np.sort(centers, axis=0)).max() < 0.05
+    assert (mini_batch_kmeans(matrix, 3, batch_size=128)['labels'] == found).all()
+    assert mini_batch_kmeans(np.empty((0, 2)), 3)['labels'].size == 0
+
+def test_kmeans_mode_numbers_segments_by_score(users_df):
+    generator = make_generator(users_df)
+    profiles = generator.perform_custom_segmentation(method='kmeans', n_segments=4)
+    segments = generator.users_df['customer_segment']
+
+    assert sorted(segments.unique()) == [0, 1, 2, 3]
+    assert list(profiles.index) == [0, 1, 2, 3]
+    assert list(profiles.columns) == MEAN_COLUMNS + MODE_COLUMNS
+    normalized = np.nan_to_num(min_max_normalize(generator.users_df[FEATURES].to_numpy(dtype=np.float64)))
+    scores = normalized @ np.array(list(SEGMENT_WEIGHTS.values()))
+    mean_scores = [scores[segments.to_numpy() == segment].mean() for segment in range(4)]
+    assert mean_scores == sorted(mean_scores)
+
+    with pytest.raises(ValueError):
+        generator.perform_custom_segmentation(method='nope')
+
+def test_profiles_skip_empty_segments():
+    users = pd.DataFrame({'value': [1.0, 3.0, 10.0], 'kind': ['a', 'a', 'b']})
+    profiles = build_segment_profiles(users, np.array([0, 0, 2]), ['value'], ['kind'])
+    assert list(profiles.index) == [0, 2]
+    assert profiles['value'].tolist() == [2.0, 10.0]
+    assert profiles['kind'].tolist() == ['a', 'b']
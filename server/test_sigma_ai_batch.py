@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the Sigma AI batch suggestions endpoint
+"""
+
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+from flask import Flask
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app.routes.sigma_ai as sigma_ai_routes
+from sigma_ai_service import SigmaAIService
+
+ERROR_TITLE = 'Error in Suggestion Generation'
+
+@pytest.fixture
+def service(monkeypatch):
+    service = SigmaAIService()
+    compute = service._compute_workbook_suggestions
+    service.computed = []
+
+    async def slow_first(query, *args):
+        service.computed.append(query)
+        if 'boom' in query:
+            raise RuntimeError('generator down')
+        # Earlier queries finish later, so completion order differs from input order
+        await asyncio.sleep(0.05 if 'dashboard' in query else 0)
+        return await compute(query, *args)
+
+    service._compute_workbook_suggestions = slow_first
+    monkeypatch.setattr(sigma_ai_routes, 'sigma_ai_service', service)
+    return service
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    sigma_ai_routes.init_app(app)
+    return app.test_client()
+
+def titles(suggestions, ids):
+    by_id = {suggestion['id']: suggestion['title'] for suggestion in suggestions}
+    return [by_id[suggestion_id] for suggestion_id in ids]
+
+def test_results_follow_input_order_with_per_item_errors(client, service):
+    queries = ['Build a dashboard', 'boom', {'query': 'Add a filter', 'context': {'team': 'ops'}}, 'build a  DASHBOARD']
+    response = client.post('/api/sigma-ai/suggestions/batch', json={'queries': queries})
+    assert response.status_code == 200
+    body = response.get_json()
+
+    assert [result['index'] for result in body['results']] == [0, 1, 2, 3]
+    assert [result['query'] for result in body['results']] == ['Build a dashboard', 'boom', 'Add a filter', 'build a  DASHBOARD']
+    # The failing query gets an error suggestion; the others are unaffected
+    assert titles(body['suggestions'], body['results'][1]['suggestion_ids']) == [ERROR_TITLE]
+    assert ERROR_TITLE not in titles(body['suggestions'], body['results'][0]['suggestion_ids'])
+    assert ERROR_TITLE not in titles(body['suggestions'], body['results'][2]['suggestion_ids'])
+    # Identical normalized queries are generated once and share their answer
+    assert body['results'][3]['suggestion_ids'] == body['results'][0]['suggestion_ids']
+    assert sorted(service.computed) == ['Add a filter', 'Build a dashboard', 'boom']
+    # Shared suggestions are sent once
+    ids = [suggestion['id'] for suggestion in body['suggestions']]
+    assert len(ids) == len(set(ids)) == body['metadata']['total_suggestions']
+
+def test_streamed_lines_arrive_as_queries_finish(client, service):
+    response = client.post('/api/sigma-ai/suggestions/batch?format=ndjson',
+                           json={'queries': ['Build a dashboard', 'Add a filter', 'boom']})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert sorted(line['index'] for line in lines) == [0, 1, 2]
+    # The slow dashboard query finishes last
+    assert lines[-1]['index'] == 0
+    sent = [suggestion['id'] for line in lines for suggestion in line['suggestions']]
+    assert len(sent) == len(set(sent))
+    assert all(set(line['suggestion_ids']) <= set(sent) for line in lines)
+
+@pytest.mark.parametrize('payload', [
+    {},
+    {'queries': []},
+    {'queries': 'Build a dashboard'},
+    {'queries': ['ok', '  ']},
+    {'queries': [{'context': {}}]},
+    {'queries': ['q'] * (sigma_ai_routes.MAX_BATCH_QUERIES + 1)}
+])
+def test_invalid_batches_are_rejected(client, service, payload):
+    response = client.post('/api/sigma-ai/suggestions/batch', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert service.computed == []
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for background Sigma workbook exports
+"""
+
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sigma_api_client import SigmaCredentials
+from services.sigma_export_jobs import COMPLETED, ExportJobManager
+
+class FakeExportClient:
+    credentials = SigmaCredentials('client', 'secret', 'https://sigma.invalid', 'AWS-US (West)')
+
+    def __init__(self):
+        self.exports = []
+
+    def export_workbook(self, workbook_id, export_format='csv', oauth_overrides=None, reject_default_tokens=False):
+        self.exports.append((workbook_id, export_format))
+        return {'queryId': f'query-{workbook_id}'}
+
+    def fetch_export(self, query_id, destination):
+        with open(destination, 'w') as f:
+            f.write('id\n1\n')
+        return 4
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ExportJobManager(output_dir=str(tmp_path / 'exports'), max_workers=1)
+    yield manager
+    manager.shutdown()
+
+def test_export_is_written_under_job_id(manager, tmp_path):
+    client = FakeExportClient()
+    job = manager.submit(client, 'workbook-1', 'csv')
+    manager._executor.submit(lambda: None).result(timeout=5)
+
+    assert job.status == COMPLETED
+    assert job.file_path == os.path.join(str(tmp_path / 'exports'), f'{job.id}.csv')
+    assert job.filename == 'workbook-1.csv'
+    assert job.mimetype == 'text/csv'
+
+@pytest.mark.parametrize('export_format', ['../../etc/passwd', 'exe', ''])
+def test_unknown_export_format_is_rejected(manager, export_format):
+    client = FakeExportClient()
+    with pytest.raises(ValueError):
+        manager.submit(client, 'workbook-1', export_format)
+    assert manager.list_jobs() == []
+    assert client.exports == []
+
+def test_export_route_rejects_unknown_format_with_400():
+    from routes.sigma_api import sigma_api
+
+    app = Flask(__name__)
+    app.register_blueprint(sigma_api)
+    response = app.test_client().post('/api/sigma/workbooks/workbook-1/export', json={'format': '../x'})
+
+    assert response.status_code == 400
+    assert 'csv' in response.get_json()['supported_formats']
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent paging over Sigma list endpoints
+"""
+
+import os
+import sys
+import threading
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sigma_pagination import MAX_PAGE_SIZE, iter_page_batches, iter_pages, page_count
+
+class FakeListEndpoint:
+    def __init__(self, total, report='pages', entries_key='data'):
+        self.items = [{'id': item_id} for item_id in range(1, total + 1)]
+        self.report = report
+        self.entries_key = entries_key
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def __call__(self, page, size):
+        with self._lock:
+            self.requested.append((page, size))
+        body = {self.entries_key: self.items[(page - 1) * size:page * size]}
+        if self.report == 'pages':
+            body['pages'] = -(-len(self.items) // size)
+        elif self.report == 'total':
+            body['total'] = len(self.items)
+        return body
+
+def item_ids(items):
+    return sorted(item['id'] for item in items)
+
+def test_page_count_from_pages_or_total():
+    assert page_count({'pages': 3}, 10) == 3
+    assert page_count({'total': 21}, 10) == 3
+    assert page_count({'data': []}, 10) is None
+
+def test_reported_page_count_fetches_each_page_once():
+    endpoint = FakeListEndpoint(23, report='total')
+    assert item_ids(iter_pages(endpoint, size=5, max_workers=3)) == list(range(1, 24))
+    assert sorted(page for page, _ in endpoint.requested) == [1, 2, 3, 4, 5]
+
+def test_unreported_page_count_stops_at_the_first_short_page():
+    endpoint = FakeListEndpoint(12, report=None, entries_key='entries')
+    assert item_ids(iter_pages(endpoint, size=5, max_workers=2)) == list(range(1, 13))
+    # Page 3 is short; at most one window of speculative pages goes past it
+    assert max(page for page, _ in endpoint.requested) <= 4
+
+def test_single_short_page_needs_no_more_requests():
+    endpoint = FakeListEndpoint(3, report=None)
+    assert list(iter_page_batches(endpoint, size=5)) == [[{'id': 1}, {'id': 2}, {'id': 3}]]
+    assert endpoint.requested == [(1, 5)]
+
+def test_items_shifted_across_pages_are_yielded_once():
+    pages = {1: [{'id': 1}, {'id': 2}], 2: [{'id': 2}, {'id': 3}], 3: [{'id': 4}]}
+
+    def fetch_page(page, size):
+        return {'data': pages[page], 'pages': 3}
+
+    assert item_ids(iter_pages(fetch_page, size=2)) == [1, 2, 3, 4]
+
+def test_page_size_is_clamped():
+    endpoint = FakeListEndpoint(0)
+    list(iter_pages(endpoint, size=MAX_PAGE_SIZE * 10))
+    assert endpoint.requested == [(1, MAX_PAGE_SIZE)]
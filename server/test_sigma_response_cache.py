@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the Sigma API GET response cache
+"""
+
+import os
+import sys
+import json
+import time
+
+import requests
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sigma_api_client import SigmaAPIClient, SigmaCredentials
+from services.sigma_response_cache import SigmaResponseCache
+
+def make_response(status_code, body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode() if body is not None else b''
+    response.headers.update(headers or {})
+    return response
+
+class FakeTransport:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs.get('headers', {})))
+        return self.responses.pop(0)
+
+def make_client(transport, cache):
+    client = SigmaAPIClient(SigmaCredentials('client', 'secret', 'https://sigma.invalid', 'AWS-US (West)'),
+                            transport=transport, response_cache=cache)
+    client.access_token = 'token'
+    client.token_expiry = time.time() + 3600
+    return client
+
+def test_ttl_uses_longest_matching_prefix():
+    cache = SigmaResponseCache()
+    assert cache.ttl_for('/v2/workbooks?page=1') == 60
+    assert cache.ttl_for('/v2/workbooks/abc') == 300
+    assert cache.ttl_for('/v2/unknown') == 0
+
+def test_lru_evicts_oldest_entries_by_size():
+    cache = SigmaResponseCache(max_bytes=10)
+    cache.store('a', 'A', 4, ttl=60)
+    cache.store('b', 'B', 4, ttl=60)
+    cache.get('a')
+    cache.store('c', 'C', 4, ttl=60)
+
+    assert cache.get('b') is None
+    assert cache.get('a').body == 'A'
+    assert cache.info()['bytes'] == 8
+    assert cache.info()['evictions'] == 1
+    # Too big to ever fit, or neither fresh nor revalidatable: not stored
+    cache.store('huge', 'H', 11, ttl=60)
+    cache.store('uncacheable', 'U', 1, ttl=0)
+    assert cache.get('huge') is None and cache.get('uncacheable') is None
+
+def test_invalidate_drops_matching_prefix():
+    cache = SigmaResponseCache()
+    cache.store('/v2/workbooks?page=1', [], 2, ttl=60)
+    cache.store('/v2/teams?page=1', [], 2, ttl=60)
+    cache.invalidate('/v2/workbooks')
+    assert cache.get('/v2/workbooks?page=1') is None
+    assert cache.info()['entries'] == 1
+
+def test_client_serves_fresh_entries_and_revalidates_stale_ones():
+    body = {'data': [{'id': 'wb-1'}]}
+    transport = FakeTransport(
+        make_response(200, body, {'ETag': '"v1"'}),
+        make_response(304)
+    )
+    cache = SigmaResponseCache(ttls={'/v2/workbooks': 60})
+    client = make_client(transport, cache)
+
+    assert client.list_workbooks() == body
+    assert client.list_workbooks() == body
+    assert len(transport.requests) == 1
+
+    cache.get('/v2/workbooks?page=1&size=50').expires_at = 0
+    assert client.list_workbooks() == body
+    assert transport.requests[1][2]['If-None-Match'] == '"v1"'
+    assert cache.get('/v2/workbooks?page=1&size=50').fresh
+
+    info = cache.info()
+    assert (info['hits'], info['misses'], info['revalidated']) == (1, 2, 1)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for Sigma token single-flight refresh and the process-wide client registry
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+import pytest
+import requests
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import services.sigma_api_client as sigma_api_client
+from services.sigma_api_client import SigmaAPIClient, SigmaClientRegistry, SigmaCredentials, TOKEN_REFRESH_AHEAD
+from services.sigma_response_cache import SigmaResponseCache
+
+def make_response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode()
+    return response
+
+class StubSigma:
+    """Transport issuing token-1, token-2, ... and rejecting tokens listed in ``rejected``"""
+
+    def __init__(self, token_delay=0.05):
+        self.token_delay = token_delay
+        self.token_requests = 0
+        self.rejected = set()
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        if url.endswith('/v2/auth/token'):
+            time.sleep(self.token_delay)
+            with self._lock:
+                self.token_requests += 1
+                token = f'token-{self.token_requests}'
+            return make_response(200, {'access_token': token, 'expires_in': 3600})
+        token = kwargs['headers']['Authorization'].split()[-1]
+        if token in self.rejected:
+            return make_response(401, {'error': 'invalid token'})
+        return make_response(200, {'token': token})
+
+def credentials(client_id='client'):
+    return SigmaCredentials(client_id, 'secret', 'https://sigma.invalid', 'AWS-US (West)')
+
+def make_client(transport):
+    return SigmaAPIClient(credentials(), transport=transport, response_cache=SigmaResponseCache(ttls={}))
+
+def run_concurrently(target, count=8):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait(5)
+        results[index] = target()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_callers_share_one_token_request():
+    transport = StubSigma()
+    client = make_client(transport)
+
+    assert run_concurrently(client._current_token) == ['token-1'] * 8
+    assert transport.token_requests == 1
+
+def test_aging_token_is_refreshed_once_in_the_background():
+    transport = StubSigma()
+    client = make_client(transport)
+    client.access_token = 'aging'
+    # Past the refresh-ahead point but not yet inside the expiry buffer
+    client.token_expiry = time.time() + 300 + TOKEN_REFRESH_AHEAD / 2
+
+    assert run_concurrently(client._current_token) == ['aging'] * 8
+    # The background refresh holds the lock until it finishes
+    with client._refresh_lock:
+        pass
+    assert client.access_token == 'token-1'
+    assert transport.token_requests == 1
+
+def test_rejected_token_is_replaced_once():
+    transport = StubSigma(token_delay=0)
+    transport.rejected.add('stale')
+    client = make_client(transport)
+    client.access_token = 'stale'
+    client.token_expiry = time.time() + 3600
+
+    results = run_concurrently(lambda: client._make_request('GET', '/v2/users/me'))
+    assert results == [{'token': 'token-1'}] * 8
+    assert transport.token_requests == 1
+
+@pytest.fixture
+def stub_transport(monkeypatch):
+    transport = StubSigma(token_delay=0)
+    monkeypatch.setattr(sigma_api_client, 'get_default_transport', lambda: transport)
+    return transport
+
+def test_registry_reuses_clients_and_evicts_least_recently_used(stub_transport):
+    registry = SigmaClientRegistry(max_clients=2)
+    first, second = registry.get(credentials('one')), registry.get(credentials('two'))
+
+    assert registry.get(credentials('one')) is first
+    registry.get(credentials('three'))
+    assert len(registry) == 2
+    assert registry.get(credentials('one')) is first
+    assert registry.get(credentials('two')) is not second
+
+def test_registry_invalidate_forces_new_tokens(stub_transport):
+    registry = SigmaClientRegistry()
+    client = registry.get(credentials())
+    assert client._current_token() == 'token-1'
+
+    registry.invalidate()
+    assert client.access_token is None
+    assert len(registry) == 0
+
+    fresh = registry.get(credentials())
+    assert fresh is not client
+    # Skip the 1 req/sec auth pacing between the two token requests
+    fresh.rate_limit_last_call = 0
+    assert fresh._current_token() == 'token-2'
+    assert stub_transport.token_requests == 2
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled Sigma HTTP transport
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+import requests
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sigma_transport import SigmaTransport, parse_retry_after
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{}'
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    return response
+
+class FakeSession:
+    """Stands in for requests.Session, replaying queued outcomes"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def transport():
+    transport = SigmaTransport(max_retries=2, backoff_base=0)
+    yield transport
+    transport.close()
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+def test_backoff_is_jittered_capped_and_honors_retry_after():
+    transport = SigmaTransport(backoff_base=1, backoff_cap=4)
+    assert all(0 <= transport.backoff_delay(attempt) <= 4 for attempt in range(10))
+    assert transport.backoff_delay(0, retry_after=2.5) == 2.5
+    assert transport.backoff_delay(0, retry_after=60) == 4
+    transport.close()
+
+def test_transient_statuses_and_errors_are_retried(transport):
+    transport.session = FakeSession(
+        make_response(503, {'Retry-After': '0'}),
+        requests.exceptions.ConnectionError('reset'),
+        make_response(200)
+    )
+    assert transport.request('GET', 'https://sigma.invalid/v2/workbooks').status_code == 200
+    assert transport.get_stats() == {'requests': 3, 'retries': 2, 'errors': 1}
+
+def test_final_attempt_result_is_returned_or_raised(transport):
+    transport.session = FakeSession(make_response(429), make_response(429), make_response(429))
+    assert transport.request('GET', 'https://sigma.invalid/v2/workbooks').status_code == 429
+
+    transport.session = FakeSession(*[requests.exceptions.Timeout('slow')] * 3)
+    with pytest.raises(requests.exceptions.Timeout):
+        transport.request('GET', 'https://sigma.invalid/v2/workbooks')
+
+def test_client_errors_are_not_retried(transport):
+    transport.session = FakeSession(make_response(404))
+    assert transport.request('GET', 'https://sigma.invalid/v2/missing').status_code == 404
+    assert transport.session.calls == 1
+
+def test_requests_per_host_are_limited():
+    transport = SigmaTransport(max_per_host=2)
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    class SlowSession(FakeSession):
+        def request(self, method, url, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            release.wait(0.2)
+            with lock:
+                in_flight[0] -= 1
+            return make_response(200)
+
+    transport.session = SlowSession()
+    threads = [threading.Thread(target=transport.request, args=('GET', 'https://sigma.invalid/v2/teams'))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    transport.close()
+
+    assert peak[0] == 2
+    assert transport.get_stats()['requests'] == 5
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the WAL SQLite connection pool and the pooled SQLite adapter
+"""
+
+import os
+import sys
+import sqlite3
+import threading
+
+import pytest
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.sqlite_adapter import SQLiteAdapter
+from database.sqlite_pool import SQLiteConnectionPool, is_read_statement
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'), read_connections=2, busy_timeout=0.5)
+    pool.execute_write("CREATE TABLE parents (id INTEGER PRIMARY KEY)")
+    pool.execute_write(
+        "CREATE TABLE children (id INTEGER PRIMARY KEY, "
+        "parent_id INTEGER REFERENCES parents(id) DEFERRABLE INITIALLY DEFERRED)"
+    )
+    yield pool
+    pool.close()
+
+def insert_child(child_id, parent_id):
+    return lambda connection: connection.execute(
+        "INSERT INTO children (id, parent_id) VALUES (?, ?)", (child_id, parent_id)
+    ).rowcount
+
+def test_read_statements_are_classified():
+    assert is_read_statement("  SELECT 1")
+    assert is_read_statement("WITH t AS (SELECT 1) SELECT * FROM t")
+    assert is_read_statement("PRAGMA journal_mode")
+    assert not is_read_statement("PRAGMA journal_mode = DELETE")
+    assert not is_read_statement("INSERT INTO parents VALUES (1)")
+
+def test_data_changing_ctes_are_writes():
+    assert is_read_statement("WITH t AS (SELECT 'insert' AS \"delete\") SELECT * FROM t")
+    assert is_read_statement("WITH t AS (SELECT 1 AS update_count) SELECT * FROM t")
+    assert not is_read_statement("WITH t(id) AS (VALUES (1)) INSERT INTO parents SELECT id FROM t")
+    assert not is_read_statement("with t as (select 1) UPDATE parents SET id = 2")
+    assert not is_read_statement("WITH t AS (SELECT 1)\nDELETE FROM parents")
+    assert not is_read_statement("WITH t AS (SELECT 1) REPLACE INTO parents VALUES (1)")
+
+def test_adapter_sends_data_changing_ctes_to_the_writer(tmp_path):
+    adapter = SQLiteAdapter({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'adapter.db'}"})
+    try:
+        assert adapter.pool is not None
+        adapter.execute_query("CREATE TABLE parents (id INTEGER PRIMARY KEY)")
+        adapter.execute_query(
+            "WITH RECURSIVE ids(id) AS (SELECT 1 UNION ALL SELECT id + 1 FROM ids WHERE id < 3) "
+            "INSERT INTO parents (id) SELECT id FROM ids"
+        )
+        adapter.execute_query("WITH old AS (SELECT 2 AS id) DELETE FROM parents WHERE id IN (SELECT id FROM old)")
+        assert adapter.execute_query("WITH t AS (SELECT id FROM parents) SELECT id FROM t ORDER BY id") == [{'id': 1}, {'id': 3}]
+    finally:
+        adapter.close()
+
+def test_pool_runs_in_wal_mode(pool):
+    assert pool.journal_mode == 'wal'
+    assert pool.read("PRAGMA journal_mode") == [{'journal_mode': 'wal'}]
+
+def test_concurrent_writes_are_all_counted(pool):
+    def write_parents(offset):
+        for parent_id in range(offset, offset + 50):
+            pool.execute_write("INSERT INTO parents (id) VALUES (:id)", {'id': parent_id})
+
+    threads = [threading.Thread(target=write_parents, args=(offset,)) for offset in range(0, 400, 50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.read("SELECT COUNT(*) AS total FROM parents") == [{'total': 400}]
+    # Two CREATE TABLE writes from the fixture plus the inserts
+    assert pool.get_stats()['writes'] == 402
+
+def test_failed_batch_commit_retries_jobs_individually(pool):
+    pool.execute_write("INSERT INTO parents (id) VALUES (1)")
+    release = threading.Event()
+    blocker = pool.submit(lambda connection: release.wait(5))
+
+    # Queued behind the blocker, so the writer drains them as one batch
+    futures = [pool.submit(insert_child(1, 1)), pool.submit(insert_child(2, 99)), pool.submit(insert_child(3, 1))]
+    release.set()
+    blocker.result(5)
+
+    assert futures[0].result(5) == 1
+    assert futures[2].result(5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(5)
+    assert pool.read("SELECT id FROM children ORDER BY id") == [{'id': 1}, {'id': 3}]
+    assert pool.get_stats()['batch_retries'] == 1
+
+def test_reads_wait_for_a_free_connection(pool):
+    holding = threading.Barrier(3)
+    release = threading.Event()
+
+    def hold_reader():
+        with pool.reader():
+            holding.wait(5)
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold_reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    holding.wait(5)
+
+    with pytest.raises(TimeoutError):
+        pool.read("SELECT 1")
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert pool.read("SELECT 1 AS one") == [{'one': 1}]
+    assert pool.get_stats()['read_waits'] == 1
+
+def test_adapter_query_errors_are_raised(tmp_path):
+    adapter = SQLiteAdapter({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'adapter.db'}"})
+    try:
+        assert adapter.execute_query("SELECT 1 AS one") == [{'one': 1}]
+        with pytest.raises(sqlite3.OperationalError):
+            adapter.execute_query("SELECT * FROM missing_table")
+        with pytest.raises(sqlite3.OperationalError):
+            adapter.execute_query("INSERT INTO missing_table VALUES (1)")
+    finally:
+        adapter.close()
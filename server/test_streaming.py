@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming row export endpoints
+"""
+
+import os
+import sys
+import json
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import DevelopmentConfig
+from sigma_integration import init_sigma_integration
+
+@pytest.fixture
+def client(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'rows.db'}"
+    engine = create_engine(database_uri)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(120), plan VARCHAR(20))"))
+        connection.execute(text("CREATE TABLE secrets (id INTEGER PRIMARY KEY)"))
+        for user_id in range(1, 6):
+            connection.execute(text("INSERT INTO users VALUES (:id, :email, 'pro')"),
+                               {'id': user_id, 'email': f'user{user_id}@example.com'})
+    engine.dispose()
+
+    app = Flask(__name__)
+    app.config.from_object(DevelopmentConfig)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        TABLE_ROWS_ALLOWLIST={'users': ['id', 'plan']},
+        TABLE_ROWS_MAX_LIMIT=3
+    )
+    integration = init_sigma_integration(app)
+    yield app.test_client()
+    if hasattr(integration.database_adapter, 'close'):
+        integration.database_adapter.close()
+
+def test_table_rows_exports_only_allowlisted_columns(client):
+    response = client.get('/api/database/tables/users/rows')
+    assert response.status_code == 200
+    body = json.loads(response.get_data(as_text=True))
+    assert body['columns'] == ['id', 'plan']
+    # No limit given: capped at TABLE_ROWS_MAX_LIMIT
+    assert body['rows'] == [[1, 'pro'], [2, 'pro'], [3, 'pro']]
+
+def test_table_rows_caps_limit_and_selects_columns(client):
+    response = client.get('/api/database/tables/users/rows?limit=100&columns=plan&format=ndjson')
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [{'plan': 'pro'}] * 3
+
+@pytest.mark.parametrize('path, status', [
+    ('/api/database/tables/secrets/rows', 404),
+    ('/api/database/tables/sqlite_master/rows', 404),
+    ('/api/database/tables/users/rows?columns=id,email', 400),
+    ('/api/database/tables/users/rows?limit=0', 400)
+])
+def test_table_rows_rejects_unlisted_tables_columns_and_bad_limits(client, path, status):
+    response = client.get(path)
+    assert response.status_code == status
+    assert 'example.com' not in response.get_data(as_text=True)
+
+@pytest.fixture
+def app_client(tmp_path):
+    from config import TestingConfig
+    from app import create_app, db
+    from app.models import User
+
+    class RawUsersTestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'raw_users.db'}"
+        MOCK_WAREHOUSE_DATA_PATH = str(tmp_path / 'mock_warehouse')
+        RAW_USER_STREAM_BATCH_SIZE = 2
+
+    app = create_app(RawUsersTestConfig)
+    with app.app_context():
+        db.create_all()
+        for user_id in range(1, 8):
+            name = f'seller{user_id}' if user_id % 2 else f'buyer{user_id}'
+            db.session.add(User(id=user_id, username=name, email=f'{name}@example.com'))
+        db.session.commit()
+        yield app, app.test_client()
+        db.session.remove()
+        db.engine.dispose()
+
+def test_cursor_round_trip_and_rejects_garbage():
+    from app.utils import decode_cursor, encode_cursor
+
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor('') is None
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+def test_keyset_pages_cover_every_row_once(app_client):
+    _, client = app_client
+    seen, cursor, pages = [], '', 0
+    while cursor is not None:
+        response = client.get(f'/api/raw-user-data?cursor={cursor}&limit=3')
+        assert response.status_code == 200
+        body = response.get_json()
+        seen.extend(user['id'] for user in body['users'])
+        assert response.headers.get('X-Next-Cursor') == body['next_cursor']
+        cursor = body['next_cursor']
+        pages += 1
+
+    assert seen == list(range(1, 8))
+    assert pages == 3
+    assert client.get('/api/raw-user-data?cursor=%%%').status_code == 400
+
+def test_keyset_pages_apply_search(app_client):
+    _, client = app_client
+    body = client.get('/api/raw-user-data?cursor=&limit=2&search=seller').get_json()
+    assert [user['id'] for user in body['users']] == [1, 3]
+    body = client.get(f"/api/raw-user-data?cursor={body['next_cursor']}&limit=2&search=seller").get_json()
+    assert [user['id'] for user in body['users']] == [5, 7]
+    assert body['has_more'] is False
+
+def test_ndjson_streams_all_rows_or_limit(app_client):
+    app, client = app_client
+    response = client.get('/api/raw-user-data?format=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()] == list(range(1, 8))
+    assert app.query_registry.get_stats()['raw_users_after_all']['fetch_ms'] > 0
+
+    limited = client.get('/api/raw-user-data?format=ndjson&limit=3')
+    assert [json.loads(line)['id'] for line in limited.get_data(as_text=True).splitlines()] == [1, 2, 3]
+
+def test_offset_pagination_is_unchanged(app_client):
+    _, client = app_client
+    assert [user['id'] for user in client.get('/api/raw-user-data?limit=2&offset=4').get_json()] == [5, 6]
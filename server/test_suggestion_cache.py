@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for memoized Sigma AI suggestions
+"""
+
+import os
+import sys
+import asyncio
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sigma_ai_service import SigmaAIService, SuggestionCache
+
+def make_key(query, context=None):
+    return SuggestionCache.make_key(query, context, 'intermediate', 'dashboard')
+
+def test_keys_normalize_case_whitespace_and_context_order():
+    assert make_key('  Build a   DASHBOARD ') == make_key('build a dashboard')
+    assert make_key('q', {'a': 1, 'b': 2}) == make_key('q', {'b': 2, 'a': 1})
+    assert make_key('q', {}) == make_key('q', None)
+    assert make_key('q', {'a': 1}) != make_key('q', {'a': 2})
+
+def test_hit_expiry_and_eviction():
+    cache = SuggestionCache(max_entries=2, ttl=60)
+    assert cache.get(make_key('one')) is None
+    entry = cache.put(make_key('one'), [])
+    assert cache.get(make_key('one')) is entry
+
+    entry.expires_at = 0
+    assert cache.get(make_key('one')) is None
+    assert cache.info()['entries'] == 0
+
+    for query in ('a', 'b'):
+        cache.put(make_key(query), [])
+    cache.get(make_key('a'))
+    cache.put(make_key('c'), [])
+    assert cache.get(make_key('b')) is None
+    assert cache.get(make_key('a')) is not None
+
+    info = cache.info()
+    assert (info['hits'], info['misses'], info['evictions']) == (3, 3, 1)
+    assert info['hit_rate'] == 0.5
+
+def test_service_computes_each_normalized_request_once():
+    service = SigmaAIService()
+    computed = []
+    compute = service._compute_workbook_suggestions
+
+    async def counting(*args):
+        computed.append(args[0])
+        return await compute(*args)
+
+    service._compute_workbook_suggestions = counting
+    first = asyncio.run(service.generate_serialized_suggestions('Build a dashboard'))
+    again = asyncio.run(service.generate_serialized_suggestions('build a  DASHBOARD'))
+    objects = asyncio.run(service.generate_workbook_suggestions('Build a dashboard'))
+
+    assert computed == ['Build a dashboard']
+    assert again == first
+    assert [suggestion.id for suggestion in objects] == [suggestion['id'] for suggestion in first]
+    # Callers get their own list, not the cached one
+    again.clear()
+    assert asyncio.run(service.generate_serialized_suggestions('Build a dashboard')) == first
+
+    service.invalidate_suggestions()
+    asyncio.run(service.generate_serialized_suggestions('Build a dashboard'))
+    assert len(computed) == 2
+
+def test_failures_are_not_cached():
+    service = SigmaAIService()
+    calls = []
+
+    async def failing(*args):
+        calls.append(args[0])
+        raise RuntimeError('generator down')
+
+    service._compute_workbook_suggestions = failing
+    result = asyncio.run(service.generate_serialized_suggestions('Build a dashboard'))
+    assert result[0]['title'] == 'Error in Suggestion Generation'
+    asyncio.run(service.generate_serialized_suggestions('Build a dashboard'))
+    assert len(calls) == 2
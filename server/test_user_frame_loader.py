@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the projected, incrementally cached users frame loader
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from user_frame_loader import UserFrameLoader, parse_json_column
+
+def insert_user(connection, user_id, last_login='2024-01-01 00:00:00', referral_count=1, location='Oslo'):
+    connection.execute(text(
+        "INSERT INTO users (id, last_login, referral_count, total_sessions, lifetime_value, location, feature_usage_json) "
+        "VALUES (:id, :last_login, :referral_count, :total_sessions, :lifetime_value, :location, :feature_usage_json)"
+    ), {
+        'id': user_id, 'last_login': last_login, 'referral_count': referral_count,
+        'total_sessions': user_id * 10, 'lifetime_value': user_id * 1.5, 'location': location,
+        'feature_usage_json': "{'feature1': 0.5}"
+    })
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, last_login DATETIME, referral_count INTEGER, "
+            "total_sessions INTEGER, lifetime_value FLOAT, location VARCHAR(100), feature_usage_json JSON)"
+        ))
+        for user_id in (1, 2, 3):
+            insert_user(connection, user_id)
+        # A NULL must not turn the integer column into floats
+        insert_user(connection, 4, referral_count=None)
+    yield engine
+    engine.dispose()
+
+def test_integer_columns_stay_integers(engine, tmp_path):
+    loader = UserFrameLoader(engine, cache_dir=str(tmp_path / 'cache'))
+    frame = loader.load(['referral_count', 'total_sessions', 'location'])
+
+    assert str(frame['referral_count'].dtype) == 'Int64'
+    assert frame['referral_count'].isna().sum() == 1
+    assert frame['total_sessions'].max() == 40
+    assert sorted(frame['referral_count'].dropna().value_counts().index) == [1]
+    assert not isinstance(frame['location'].dtype, pd.CategoricalDtype)
+
+def test_cache_is_widened_and_refreshed_incrementally(engine, tmp_path):
+    loader = UserFrameLoader(engine, cache_dir=str(tmp_path / 'cache'))
+    loader.load(['referral_count'])
+    assert loader.last_load_stats['mode'] == 'full'
+
+    # A column the cache lacks is read on its own, without a watermark refresh
+    frame = loader.load(['lifetime_value'], refresh=False)
+    assert loader.last_load_stats['mode'] == 'cache'
+    assert list(frame.columns) == ['id', 'last_login', 'lifetime_value']
+    assert frame['lifetime_value'].tolist() == [1.5, 3.0, 4.5, 6.0]
+
+    with engine.begin() as connection:
+        insert_user(connection, 5, last_login='2024-02-01 00:00:00')
+        connection.execute(text("UPDATE users SET referral_count = 9, last_login = '2024-03-01' WHERE id = 2"))
+
+    frame = loader.load(['referral_count', 'lifetime_value'])
+    assert loader.last_load_stats['mode'] == 'incremental'
+    assert loader.last_load_stats['rows_read'] == 2
+    assert frame['id'].tolist() == [1, 2, 3, 4, 5]
+    assert frame.loc[frame['id'] == 2, 'referral_count'].item() == 9
+
+    # Deletes are invisible to the watermark, so they force a full reload
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM users WHERE id = 1"))
+    frame = loader.load(['referral_count'])
+    assert loader.last_load_stats['mode'] == 'full'
+    assert frame['id'].tolist() == [2, 3, 4, 5]
+
+def test_parse_json_column_handles_legacy_and_bad_values():
+    series = pd.Series(["{'feature1': 0.1}", {'feature1': 0.2}, None, 'not json', '{"feature1": 0.30000000000000004}'])
+    parsed = parse_json_column(series)
+
+    assert parsed['feature1'].tolist()[:2] == [0.1, 0.2]
+    assert parsed['feature1'].isna().tolist()[2:4] == [True, True]
+    assert parsed['feature1'].tolist()[4] == 0.30000000000000004
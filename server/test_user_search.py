@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the raw user explorer search index
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import user_search as user_search_module
+from app.services.user_search import UserSearchIndex
+
+USERS = [(1, 'Alice', 'alice@example.com'), (2, 'bob', 'Bob.Smith@example.com'), (3, 'carol', 'carol@example.org')]
+
+def create_users(engine):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) UNIQUE, email VARCHAR(120) UNIQUE)"))
+        for user_id, username, email in USERS:
+            connection.execute(text("INSERT INTO users VALUES (:id, :username, :email)"),
+                               {'id': user_id, 'username': username, 'email': email})
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    session = scoped_session(sessionmaker(bind=engine))
+    yield SimpleNamespace(engine=engine, session=session)
+    session.remove()
+    engine.dispose()
+
+def test_missing_users_table_is_retried(db):
+    index = UserSearchIndex(db)
+    assert index.ensure_index() is False
+
+    create_users(db.engine)
+    assert index.ensure_index() is True
+    assert index.search('smith')['ids'] == [2]
+
+def test_unsupported_index_is_remembered(db, monkeypatch):
+    create_users(db.engine)
+    index = UserSearchIndex(db)
+    monkeypatch.setattr(user_search_module, 'SEARCH_INDEX_DDL', ["CREATE VIRTUAL TABLE users_fts USING no_such_module(a)"])
+    assert index.ensure_index() is False
+
+    monkeypatch.undo()
+    assert index.ensure_index() is False
+    # Falls back to LIKE, which still matches
+    assert index.filter_variant('alice')[0] == 'like'
+
+@pytest.mark.parametrize('term', ['al', 'AL', 'Al'])
+def test_short_prefix_search_ignores_case(db, term):
+    create_users(db.engine)
+    result = UserSearchIndex(db).search(term)
+    assert result['mode'] == 'prefix'
+    assert result['ids'] == [1]
+
+def test_short_prefix_search_matches_email_and_uses_index(db):
+    create_users(db.engine)
+    index = UserSearchIndex(db)
+    assert index.search('bO')['ids'] == [2]
+
+    with db.engine.connect() as connection:
+        plan = ' '.join(str(row[-1]) for row in connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM users WHERE lower(username) >= :lo AND lower(username) < :hi"
+        ), {'lo': 'b', 'hi': 'b\uffff'}))
+    assert 'ix_users_username_lower' in plan
+
+def test_substring_search_ignores_case(db):
+    create_users(db.engine)
+    result = UserSearchIndex(db).search('EXAMPLE.ORG')
+    assert result['mode'] == 'substring'
+    assert result['ids'] == [3]
@@ -0,0 +1,262 @@
+# user_frame_loader.py
+"""
+Columnar, incremental loader for the users table
+
+Reads only the columns an analysis needs, in chunks with explicit dtypes,
+parses the JSON columns in one vectorized pass and keeps the frame cached on
+disk so later runs only fetch users whose id or last_login moved past the
+cached watermark.
+"""
+
+import io
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Explicit dtypes so chunks do not have to be type-inferred row by row. Integer
+# columns use the nullable Int64 so NULLs do not turn them into floats; string
+# columns stay object dtype so value_counts() ties keep their row order.
+NUMERIC_DTYPES = {
+    'id': 'int64',
+    'age': 'Int64',
+    'avg_visit_time': 'float64',
+    'total_sessions': 'Int64',
+    'session_frequency': 'float64',
+    'email_open_rate': 'float64',
+    'email_click_rate': 'float64',
+    'lifetime_value': 'float64',
+    'total_purchases': 'Int64',
+    'average_purchase_value': 'float64',
+    'churn_risk': 'float64',
+    'engagement_score': 'float64',
+    'referral_count': 'Int64',
+    'account_age_days': 'Int64'
+}
+
+JSON_COLUMNS = ['notification_settings', 'feature_usage_json']
+
+# Columns every cached frame carries so it can be refreshed incrementally
+KEY_COLUMNS = ['id', 'last_login']
+
+# Bumped when the cached frame's dtypes change so older caches are reloaded
+CACHE_VERSION = 2
+
+# Columns used by each analysis in analysis.py / predictive_marketing.py
+ANALYSIS_COLUMNS = {
+    'demographic': ['age', 'gender', 'location', 'language'],
+    'engagement': ['avg_visit_time', 'total_sessions', 'session_frequency', 'engagement_score'],
+    'revenue': ['plan', 'lifetime_value', 'total_purchases'],
+    'churn': ['plan', 'churn_risk', 'engagement_score', 'lifetime_value'],
+    'personalization': ['preferred_content_type', 'communication_preference', 'feature_usage_json'],
+    'referral': ['plan', 'referral_source', 'referral_count', 'lifetime_value'],
+    'visualization': [
+        'age', 'avg_visit_time', 'total_sessions', 'lifetime_value', 'total_purchases',
+        'churn_risk', 'engagement_score', 'plan', 'communication_preference',
+        'referral_count', 'feature_usage_json'
+    ],
+    'notifications': ['notification_settings'],
+    'predictive': [
+        'age', 'total_sessions', 'avg_visit_time', 'engagement_score', 'churn_risk',
+        'lifetime_value', 'referral_count', 'email_open_rate', 'email_click_rate',
+        'plan', 'preferred_content_type', 'communication_preference'
+    ]
+}
+
+def columns_for(analyses: Iterable[str]) -> List[str]:
+    """Union of the columns needed by the named analyses, in a stable order"""
+    columns = list(KEY_COLUMNS)
+    for analysis in analyses:
+        for column in ANALYSIS_COLUMNS[analysis]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def parse_json_column(series: pd.Series) -> pd.DataFrame:
+    """Parse a column of JSON objects into a flat frame in one vectorized pass.
+
+    Handles the legacy single-quoted dict strings as well as values the driver
+    already decoded into dicts; missing or malformed values become empty rows.
+    """
+    if series.empty:
+        return pd.DataFrame(index=series.index)
+
+    is_dict = series.map(type) == dict
+    as_text = series.where(~is_dict, None)
+    if is_dict.any():
+        as_text = as_text.where(~is_dict, series[is_dict].map(json.dumps))
+    as_text = as_text.fillna('{}').astype(str).str.replace("'", '"', regex=False)
+
+    # Blank out anything that is not an object so one bad row cannot fail the batch
+    stripped = as_text.str.strip()
+    as_text = as_text.where(stripped.str.startswith('{') & stripped.str.endswith('}'), '{}')
+
+    try:
+        parsed = pd.read_json(io.StringIO('\n'.join(as_text.tolist())), lines=True, orient='records',
+                              precise_float=True)
+    except ValueError:
+        # Fall back to per-row parsing only when the batch contains malformed JSON
+        def parse(value):
+            try:
+                return json.loads(value)
+            except (json.JSONDecodeError, TypeError):
+                return {}
+        parsed = pd.DataFrame(as_text.map(parse).tolist())
+
+    parsed.index = series.index
+    return parsed
+
+class UserFrameLoader:
+    """Loads projected columns of the users table with an on-disk incremental cache"""
+
+    def __init__(self, engine, cache_dir: Optional[str] = 'analysis_cache',
+                 chunk_size: int = 50000):
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.last_load_stats: Dict[str, object] = {}
+
+    # -- cache files ---------------------------------------------------------
+
+    @property
+    def _frame_path(self) -> str:
+        extension = 'parquet' if PARQUET_AVAILABLE else 'pkl'
+        return os.path.join(self.cache_dir, f'users.{extension}')
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.cache_dir, 'users_meta.json')
+
+    def _read_cache(self):
+        if not self.cache_dir or not os.path.exists(self._frame_path) or not os.path.exists(self._meta_path):
+            return None, None
+        try:
+            with open(self._meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('version') != CACHE_VERSION:
+                return None, None
+            if PARQUET_AVAILABLE:
+                frame = pd.read_parquet(self._frame_path)
+            else:
+                frame = pd.read_pickle(self._frame_path)
+            return frame, meta
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable users frame cache: {e}")
+            return None, None
+
+    def _write_cache(self, frame: pd.DataFrame, meta: Dict):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if PARQUET_AVAILABLE:
+                frame.to_parquet(self._frame_path, index=False)
+            else:
+                frame.to_pickle(self._frame_path)
+            with open(self._meta_path, 'w') as f:
+                json.dump({**meta, 'version': CACHE_VERSION}, f)
+        except Exception as e:
+            logger.warning(f"Could not write users frame cache: {e}")
+
+    # -- loading -------------------------------------------------------------
+
+    def _read_rows(self, columns: List[str], where: str = '', params: Dict = None) -> pd.DataFrame:
+        query = text(f"SELECT {', '.join(columns)} FROM users {where} ORDER BY id")
+        dtypes = {column: dtype for column, dtype in NUMERIC_DTYPES.items() if column in columns}
+
+        chunks = []
+        for chunk in pd.read_sql(query, self.engine, params=params or {}, chunksize=self.chunk_size,
+                                 parse_dates=['last_login'] if 'last_login' in columns else None):
+            chunks.append(chunk.astype({c: d for c, d in dtypes.items() if c in chunk.columns}))
+
+        if chunks:
+            frame = pd.concat(chunks, ignore_index=True)
+        else:
+            frame = pd.DataFrame({column: pd.Series(dtype=dtypes.get(column, 'object')) for column in columns})
+        return frame
+
+    def _watermark(self, frame: pd.DataFrame) -> Dict:
+        last_login = frame['last_login'].max() if len(frame) else None
+        return {
+            'max_id': int(frame['id'].max()) if len(frame) else 0,
+            'max_last_login': last_login.strftime('%Y-%m-%d %H:%M:%S.%f') if pd.notna(last_login) else None
+        }
+
+    def load(self, columns: List[str] = None, refresh: bool = True) -> pd.DataFrame:
+        """Return the users frame restricted to ``columns`` (plus id/last_login).
+
+        With a warm cache only users inserted after the cached max id, or whose
+        last_login moved past the cached watermark, are read from the database.
+        Columns the cache does not hold yet are read on their own and added to
+        it. ``refresh=False`` skips the watermark check and returns cached rows.
+        """
+        columns = list(dict.fromkeys(KEY_COLUMNS + list(columns or columns_for(ANALYSIS_COLUMNS))))
+        started = datetime.utcnow()
+        load_columns = columns
+
+        cached, meta = self._read_cache()
+        if cached is not None:
+            missing = [column for column in columns if column not in cached.columns]
+            if missing:
+                # Widen the cache with just the new columns instead of re-reading every column
+                cached = cached.merge(self._read_rows(['id'] + missing), on='id', how='left')
+                self._write_cache(cached, meta)
+
+            if not refresh:
+                self.last_load_stats = {'mode': 'cache', 'rows_read': len(cached) if missing else 0}
+                return cached[columns]
+
+            cached_columns = load_columns = list(cached.columns)
+            conditions = ["id > :max_id"]
+            params = {'max_id': meta.get('max_id', 0)}
+            if meta.get('max_last_login'):
+                conditions.append("last_login > :max_last_login")
+                params['max_last_login'] = meta['max_last_login']
+            changed = self._read_rows(cached_columns, f"WHERE {' OR '.join(conditions)}", params)
+
+            merged = cached[~cached['id'].isin(changed['id'])]
+            if len(changed):
+                merged = pd.concat([merged, changed], ignore_index=True).sort_values('id', ignore_index=True)
+
+            with self.engine.connect() as connection:
+                row_count = connection.execute(text("SELECT COUNT(*) FROM users")).scalar()
+
+            # Deletes cannot be seen through the watermark; fall through to a full load
+            if row_count == len(merged):
+                self._write_cache(merged, {**self._watermark(merged), 'row_count': row_count})
+                self.last_load_stats = {
+                    'mode': 'incremental',
+                    'rows_read': len(changed),
+                    'seconds': (datetime.utcnow() - started).total_seconds()
+                }
+                return merged[columns]
+
+        # A full reload keeps every cached column so the next analysis can reuse it
+        frame = self._read_rows(load_columns)
+        self._write_cache(frame, {**self._watermark(frame), 'row_count': len(frame)})
+        self.last_load_stats = {
+            'mode': 'full',
+            'rows_read': len(frame),
+            'seconds': (datetime.utcnow() - started).total_seconds()
+        }
+        return frame[columns]
+
+def expand_json_columns(frame: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Parse every JSON column present in ``frame`` into its own flat frame"""
+    return {
+        column: parse_json_column(frame[column])
+        for column in JSON_COLUMNS
+        if column in frame.columns
+    }